@@ -2,12 +2,35 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from backend.api.routes import mutual_fund, stock, agent
+from backend.api.routes.services import get_agent_graph
+from backend.core.finance_agents_network.query_precompute import start_precompute_job
+from backend.models.json_codec import HAS_ORJSON
+
+PRECOMPUTE_QUERY_EMBEDDINGS = (
+    os.environ.get("SMART_WEALTH_PRECOMPUTE_QUERY_EMBEDDINGS", "true").lower() == "true"
+)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PRECOMPUTE_QUERY_EMBEDDINGS:
+        start_precompute_job()
+    await asyncio.to_thread(get_agent_graph)
+    yield
+
+
+app = FastAPI(
+    default_response_class=ORJSONResponse if HAS_ORJSON else JSONResponse,
+    lifespan=lifespan,
+)
 
 main_router = APIRouter(prefix="/api")
 main_router.include_router(mutual_fund.router)
@@ -1,29 +1,139 @@
-from typing import Any
+from __future__ import annotations
+
+import logging
+from typing import Any, AsyncGenerator, Generator, Literal
 
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from backend.api.routes.services import astream_graph, new_conversation_id
+from backend.core.finance_agents_network.router import router_metrics
+from backend.models import json_codec
+from langchain_core.messages import AIMessage, AIMessageChunk
 
-from backend.api.routes.services import stream_graph
-from langchain_core.messages import AIMessage
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/agent")
 
+STREAM_MEDIA_TYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+
+def node_messages(update: dict[str, Any]) -> Generator[tuple[str, dict[str, Any]]]:
+    """(node, message) pairs of the AI messages of a graph update"""
+    for node, value in update.items():
+        if value and "messages" in value:
+            for m in value["messages"]:
+                if isinstance(m, AIMessage):
+                    yield node, {"sender": "bot", "text": m.content}
+
 
 @router.post("/chat")
 async def chat(messages: dict[str, Any]):
     """
-    Chat with the agent network.
+    Chat with the agent network. With a conversation_id, messages are only the
+    new messages of the turn and the stored conversation is continued, without
+    one they are the whole history of a new conversation. The response has the
+    conversation_id to send with the next turn.
     """
     response = []
+    conversation_id = messages.get("conversation_id") or new_conversation_id()
     messages = messages["messages"]
 
-    for r in stream_graph(messages):
-        for key, value in r.items():
-            if "messages" in value:
-                for m in value["messages"]:
-                    if isinstance(m, AIMessage):
-                        response.append({"sender": "bot", "text": m.content})
+    async for r in astream_graph(messages, conversation_id=conversation_id):
+        for _, message in node_messages(r):
+            response.append(message)
 
     final_response = {
+        "conversation_id": conversation_id,
         "messages": [*messages, *response],
     }
     return final_response
+
+
+async def chat_events(
+    messages: list[dict[str, Any]],
+    conversation_id: str,
+) -> AsyncGenerator[tuple[str, dict[str, Any]]]:
+    """Events of a chat run, as they are produced:
+
+    - start: the conversation_id of the run, to send with the next turn
+    - route: the supervisor picked the next agent (or FINISH)
+    - token: a token of an agent's answer, where the model streams
+    - message: a complete agent message, as in the /chat response
+    - done: the messages and conversation_id, as in the /chat response
+    - error: the run failed
+    """
+    response = []
+    yield "start", {"conversation_id": conversation_id}
+    try:
+        async for mode, chunk in astream_graph(
+            messages,
+            stream_mode=["updates", "messages"],
+            conversation_id=conversation_id,
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                if isinstance(message, AIMessageChunk) and message.content:
+                    yield "token", {
+                        "node": metadata.get("langgraph_node"),
+                        "text": message.content,
+                    }
+                continue
+            for node, value in chunk.items():
+                if value and "messages" not in value and "next" in value:
+                    yield "route", {"node": node, "next": value["next"]}
+            for node, message in node_messages(chunk):
+                response.append(message)
+                yield "message", {"node": node, **message}
+    except Exception:
+        logger.exception("Agent chat stream failed")
+        yield "error", {"message": "Something went wrong. Please try again later."}
+        return
+    yield "done", {
+        "conversation_id": conversation_id,
+        "messages": [*messages, *response],
+    }
+
+
+def format_event(event: str, data: dict[str, Any], format: str) -> bytes:
+    if format == "sse":
+        return b"event: %s\ndata: %s\n\n" % (
+            event.encode("utf-8"),
+            json_codec.dumps_bytes(data),
+        )
+    return json_codec.dumps_bytes({"event": event, **data}) + b"\n"
+
+
+async def stream_events(
+    messages: list[dict[str, Any]], conversation_id: str, format: str
+) -> AsyncGenerator[bytes]:
+    async for event, data in chat_events(messages, conversation_id):
+        yield format_event(event, data, format)
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    messages: dict[str, Any],
+    format: Literal["sse", "ndjson"] = "sse",
+):
+    """
+    Chat with the agent network, streaming the events of the run as server-sent
+    events (format=sse) or newline delimited json (format=ndjson). Messages and
+    conversation_id as in /chat.
+    """
+    conversation_id = messages.get("conversation_id") or new_conversation_id()
+    messages = messages["messages"]
+    return StreamingResponse(
+        stream_events(messages, conversation_id, format),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/router/metrics")
+async def get_router_metrics():
+    """
+    How often the fast router decided by keyword rules, by embedding or fell
+    back to the supervisor LLM, and the next hops it chose.
+    """
+    return router_metrics.snapshot()
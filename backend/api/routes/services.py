@@ -1,8 +1,10 @@
-from typing import Any
+import threading
+from typing import Any, Optional
+from uuid import uuid4
 
 import requests
 import yfinance
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from backend.core.finance_agents_network.agent_network import AgentsNetwork
 from backend.core.finance_agents_network.agents.personal_finance_agent import (
     PersonalFinanceAgent,
@@ -11,6 +13,7 @@ from backend.core.finance_agents_network.agents.market_analyzer_agent import (
     MarketAnalyzerAgent,
 )
 from backend.core.finance_agents_network.agents.investor_agent import InvestorAgent
+from backend.core.checkpoint import get_checkpointer
 from backend.core.finance_agents_network.prompts import (
     market_analyzer_prompt,
     investor_prompt,
@@ -54,8 +57,19 @@ def get_stock_details(stock_ticker: str) -> dict[str, Any]:
         }
 
 
-def stream_graph(messages: list):
-    agent_network = AgentsNetwork()
+_agent_graph = None
+_agent_graph_lock = threading.Lock()
+
+
+def embed_router_texts(texts: list[str]) -> list[list[float]]:
+    """Embeddings of the fast router examples and requests"""
+    response = InvestorAgent.stock_news_vector_store.embed_texts(texts)
+    return [item.embedding for item in response.data]
+
+
+def build_agent_graph():
+    """Build and compile the agent network"""
+    agent_network = AgentsNetwork(embed_texts=embed_router_texts)
     agent_network.add_agent(
         "MarketAnalyzerAgent", MarketAnalyzerAgent, market_analyzer_prompt
     )
@@ -63,13 +77,81 @@ def stream_graph(messages: list):
     agent_network.add_agent(
         "PersonalFinanceAgent", PersonalFinanceAgent, personal_finance_prompt
     )
+    return agent_network.create_agent_network(checkpointer=get_checkpointer())
+
+
+def get_agent_graph():
+    """The compiled agent network, built once per process. The compiled graph
+    keeps no per-run state (conversations are in the checkpointer), so it is
+    shared by concurrent requests."""
+    global _agent_graph
+    if _agent_graph is None:
+        with _agent_graph_lock:
+            if _agent_graph is None:
+                _agent_graph = build_agent_graph()
+    return _agent_graph
+
+
+def to_chat_message(message: dict[str, Any]) -> BaseMessage:
+    if message["sender"] == "user":
+        return HumanMessage(message["text"])
+    return AIMessage(message["text"])
+
+
+def conversation_input(messages: list) -> dict[str, list]:
+    """Graph input of a turn: the new api messages, appended to the stored
+    conversation. The stored history is kept whole, the agents and the
+    supervisor only trim their model input (see AgentsNetwork.model_input).
+
+    Args:
+    ------
+    messages: list
+        The api messages of the turn, the whole history for new conversations
+    """
+    return {"messages": [to_chat_message(message) for message in messages]}
+
+
+def graph_config(conversation_id: str) -> dict[str, Any]:
+    """Config of a chat run. thread_id is the conversation whose stored state
+    the run continues, and chat_id scopes the searches shared by the tool calls
+    (see CompanyAnalysisEngine) to the same conversation, so the turns of a
+    conversation reuse each other's searches within their ttl."""
+    return {
+        "recursion_limit": 20,
+        "configurable": {"chat_id": conversation_id, "thread_id": conversation_id},
+    }
+
+
+def new_conversation_id() -> str:
+    return uuid4().hex
+
+
+def stream_graph(
+    messages: list,
+    stream_mode: str | list[str] = "updates",
+    conversation_id: Optional[str] = None,
+):
+    """Stream the agent network over the new messages of the conversation. With
+    a list of stream modes (e.g. ["updates", "messages"]) the stream yields
+    (mode, chunk) pairs. Without a conversation_id, messages are the whole
+    history of a new conversation."""
+    graph = get_agent_graph()
+    config = graph_config(conversation_id or new_conversation_id())
+    return graph.stream(conversation_input(messages), config, stream_mode=stream_mode)
 
-    chat_messages = []
-    for message in messages:
-        if message["sender"] == "user":
-            chat_messages.append(HumanMessage(message["text"]))
-        else:
-            chat_messages.append(AIMessage(message["text"]))
 
-    graph = agent_network.create_agent_network()
-    return graph.stream({"messages": chat_messages}, {"recursion_limit": 20})
+async def astream_graph(
+    messages: list,
+    stream_mode: str | list[str] = "updates",
+    conversation_id: Optional[str] = None,
+):
+    """Async stream_graph. Agents, tools and LLM calls run on their async
+    implementations, so a run does not block the event loop."""
+    graph = get_agent_graph()
+    config = graph_config(conversation_id or new_conversation_id())
+    async for chunk in graph.astream(
+        conversation_input(messages),
+        config,
+        stream_mode=stream_mode,
+    ):
+        yield chunk
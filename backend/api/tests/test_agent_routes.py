@@ -0,0 +1,166 @@
+import asyncio
+import importlib
+import json
+from unittest import mock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from backend.core import tool_cache
+from backend.mongo_store.rank_store import RankStore
+from backend.vector_stores import azure_cosmos_db
+
+UPDATES = [
+    ("updates", {"supervisor": {"next": "MarketAnalyzerAgent", "agents": []}}),
+    (
+        "messages",
+        (AIMessageChunk(content="TCS"), {"langgraph_node": "MarketAnalyzerAgent"}),
+    ),
+    ("messages", (AIMessageChunk(content=""), {"langgraph_node": "supervisor"})),
+    (
+        "updates",
+        {
+            "MarketAnalyzerAgent": {
+                "messages": [AIMessage(content="TCS is up", name="MarketAnalyzerAgent")]
+            }
+        },
+    ),
+    ("updates", {"supervisor": {"next": "FINISH", "agents": []}}),
+]
+MESSAGES = [{"sender": "user", "text": "How is TCS doing?"}]
+
+
+def fake_astream_graph(updates, fail=False):
+    calls = []
+
+    async def astream_graph(messages, stream_mode="updates", conversation_id=None):
+        calls.append((messages, stream_mode, conversation_id))
+        for update in updates:
+            yield update
+        if fail:
+            raise ConnectionError("Cosmos unavailable")
+
+    astream_graph.calls = calls
+    return astream_graph
+
+
+@pytest.fixture
+def agent_routes(monkeypatch):
+    """The agent routes, imported without connecting to Cosmos DB and MongoDB"""
+    monkeypatch.setattr(azure_cosmos_db, "CosmosClient", mock.MagicMock())
+    monkeypatch.setattr(RankStore, "__init__", lambda self: None)
+    monkeypatch.setattr(RankStore, "get_top_k_companies", lambda self, k: [])
+    monkeypatch.setattr(tool_cache, "TOOL_CACHE_PATH", ":memory:")
+    tool_cache.get_tool_result_cache.cache_clear()
+    yield importlib.import_module("backend.api.routes.agent")
+    tool_cache.get_tool_result_cache.cache_clear()
+
+
+@pytest.fixture
+def client(agent_routes):
+    app = FastAPI()
+    app.include_router(agent_routes.router)
+    return TestClient(app)
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+class TestChatEvents:
+    def test_events_in_order(self, agent_routes, monkeypatch):
+        astream_graph = fake_astream_graph(UPDATES)
+        monkeypatch.setattr(agent_routes, "astream_graph", astream_graph)
+        events = asyncio.run(collect(agent_routes.chat_events(MESSAGES, "chat")))
+
+        assert events == [
+            ("start", {"conversation_id": "chat"}),
+            ("route", {"node": "supervisor", "next": "MarketAnalyzerAgent"}),
+            ("token", {"node": "MarketAnalyzerAgent", "text": "TCS"}),
+            (
+                "message",
+                {"node": "MarketAnalyzerAgent", "sender": "bot", "text": "TCS is up"},
+            ),
+            ("route", {"node": "supervisor", "next": "FINISH"}),
+            (
+                "done",
+                {
+                    "conversation_id": "chat",
+                    "messages": [*MESSAGES, {"sender": "bot", "text": "TCS is up"}],
+                },
+            ),
+        ]
+        assert astream_graph.calls == [(MESSAGES, ["updates", "messages"], "chat")]
+
+    def test_error_event(self, agent_routes, monkeypatch):
+        monkeypatch.setattr(
+            agent_routes, "astream_graph", fake_astream_graph(UPDATES[:1], fail=True)
+        )
+        events = asyncio.run(collect(agent_routes.chat_events(MESSAGES, "chat")))
+
+        assert [event for event, _ in events] == ["start", "route", "error"]
+        assert events[-1][1] == {
+            "message": "Something went wrong. Please try again later."
+        }
+
+    def test_format_event(self, agent_routes):
+        data = {"node": "supervisor", "next": "FINISH"}
+        assert agent_routes.format_event("route", data, "sse") == (
+            b'event: route\ndata: {"node":"supervisor","next":"FINISH"}\n\n'
+        )
+        assert json.loads(agent_routes.format_event("route", data, "ndjson")) == {
+            "event": "route",
+            **data,
+        }
+
+
+class TestGraphConfig:
+    def test_searches_are_shared_by_the_turns(self, agent_routes):
+        services = importlib.import_module("backend.api.routes.services")
+        assert services.graph_config("chat")["configurable"] == {
+            "chat_id": "chat",
+            "thread_id": "chat",
+        }
+
+
+class TestChatStream:
+    def test_sse(self, agent_routes, client, monkeypatch):
+        monkeypatch.setattr(agent_routes, "astream_graph", fake_astream_graph(UPDATES))
+        response = client.post(
+            "/agent/chat/stream",
+            json={"messages": MESSAGES, "conversation_id": "chat"},
+        )
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = response.text.split("\n\n")
+        assert frames[-1] == ""
+        events = [frame.split("\n") for frame in frames[:-1]]
+        assert [event for event, _ in events] == [
+            "event: start",
+            "event: route",
+            "event: token",
+            "event: message",
+            "event: route",
+            "event: done",
+        ]
+        assert all(data.startswith("data: ") for _, data in events)
+        assert json.loads(events[0][1][len("data: ") :])["conversation_id"] == "chat"
+        assert json.loads(events[-1][1][len("data: ") :])["conversation_id"] == "chat"
+
+    def test_ndjson(self, agent_routes, client, monkeypatch):
+        monkeypatch.setattr(
+            agent_routes, "astream_graph", fake_astream_graph(UPDATES[:1], fail=True)
+        )
+        response = client.post(
+            "/agent/chat/stream?format=ndjson", json={"messages": MESSAGES}
+        )
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.text.splitlines()
+        assert response.text.endswith("\n")
+        events = [json.loads(line) for line in lines]
+        assert [event["event"] for event in events] == ["start", "route", "error"]
+        # a new conversation gets its id before the run fails
+        assert events[0]["conversation_id"]
@@ -0,0 +1,48 @@
+"""Benchmark of the per-request overhead of the agent graph.
+
+Compares building and compiling the agent network on every request (the
+previous behaviour of stream_graph) with reusing the graph compiled once by
+get_agent_graph. Only graph construction is timed, no model is called, but the
+environment of the api (Azure OpenAI and Cosmos settings) is required to
+import the agents.
+
+Usage:
+    python -m backend.benchmarks.agent_graph_benchmark --requests 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from backend.api.routes.services import build_agent_graph, get_agent_graph
+
+
+def time_requests(get_graph, requests: int) -> list[float]:
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        get_graph()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(requests: int) -> None:
+    get_agent_graph()
+    print(f"{requests} requests, graph overhead per request (ms)")
+    print(f"{'graph':<12} {'median':>10} {'p95':>10}")
+    for name, get_graph in [
+        ("per-request", build_agent_graph),
+        ("shared", get_agent_graph),
+    ]:
+        timings = sorted(time_requests(get_graph, requests))
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<12} {statistics.median(timings):>10.3f} {p95:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,160 @@
+"""Micro-benchmark of document serialization.
+
+Compares the previous to_json implementation (dump to a string and parse it
+back), the direct json mode dump and the string serializers used when saving
+and uploading documents, over every document class.
+
+Usage:
+    python -m backend.benchmarks.serialization_benchmark --number 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import timeit
+from typing import Callable
+
+from backend.models import json_codec
+from backend.models.documents import (
+    BaseDocument,
+    ExpertDocument,
+    ExpertDocumentMeta,
+    FaqBaseDocumentMeta,
+    FaqDocument,
+    MutualFundDocument,
+    MutualFundDocumentMeta,
+    NewsDocument,
+    NewsDocumentMeta,
+    NseIndexDocument,
+    NseIndexDocumentMeta,
+    WebsiteBaseDocumentMeta,
+    WebsiteDocument,
+)
+
+NOW = datetime.datetime(2024, 10, 18, 9, 15)
+
+
+def sample_documents() -> list[BaseDocument]:
+    """One representative document of every document class"""
+    text = "Smart Wealth sample paragraph about markets and funds. " * 40
+    return [
+        WebsiteDocument(
+            page_content=text,
+            document_meta=WebsiteBaseDocumentMeta(
+                source="https://bankofbaroda.in/loans",
+                title="Loans",
+                tags=["loan", "home"],
+            ),
+        ),
+        FaqDocument(
+            question="What is the interest rate?",
+            answer=text[:400],
+            document_meta=FaqBaseDocumentMeta(
+                source="https://bankofbaroda.in/faq", title="FAQ"
+            ),
+        ),
+        NewsDocument(
+            page_content=text,
+            document_meta=NewsDocumentMeta(
+                source="https://news.com/tcs",
+                author_name="author",
+                company_name="Tata Consultancy Services",
+                keywords=["it", "results", "earnings"],
+                headline="TCS beats estimates",
+                news_sentiment={"positive": 0.8, "neutral": 0.15, "negative": 0.05},
+                market_trend="bullish",
+                sector="IT",
+                summary=text[:300],
+                date_published=NOW,
+                ticker="TCS.NS",
+            ),
+        ),
+        ExpertDocument(
+            page_content=text,
+            document_meta=ExpertDocumentMeta(
+                title="Outlook",
+                source="https://experts.com/outlook",
+                date_published=NOW,
+                description=text[:200],
+                summary=text[:300],
+                companies=["TCS", "INFY", "WIPRO"],
+                segments=["IT"],
+                news_sentiment={"positive": 0.6, "negative": 0.4},
+                market_trend="neutral",
+                keywords=["outlook", "it"],
+            ),
+        ),
+        MutualFundDocument(
+            document_meta=MutualFundDocumentMeta(
+                source="https://funds.com/bob-large-cap",
+                fund_name="Baroda BNP Paribas Large Cap Fund",
+                investment_objective=text[:300],
+                scheme_riskometer="Very High",
+                portfolio={f"company {idx}": idx / 10 for idx in range(30)},
+                expense_ratio_and_quantitative_data={"expense_ratio": 1.2},
+                load_structure={"entry": "nil", "exit": "1%"},
+                minimum_investment_amount={"lumpsum": 5000, "sip": 500},
+                fund_manager={"name": "manager", "experience": "10 years"},
+                tickers=[f"TICKER{idx}.NS" for idx in range(30)],
+            ),
+        ),
+        NseIndexDocument(
+            symbol="TCS",
+            company_name="Tata Consultancy Services Limited",
+            industry="IT",
+            isin="INE467B01029",
+            document_meta=NseIndexDocumentMeta(
+                source="https://www.nseindia.com/api/equity-stockIndices?index=NIFTY 50",
+                open=4100.0,
+                day_high=4150.0,
+                day_low=4080.0,
+                year_high=4590.0,
+                year_low=3300.0,
+                last_price=4120.5,
+                change=20.5,
+                percentage_change=0.5,
+                last_updated_time=NOW,
+                previous_close=4100.0,
+                total_traded_volume=1200000.0,
+                percentage_change_365=20.1,
+                percentage_change_30=2.3,
+                chart_day_img_path="https://static.nseindia.com/today.svg",
+                chart_365_img_path="https://static.nseindia.com/365.svg",
+                chart_30_img_path="https://static.nseindia.com/30.svg",
+            ),
+        ),
+    ]
+
+
+def serializers() -> dict[str, Callable[[BaseDocument], object]]:
+    return {
+        "loads(model_dump_json)": lambda doc: json.loads(doc.model_dump_json()),
+        "to_json": lambda doc: doc.to_json(),
+        "json.dumps(to_json)": lambda doc: json.dumps(doc.to_json()),
+        "codec.dumps(to_json)": lambda doc: json_codec.dumps(doc.to_json()),
+        "model_dump_json": lambda doc: doc.model_dump_json(),
+    }
+
+
+def run(number: int) -> None:
+    documents = sample_documents()
+    names = list(serializers())
+    print(f"orjson available: {json_codec.HAS_ORJSON}, {number} iterations (us/op)")
+    print(f"{'document':<20}" + "".join(f"{name:>24}" for name in names))
+    for document in documents:
+        timings = [
+            timeit.timeit(lambda: func(document), number=number) / number * 1e6
+            for func in serializers().values()
+        ]
+        print(
+            f"{document.document_type:<20}"
+            + "".join(f"{timing:>24.2f}" for timing in timings)
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    run(parser.parse_args().number)
@@ -0,0 +1,81 @@
+"""Micro-benchmark of building documents from vector store items.
+
+Compares validated construction (document_class(**item)) with the trusted
+from_trusted path used for store reads, on items shaped like the rows of the
+mutual-fund and news containers.
+
+Usage:
+    python -m backend.benchmarks.trusted_load_benchmark --rows 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from backend.benchmarks.serialization_benchmark import sample_documents
+from backend.models.documents import MutualFundDocument, NewsDocument
+
+
+def stored_items(document, rows: int) -> list[dict]:
+    """Rows as returned by Cosmos, including the system properties"""
+    return [
+        {
+            "id": str(idx),
+            "_rid": "rid",
+            "_ts": 1729243500,
+            **document.to_json(),
+        }
+        for idx in range(rows)
+    ]
+
+
+def with_holdings(document: MutualFundDocument, holdings: int) -> MutualFundDocument:
+    """The mutual fund sample with a portfolio of the given number of holdings"""
+    document = document.model_copy(deep=True)
+    document.document_meta.portfolio = {
+        f"Company {idx} Limited": {
+            "sector": "Information Technology",
+            "weight": idx / holdings,
+            "quantity": idx * 100,
+            "value": idx * 1e5,
+        }
+        for idx in range(holdings)
+    }
+    return document
+
+
+def run(rows: int, repeat: int, holdings: int) -> None:
+    samples = {type(document): document for document in sample_documents()}
+    samples[MutualFundDocument] = with_holdings(samples[MutualFundDocument], holdings)
+    print(f"{rows} rows, {holdings} mutual fund holdings, best of {repeat} (ms)")
+    print(f"{'container':<12} {'validated':>10} {'trusted':>10} {'speedup':>8}")
+    for name, document_class in [
+        ("mutual-fund", MutualFundDocument),
+        ("news", NewsDocument),
+    ]:
+        items = stored_items(samples[document_class], rows)
+        timings = []
+        for load in (
+            lambda item: document_class(**item),
+            document_class.from_trusted,
+        ):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                [load(item) for item in items]
+                best = min(best, time.perf_counter() - start)
+            timings.append(best * 1e3)
+        print(
+            f"{name:<12} {timings[0]:>10.2f} {timings[1]:>10.2f}"
+            f" {timings[0] / timings[1]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--holdings", type=int, default=100)
+    args = parser.parse_args()
+    run(args.rows, args.repeat, args.holdings)
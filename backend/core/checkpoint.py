@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+from functools import cache
+from os import PathLike
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+
+from backend.models import json_codec
+
+CHECKPOINT_PATH = os.environ.get("SMART_WEALTH_CHECKPOINT_PATH", "conversations.db")
+# checkpoints kept per conversation, older ones are pruned on put
+CHECKPOINT_HISTORY = int(os.environ.get("SMART_WEALTH_CHECKPOINT_HISTORY", 10))
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """LangGraph checkpointer on a local SQLite database, so a conversation
+    (thread_id of the graph config) resumes from its stored state and clients
+    only send the new messages.
+
+    Checkpoints hold the whole graph state, so only the latest history
+    checkpoints of a conversation are kept. Async methods run the queries in a
+    worker thread.
+
+    Examples:
+        >>> graph = builder.compile(checkpointer=SqliteCheckpointSaver("conversations.db"))
+        >>> graph.invoke(
+        ...     {"messages": [HumanMessage("Hi")]},
+        ...     {"configurable": {"thread_id": conversation_id}},
+        ... )
+    """
+
+    def __init__(
+        self,
+        db_path: PathLike | str = CHECKPOINT_PATH,
+        history: Optional[int] = CHECKPOINT_HISTORY,
+    ):
+        super().__init__()
+        self.db_path = db_path
+        self.history = history
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._initialize()
+
+    def _initialize(self):
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT,
+                    type TEXT NOT NULL,
+                    checkpoint BLOB NOT NULL,
+                    metadata TEXT NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                )
+                """)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL DEFAULT '',
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    task_path TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                )
+                """)
+
+    def _tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        row: tuple[str, Optional[str], str, bytes, str],
+    ) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata = row
+        with self._lock:
+            writes = self._connection.execute(
+                "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ?"
+                " AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=json_codec.loads(metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """The checkpoint of the config, the latest of the thread without a
+        checkpoint_id"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata"
+            " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        parameters = [thread_id, checkpoint_ns]
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            parameters.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._connection.execute(query, parameters).fetchone()
+        if row is None:
+            return None
+        return self._tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Checkpoints of the config's thread (or of all threads), latest first"""
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+            " type, checkpoint, metadata FROM checkpoints"
+        )
+        conditions, parameters = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            parameters.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                conditions.append("checkpoint_ns = ?")
+                parameters.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                parameters.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            parameters.append(before_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            checkpoint_tuple = self._tuple(thread_id, checkpoint_ns, tuple(row))
+            if filter and any(
+                checkpoint_tuple.metadata.get(key) != value
+                for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store the checkpoint and prune the thread to its latest history
+        checkpoints"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns,"
+                " checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    json_codec.dumps(
+                        get_serializable_checkpoint_metadata(config, metadata)
+                    ),
+                ),
+            )
+            if self.history:
+                self._prune(thread_id, checkpoint_ns)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        row = self._connection.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?"
+            " AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.history - 1),
+        ).fetchone()
+        if row is None:
+            return
+        for table in ("checkpoints", "writes"):
+            self._connection.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ?"
+                " AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, row[0]),
+            )
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task. Special writes (errors, interrupts)
+        replace previous ones, regular writes are stored once."""
+        configurable = config["configurable"]
+        verb = (
+            "INSERT OR REPLACE"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "INSERT OR IGNORE"
+        )
+        rows = [
+            (
+                configurable["thread_id"],
+                configurable.get("checkpoint_ns", ""),
+                configurable["checkpoint_id"],
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+                task_path,
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id,"
+                " task_id, idx, channel, type, value, task_path)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Drop the checkpoints of a conversation"""
+        with self._lock, self._connection:
+            for table in ("checkpoints", "writes"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Monotonic channel versions, as strings so they sort like numbers"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+@cache
+def get_checkpointer() -> SqliteCheckpointSaver:
+    """Process wide conversation checkpointer at SMART_WEALTH_CHECKPOINT_PATH"""
+    return SqliteCheckpointSaver(CHECKPOINT_PATH)
@@ -5,6 +5,8 @@ from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import AzureChatOpenAI
 
+from backend.core.single_flight import coalesce_tool
+
 OPENAI_CHAT_MODEL_DEPLOYMENT = os.environ["OPENAI_CHAT_MODEL_DEPLOYMENT"]
 OPENAI_API_VERSION = os.environ["OPENAI_API_VERSION"]
 
@@ -17,7 +19,8 @@ class Agent:
         system_prompt: str,
     ) -> None:
         self.name = name
-        self.tools = tools if tools else []
+        # identical concurrent tool calls, e.g. of parallel agents, run once
+        self.tools = [coalesce_tool(tool) for tool in tools] if tools else []
         self.system_prompt = system_prompt
 
         self.llm = AzureChatOpenAI(
@@ -1,5 +1,4 @@
 import os
-import operator
 from typing import Annotated, Sequence, TypedDict
 import functools
 from pydantic import BaseModel
@@ -12,10 +11,13 @@ load_dotenv()
 
 from langgraph.channels.context import Context
 from langchain_core.messages import BaseMessage, AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph, START
+from langgraph.graph.message import add_messages
 from langchain_openai import AzureChatOpenAI
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langgraph.prebuilt import ToolNode
+from langgraph.types import Send
 
 from backend.core.finance_agents_network.agents.principal_agent import PrincipalAgent
 from backend.core.finance_agents_network.agents.investor_agent import InvestorAgent
@@ -25,14 +27,24 @@ from backend.core.finance_agents_network.agents.personal_finance_agent import (
 from backend.core.finance_agents_network.agents.market_analyzer_agent import (
     MarketAnalyzerAgent,
 )
+from backend.core.finance_agents_network.router import (
+    FAST_ROUTER_ENABLED,
+    FastRouter,
+)
 from backend.core.finance_agents_network.prompts import (
     market_analyzer_prompt,
     investor_prompt,
     personal_finance_prompt,
 )
+from backend.vector_stores.tokens import trim_messages
 
 OPENAI_CHAT_MODEL_DEPLOYMENT = os.environ["OPENAI_CHAT_MODEL_DEPLOYMENT"]
 OPENAI_API_VERSION = os.environ["OPENAI_API_VERSION"]
+OPENAI_CHAT_MODEL_NAME = os.environ.get("OPENAI_CHAT_MODEL_NAME", "gpt-4o")
+CHAT_HISTORY_TOKEN_LIMIT = int(os.environ.get("SMART_WEALTH_CHAT_HISTORY_TOKENS", 6000))
+PARALLEL_AGENTS_ENABLED = os.environ.get(
+    "SMART_WEALTH_PARALLEL_AGENTS", "true"
+).lower() in ("1", "true", "yes")
 
 
 class AgentContext(BaseModel):
@@ -57,16 +69,51 @@ def get_agent_context(config):
         pass
 
 
+def last_value(current, update):
+    return update
+
+
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]
+    # appended, the whole conversation is stored, see AgentsNetwork.model_input
+    messages: Annotated[Sequence[BaseMessage], add_messages]
     context: Annotated[AgentContext, Context(get_agent_context)]
-    next: str
+    # written by every agent of a parallel dispatch, the last one is kept
+    next: Annotated[str, last_value]
+    # agents dispatched together by the supervisor
+    agents: list[str]
 
 
 class AgentsNetwork:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        fast_router: bool = FAST_ROUTER_ENABLED,
+        embed_texts=None,
+        parallel_agents: bool = PARALLEL_AGENTS_ENABLED,
+        history_tokens: int = CHAT_HISTORY_TOKEN_LIMIT,
+    ) -> None:
+        """
+        Args:
+        ------
+        fast_router: bool
+            Route locally with FastRouter, the supervisor LLM only decides when
+            the router is not confident. SMART_WEALTH_FAST_ROUTER by default.
+        embed_texts: Callable[[list[str]], list[Sequence[float]]], optional
+            Embeds texts for the fast router classifier, only the keyword
+            rules are used without it
+        parallel_agents: bool
+            Let the supervisor dispatch several independent agents in one step,
+            they run concurrently and their messages are joined before the next
+            routing decision. SMART_WEALTH_PARALLEL_AGENTS by default.
+        history_tokens: int
+            Token budget of the conversation sent to the agents and the
+            supervisor LLM. SMART_WEALTH_CHAT_HISTORY_TOKENS by default.
+        """
         self.agents = {}
         self.graph = None
+        self.fast_router = fast_router
+        self.embed_texts = embed_texts
+        self.parallel_agents = parallel_agents
+        self.history_tokens = history_tokens
         self.llm = AzureChatOpenAI(
             azure_deployment=OPENAI_CHAT_MODEL_DEPLOYMENT,
             api_version=OPENAI_API_VERSION,
@@ -80,8 +127,8 @@ class AgentsNetwork:
         agent_instance = agent_class(name, system_prompt)
         self.agents[name] = agent_instance
 
-    def agent_node(self, state, agent, name):
-        result = agent.invoke(state)
+    @staticmethod
+    def agent_result(result, name):
         if isinstance(result, ToolMessage):
             pass
         else:
@@ -91,14 +138,52 @@ class AgentsNetwork:
             "next": name,
         }
 
+    def model_input(self, state):
+        """State with the oldest messages dropped beyond history_tokens. Only
+        the model input is trimmed, the stored conversation keeps them."""
+        messages = trim_messages(
+            state["messages"], OPENAI_CHAT_MODEL_NAME, self.history_tokens
+        )
+        if len(messages) == len(state["messages"]):
+            return state
+        return {**state, "messages": messages}
+
+    def agent_node(self, state, agent, name):
+        return self.agent_result(agent.invoke(self.model_input(state)), name)
+
+    async def aagent_node(self, state, agent, name):
+        return self.agent_result(await agent.ainvoke(self.model_input(state)), name)
+
     def create_chain(self, prompt, function_def: dict):
         agent_chain = (
-            prompt
+            RunnableLambda(self.model_input)
+            | prompt
             | self.llm.bind_functions(functions=[function_def], function_call="route")
             | JsonOutputFunctionsParser()
+            | RunnableLambda(self.supervisor_result)
         )
         return agent_chain
 
+    def supervisor_result(self, result: dict) -> dict:
+        """next and the known agents to dispatch together. agents is always
+        written, so a decision never reuses the agents of a previous one."""
+        agents = list(
+            dict.fromkeys(
+                agent for agent in result.get("agents") or [] if agent in self.agents
+            )
+        )
+        if len(agents) > 1:
+            return {"next": agents[0], "agents": agents}
+        return {"next": result["next"], "agents": []}
+
+    def dispatch(self, state) -> str | list[Send]:
+        """Next hop of the supervisor: the agents to dispatch, run concurrently
+        in the same step, or the single next agent (or FINISH)"""
+        agents = state.get("agents") or []
+        if self.parallel_agents and len(agents) > 1:
+            return [Send(agent, state) for agent in agents]
+        return state["next"]
+
     @staticmethod
     def router(
         state,
@@ -110,22 +195,39 @@ class AgentsNetwork:
             return "call_tool"
         return "continue"
 
-    def create_agent_network(self):
+    def create_agent_network(self, checkpointer=None):
+        """Compile the agent network. With a checkpointer (e.g.
+        SqliteCheckpointSaver) the state of every conversation (thread_id of
+        the graph config) is stored, and a run continues it."""
         self.graph = StateGraph(AgentState)
 
         self.tools = []
         for agent_name, agent_instance in self.agents.items():
             agent = agent_instance.create_agent()
-            node = functools.partial(self.agent_node, agent=agent, name=agent_name)
+            # sync and async implementations, for graph.stream and graph.astream
+            node = RunnableLambda(
+                functools.partial(self.agent_node, agent=agent, name=agent_name),
+                afunc=functools.partial(self.aagent_node, agent=agent, name=agent_name),
+                name=agent_name,
+            )
             self.graph.add_node(agent_name, node)
             self.tools.extend(agent_instance.tools)
         tool_node = ToolNode(self.tools)
         self.graph.add_node("call_tool", tool_node)
 
-        principal_agent = PrincipalAgent("PrincipalAgent", list(self.agents.keys()))
+        principal_agent = PrincipalAgent(
+            "PrincipalAgent", list(self.agents.keys()), parallel=self.parallel_agents
+        )
         supervisor_chain = self.create_chain(
             principal_agent.principal_chain_prompt, principal_agent.function_def
         )
+        if self.fast_router:
+            router = FastRouter(
+                list(self.agents.keys()), supervisor_chain, self.embed_texts
+            )
+            supervisor_chain = RunnableLambda(
+                router.route, afunc=router.aroute, name=principal_agent.name
+            )
         self.graph.add_node(principal_agent.name, supervisor_chain)
 
         self.graph.add_conditional_edges(
@@ -157,10 +259,10 @@ class AgentsNetwork:
         conditional_map = {k: k for k in self.agents.keys()}
         conditional_map["FINISH"] = END
         self.graph.add_conditional_edges(
-            "PrincipalAgent", lambda x: x["next"], conditional_map
+            "PrincipalAgent", self.dispatch, conditional_map
         )
 
-        agent_network = self.graph.compile()
+        agent_network = self.graph.compile(checkpointer=checkpointer)
         return agent_network
 
 
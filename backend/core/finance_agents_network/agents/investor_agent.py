@@ -1,20 +1,42 @@
+import asyncio
+import logging
 import os
 from enum import Enum
+from functools import cache
 import json
-from collections import defaultdict
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.tools import tool
 from langchain_openai import AzureChatOpenAI
 
 from backend.core.finance_agents_network.agent import Agent
-from backend.document_loader.nse_document_loader import NseIndexLoader
+from backend.core.finance_agents_network.company_analysis import CompanyAnalysisEngine
+from backend.core.tool_cache import get_tool_result_cache
+from backend.core.finance_agents_network.search_queries import get_search_queries
+from backend.document_loader.ticker_index import get_ticker_index
+from backend.mongo_store.rank_store import get_rank_store
 from backend.vector_stores.azure_cosmos_db import AzureCosmosVectorStore
+from backend.vector_stores.company_index import CompanyIndex
+from backend.vector_stores.federated_search import ContainerSearch, FederatedSearch
+
+logger = logging.getLogger(__name__)
 
 OPENAI_CHAT_MODEL_DEPLOYMENT = os.environ["OPENAI_CHAT_MODEL_DEPLOYMENT"]
 OPENAI_API_VERSION = os.environ["OPENAI_API_VERSION"]
 
 
+@cache
+def get_stock_allocation_llm() -> AzureChatOpenAI:
+    return AzureChatOpenAI(
+        azure_deployment=OPENAI_CHAT_MODEL_DEPLOYMENT,
+        api_version=OPENAI_API_VERSION,
+        temperature=0,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+    )
+
+
 class InvestmentPeriod(Enum):
     SHORT_TERM = "short-term"
     MID_TERM = "mid-term"
@@ -55,9 +77,34 @@ class InvestorAgent(Agent):
     expert_news_attributes = ["Financials", "Market Trend"]
     stock_news_vector_store = AzureCosmosVectorStore(
         database_name="smart-wealth-main-db", container_name="stock-news"
-    )
+    ).coalesce_calls()
     expert_news_vector_store = AzureCosmosVectorStore(
         database_name="smart-wealth-main-db", container_name="expert-news"
+    ).coalesce_calls()
+    mutual_fund_vector_store = AzureCosmosVectorStore(
+        database_name="smart-wealth-main-db", container_name="mutual-fund"
+    ).coalesce_calls()
+    federated_search = FederatedSearch(
+        {
+            "stock-news": ContainerSearch(
+                stock_news_vector_store,
+                top_k=3,
+                threshold=0.3,
+                company_index=CompanyIndex(stock_news_vector_store),
+            ),
+            "expert-news": ContainerSearch(
+                expert_news_vector_store,
+                top_k=3,
+                threshold=0.3,
+                company_index=CompanyIndex(expert_news_vector_store),
+            ),
+        }
+    )
+    company_analysis = CompanyAnalysisEngine(
+        federated_search,
+        {"stock-news": stock_news_attributes, "expert-news": expert_news_attributes},
+        rank_lookup=lambda companies: get_rank_store().get_companies(companies),
+        result_cache=get_tool_result_cache(),
     )
 
     def __init__(self, name: str, system_prompt: str) -> None:
@@ -70,81 +117,14 @@ class InvestorAgent(Agent):
 
     @staticmethod
     def get_search_queries(company: str, search_attributes: list) -> list:
-        return [
-            f"Documents having news related to {attribute} of {company}"
-            for attribute in search_attributes
-        ]
+        return get_search_queries(company, search_attributes)
 
     @staticmethod
     def get_company_analysis(company_list: list) -> list:
         """
-        Get news summaries and expert analysis for the provided list of companies.
+        Get news summaries, expert analysis and rank data for the provided list of companies.
         """
-        combined_analysis = defaultdict(
-            lambda: {
-                "sector": set(),
-                "news_summary": set(),
-                "segments": set(),
-                "analysis_summary": set(),
-            }
-        )
-
-        for company in company_list:
-            company_name = company["company"]
-            print(f"Processing analysis for company: {company_name}")
-
-            # Get news summaries
-            search_queries_news = InvestorAgent.get_search_queries(
-                company_name, InvestorAgent.stock_news_attributes
-            )
-            for query in search_queries_news:
-                print("News query----->>", query)
-                search_results_news = (
-                    InvestorAgent.stock_news_vector_store.vector_search(
-                        query, top_k=3, threshold=0.3, with_embeddings=False
-                    )
-                )
-                for res in search_results_news:
-                    combined_analysis[company_name]["sector"].update(
-                        res.document.document_meta.sector
-                    )
-                    combined_analysis[company_name]["news_summary"].add(
-                        res.document.document_meta.summary
-                    )
-
-            # Get expert analysis
-            search_queries_expert = InvestorAgent.get_search_queries(
-                company_name, InvestorAgent.expert_news_attributes
-            )
-            for query in search_queries_expert:
-                print("Expert Analysis query----->>", query)
-                search_results_expert = (
-                    InvestorAgent.expert_news_vector_store.vector_search(
-                        query, top_k=3, threshold=0.3, with_embeddings=False
-                    )
-                )
-                for res in search_results_expert:
-                    combined_analysis[company_name]["segments"].update(
-                        res.document.document_meta.segments
-                    )
-                    combined_analysis[company_name]["analysis_summary"].add(
-                        res.document.document_meta.summary
-                    )
-
-        result = [
-            {
-                "company_name": company,
-                "rank": details.get("rank", None),
-                "ticker": details.get("ticker", None),
-                "growth": details.get("growth", None),
-                "sector": list(details["sector"]),
-                "news_summary": list(details["news_summary"]),
-                "segments": list(details["segments"]),
-                "analysis_summary": list(details["analysis_summary"]),
-            }
-            for company, details in combined_analysis.items()
-        ]
-        return result
+        return InvestorAgent.company_analysis.analyze(company_list)
 
     @staticmethod
     @tool("asset_allocation", return_direct=False)
@@ -157,76 +137,69 @@ class InvestorAgent(Agent):
         mutual_funds = 0.65 * rounded_age
         gold = rounded_age - mutual_funds
 
-        print(
-            "Asset Allocation: ",
-            {"equity": equity, "mutual_funds": mutual_funds, "gold": gold},
+        logger.debug(
+            f"Asset allocation: equity {equity}, mutual funds {mutual_funds}, gold {gold}"
         )
         return {"equity": equity, "mutual_funds": mutual_funds, "gold": gold}
 
     @staticmethod
-    @tool("allocate_mutual_funds", return_direct=False)
-    def allocate_mutual_funds(top_companies: list) -> dict:
-        """
-        Provides guidance on how to allocate a portion of the portfolio across various equity funds.
-        """
+    def mutual_fund_filter(top_companies: list) -> dict:
+        """Filter of the mutual funds holding the top companies"""
         top_companies_ticker = []
-        nse_loader = NseIndexLoader()
+        ticker_index = get_ticker_index()
 
         for company in top_companies:
             company_name = company.get("company")
             if company_name:
-                ticker = nse_loader.get_ticker_from_company_name(company_name)
+                ticker = ticker_index.resolve(company_name)
                 if ticker:
                     top_companies_ticker.append(ticker)
 
-        print("Mutual Funds Allocation", top_companies_ticker)
-        investment_period = InvestmentPeriod.LONG_TERM
+        logger.debug(f"Mutual funds allocation: {top_companies_ticker}")
         risk_appetite = RiskAppetite.MODERATE
+        return {
+            "document_meta.scheme_riskometer": {"ilike": risk_appetite.value},
+            "document_meta.tickers": {"in": top_companies_ticker},
+        }
 
-        if isinstance(investment_period, InvestmentPeriod) and isinstance(
-            risk_appetite, RiskAppetite
-        ):
-            fund_type = InvestorAgent.funds[investment_period][risk_appetite]
-            mutual_fund_vector_store = AzureCosmosVectorStore(
-                database_name="smart-wealth-main-db", container_name="mutual-fund"
+    @staticmethod
+    def mutual_fund_results(response: list) -> str:
+        fund_json_list = []
+        for document in response:
+            meta = document.document_meta
+            fund_json_list.append(
+                {
+                    "fund_name": meta.fund_name,
+                    "investment_objective": meta.investment_objective,
+                    "tickers": meta.tickers,
+                    "scheme_riskometer": meta.scheme_riskometer,
+                    "portfolio": meta.portfolio,
+                    "minimum_investment_amount": meta.minimum_investment_amount,
+                }
             )
-            filter = {
-                "document_meta.scheme_riskometer": {"ilike": risk_appetite.value},
-                "document_meta.tickers": {"in": top_companies_ticker},
-            }
-            response = mutual_fund_vector_store.filter_documents(filters=filter)
-
-            fund_json_list = []
-            for document in response:
-                meta = document.document_meta
-                fund_json_list.append(
-                    {
-                        "fund_name": meta.fund_name,
-                        "investment_objective": meta.investment_objective,
-                        "tickers": meta.tickers,
-                        "scheme_riskometer": meta.scheme_riskometer,
-                        "portfolio": meta.portfolio,
-                        "minimum_investment_amount": meta.minimum_investment_amount,
-                    }
-                )
-            return json.dumps(fund_json_list[:5], indent=4)
+        return json.dumps(fund_json_list[:5], indent=4)
 
     @staticmethod
-    @tool("allocate_stocks", return_direct=False)
-    def allocate_stocks(age, risk_tolerance, investment_period, top_companies) -> dict:
+    @tool("allocate_mutual_funds", return_direct=False)
+    def allocate_mutual_funds(top_companies: list) -> dict:
         """
-        Allocates the investment balance among selected stocks based on their expected returns and user Account balance
+        Provides guidance on how to allocate a portion of the portfolio across various equity funds.
         """
-        print(
-            "Stock allocation: ", age, risk_tolerance, investment_period, top_companies
+        filter = InvestorAgent.mutual_fund_filter(top_companies)
+        response = InvestorAgent.mutual_fund_vector_store.filter_documents(
+            filters=filter
         )
+        return InvestorAgent.mutual_fund_results(response)
+
+    @staticmethod
+    def stock_allocation_messages(
+        age, risk_tolerance, investment_period, top_companies_summary
+    ) -> list:
         personal_details = {
             "age": age,
             "risk_tolerance": risk_tolerance,
             "investment_period": investment_period,
         }
-        top_companies_summary = InvestorAgent.get_company_analysis(top_companies)
-
         prompt = f"""You are a financial advisor, and you have a list of well-performing companies filtered by a clustering algorithm. Each company comes with relevant financial news such as acquisitions, new product launches, new partnerships or collaborations, and financial results. Additionally, important financial ratios and data for each company are provided.
         You also have personal details of an investor, including their bank account balance, age, the risk they are willing to take, and whether they prefer short-term, mid-term, or long-term investing.
         Based on this information, recommend the best stocks to buy along with the quantities to achieve maximum returns for the investor.
@@ -252,18 +225,59 @@ class InvestorAgent(Agent):
         -Do not describe anything return only json.
 
         """
-        llm_instance = AzureChatOpenAI(
-            azure_deployment=OPENAI_CHAT_MODEL_DEPLOYMENT,
-            api_version=OPENAI_API_VERSION,
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-        )
-        messages = [
+        return [
             SystemMessage(content=prompt),
             HumanMessage(content=str(top_companies_summary)),
         ]
-        response = llm_instance.invoke(messages)
-        print("res", response)
+
+    @staticmethod
+    @tool("allocate_stocks", return_direct=False)
+    def allocate_stocks(age, risk_tolerance, investment_period, top_companies) -> dict:
+        """
+        Allocates the investment balance among selected stocks based on their expected returns and user Account balance
+        """
+        logger.debug(
+            f"Stock allocation: age {age}, risk tolerance {risk_tolerance},"
+            f" investment period {investment_period}, companies {top_companies}"
+        )
+        top_companies_summary = InvestorAgent.get_company_analysis(top_companies)
+        messages = InvestorAgent.stock_allocation_messages(
+            age, risk_tolerance, investment_period, top_companies_summary
+        )
+        response = get_stock_allocation_llm().invoke(messages)
+        logger.debug(f"Stock allocation response: {response.content}")
+        return response.content
+
+    @staticmethod
+    async def aallocate_mutual_funds(top_companies: list) -> dict:
+        # the ticker index may be loaded and resolve names over the network
+        filter = await asyncio.to_thread(
+            InvestorAgent.mutual_fund_filter, top_companies
+        )
+        response = await InvestorAgent.mutual_fund_vector_store.afilter_documents(
+            filters=filter
+        )
+        return InvestorAgent.mutual_fund_results(response)
+
+    @staticmethod
+    async def aallocate_stocks(
+        age, risk_tolerance, investment_period, top_companies
+    ) -> dict:
+        logger.debug(
+            f"Stock allocation: age {age}, risk tolerance {risk_tolerance},"
+            f" investment period {investment_period}, companies {top_companies}"
+        )
+        top_companies_summary = await asyncio.to_thread(
+            InvestorAgent.get_company_analysis, top_companies
+        )
+        messages = InvestorAgent.stock_allocation_messages(
+            age, risk_tolerance, investment_period, top_companies_summary
+        )
+        response = await get_stock_allocation_llm().ainvoke(messages)
+        logger.debug(f"Stock allocation response: {response.content}")
         return response.content
+
+
+# async implementations used by ainvoke/astream
+InvestorAgent.allocate_mutual_funds.coroutine = InvestorAgent.aallocate_mutual_funds
+InvestorAgent.allocate_stocks.coroutine = InvestorAgent.aallocate_stocks
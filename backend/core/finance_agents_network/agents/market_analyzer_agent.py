@@ -1,11 +1,26 @@
+import asyncio
+import logging
 import os
-from collections import defaultdict
-from functools import cache
+import time
+from typing import Callable, Optional
 
 from langchain_core.tools import tool
 
 from backend.core.finance_agents_network.agent import Agent
+from backend.core.finance_agents_network.search_queries import get_search_queries
+from backend.core.tool_cache import get_tool_result_cache
+from backend.models.documents import LazyResponseDocument
 from backend.vector_stores.azure_cosmos_db import AzureCosmosVectorStore
+from backend.vector_stores.company_index import CompanyIndex
+from backend.vector_stores.federated_search import ContainerSearch, FederatedSearch
+
+logger = logging.getLogger(__name__)
+
+# maximum number of concurrent searches of the market analyzer. The searches of
+# all tool calls, and so of all chats of the process, share this pool.
+MARKET_ANALYZER_SEARCH_CONCURRENCY = int(
+    os.environ.get("SMART_WEALTH_MARKET_ANALYZER_SEARCH_CONCURRENCY", 8)
+)
 
 
 class MarketAnalyzerAgent(Agent):
@@ -18,9 +33,26 @@ class MarketAnalyzerAgent(Agent):
     expert_news_attributes = ["Financials", "Market Trends"]
     stock_news_vector_store = AzureCosmosVectorStore(
         database_name="smart-wealth-main-db", container_name="stock-news"
-    )
+    ).coalesce_calls()
     expert_news_vector_store = AzureCosmosVectorStore(
         database_name="smart-wealth-main-db", container_name="expert-news"
+    ).coalesce_calls()
+    federated_search = FederatedSearch(
+        {
+            "stock-news": ContainerSearch(
+                stock_news_vector_store,
+                top_k=3,
+                threshold=0.3,
+                company_index=CompanyIndex(stock_news_vector_store),
+            ),
+            "expert-news": ContainerSearch(
+                expert_news_vector_store,
+                top_k=3,
+                threshold=0.3,
+                company_index=CompanyIndex(expert_news_vector_store),
+            ),
+        },
+        max_workers=MARKET_ANALYZER_SEARCH_CONCURRENCY,
     )
 
     def __init__(self, name: str, system_prompt: str) -> None:
@@ -31,12 +63,121 @@ class MarketAnalyzerAgent(Agent):
         super().__init__(name, tools, system_prompt)
 
     @staticmethod
-    @cache
     def get_search_queries(company: str, search_attributes: list) -> list:
-        return [
-            f"Documents having news related to {attribute} of {company}"
-            for attribute in search_attributes
+        return get_search_queries(company, search_attributes)
+
+    @staticmethod
+    def search_companies(
+        tool_name: str,
+        company_list: list,
+        container: str,
+        search_attributes: list,
+    ) -> dict[str, list[LazyResponseDocument]]:
+        """Search results of every company, in the order of its queries. All the
+        queries of all companies are searched concurrently on the shared search
+        pool, at most MARKET_ANALYZER_SEARCH_CONCURRENCY at a time across all
+        tool calls."""
+        start = time.perf_counter()
+        companies = list(dict.fromkeys(company_list))
+        searches = [
+            (company, query)
+            for company in companies
+            for query in MarketAnalyzerAgent.get_search_queries(
+                company, search_attributes
+            )
         ]
+        search_results = MarketAnalyzerAgent.federated_search.search_many(
+            [(query, [container]) for _, query in searches],
+            companies=[company for company, _ in searches],
+        )
+
+        company_results = {company: [] for company in companies}
+        for (company, _), search_result in zip(searches, search_results):
+            company_results[company].extend(search_result.results[container])
+        logger.info(
+            f"{tool_name}: {len(searches)} searches for {len(companies)} companies"
+            f" in {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return company_results
+
+    @staticmethod
+    def news_articles(
+        company_results: dict[str, list[LazyResponseDocument]],
+    ) -> dict[str, Optional[dict]]:
+        """Sectors and news summaries of every company, deduplicated in the order
+        of the search results. None for companies without results."""
+        return {
+            company: (
+                {
+                    "company_name": company,
+                    "sector": list(
+                        dict.fromkeys(
+                            res.get("document_meta.sector") for res in results
+                        )
+                    ),
+                    "news_summary": list(
+                        dict.fromkeys(
+                            res.get("document_meta.summary") for res in results
+                        )
+                    ),
+                }
+                if results
+                else None
+            )
+            for company, results in company_results.items()
+        }
+
+    @staticmethod
+    def expert_analysis(
+        company_results: dict[str, list[LazyResponseDocument]],
+    ) -> dict[str, Optional[dict]]:
+        """Segments and analysis summaries of every company, deduplicated in the
+        order of the search results. None for companies without results."""
+        return {
+            company: (
+                {
+                    "company_name": company,
+                    "segments": list(
+                        dict.fromkeys(
+                            segment
+                            for res in results
+                            for segment in res.get("document_meta.segments") or []
+                        )
+                    ),
+                    "analysis_summary": list(
+                        dict.fromkeys(
+                            res.get("document_meta.summary") for res in results
+                        )
+                    ),
+                }
+                if results
+                else None
+            )
+            for company, results in company_results.items()
+        }
+
+    @staticmethod
+    def cached_tool_result(
+        tool_name: str,
+        company_list: list,
+        container: str,
+        search_attributes: list,
+        summarize: Callable[[dict[str, list[LazyResponseDocument]]], dict],
+    ) -> list:
+        """Tool result of the companies, searching only the companies without a
+        fresh result in the tool result cache"""
+        companies = list(dict.fromkeys(company_list))
+        results = get_tool_result_cache().get_or_compute(
+            tool_name,
+            companies,
+            search_attributes,
+            lambda missing: summarize(
+                MarketAnalyzerAgent.search_companies(
+                    tool_name, missing, container, search_attributes
+                )
+            ),
+        )
+        return [results[company] for company in companies if results.get(company)]
 
     @staticmethod
     @tool("get_news_articles", return_direct=False)
@@ -44,33 +185,13 @@ class MarketAnalyzerAgent(Agent):
         """
         Get news summaries for the provided list of companies.
         """
-        news_articles = defaultdict(lambda: {"sector": set(), "news_summary": set()})
-        for company in company_list:
-            search_queries = MarketAnalyzerAgent.get_search_queries(
-                company, MarketAnalyzerAgent.stock_news_attributes
-            )
-            for query in search_queries:
-                search_results = (
-                    MarketAnalyzerAgent.stock_news_vector_store.vector_search(
-                        query, top_k=3, threshold=0.3, with_embeddings=False
-                    )
-                )
-                for res in search_results:
-                    news_articles[company]["sector"].update(
-                        res.document.document_meta.sector
-                    )
-                    news_articles[company]["news_summary"].add(
-                        res.document.document_meta.summary
-                    )
-
-        return [
-            {
-                "company_name": company,
-                "sector": list(news["sector"]),
-                "news_summary": list(news["news_summary"]),
-            }
-            for company, news in news_articles.items()
-        ]
+        return MarketAnalyzerAgent.cached_tool_result(
+            "get_news_articles",
+            company_list,
+            "stock-news",
+            MarketAnalyzerAgent.stock_news_attributes,
+            MarketAnalyzerAgent.news_articles,
+        )
 
     @staticmethod
     @tool("get_expert_analysis", return_direct=False)
@@ -78,32 +199,39 @@ class MarketAnalyzerAgent(Agent):
         """
         Get expert analysis for the provided list of companies.
         """
-        expert_analysis = defaultdict(
-            lambda: {"segments": set(), "analysis_summary": set()}
+        return MarketAnalyzerAgent.cached_tool_result(
+            "get_expert_analysis",
+            company_list,
+            "expert-news",
+            MarketAnalyzerAgent.expert_news_attributes,
+            MarketAnalyzerAgent.expert_analysis,
         )
-        for company in company_list:
-            search_queries = MarketAnalyzerAgent.get_search_queries(
-                company, MarketAnalyzerAgent.expert_news_attributes
-            )
-            for query in search_queries:
-                search_results = (
-                    MarketAnalyzerAgent.expert_news_vector_store.vector_search(
-                        query, top_k=3, threshold=0.3, with_embeddings=False
-                    )
-                )
-                for res in search_results:
-                    expert_analysis[company]["segments"].update(
-                        res.document.document_meta.segments
-                    )
-                    expert_analysis[company]["analysis_summary"].add(
-                        res.document.document_meta.summary
-                    )
-
-        return [
-            {
-                "company_name": company,
-                "segments": list(news["segments"]),
-                "analysis_summary": list(news["analysis_summary"]),
-            }
-            for company, news in expert_analysis.items()
-        ]
+
+    @staticmethod
+    async def aget_news_articles(company_list: list) -> list:
+        return await asyncio.to_thread(
+            MarketAnalyzerAgent.cached_tool_result,
+            "get_news_articles",
+            company_list,
+            "stock-news",
+            MarketAnalyzerAgent.stock_news_attributes,
+            MarketAnalyzerAgent.news_articles,
+        )
+
+    @staticmethod
+    async def aget_expert_analysis(company_list: list) -> list:
+        return await asyncio.to_thread(
+            MarketAnalyzerAgent.cached_tool_result,
+            "get_expert_analysis",
+            company_list,
+            "expert-news",
+            MarketAnalyzerAgent.expert_news_attributes,
+            MarketAnalyzerAgent.expert_analysis,
+        )
+
+
+# async implementations used by ainvoke/astream
+MarketAnalyzerAgent.get_news_articles.coroutine = MarketAnalyzerAgent.aget_news_articles
+MarketAnalyzerAgent.get_expert_analysis.coroutine = (
+    MarketAnalyzerAgent.aget_expert_analysis
+)
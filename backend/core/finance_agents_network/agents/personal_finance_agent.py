@@ -1,19 +1,32 @@
 from langchain_core.tools import tool
 
 from backend.core.finance_agents_network.agent import Agent
-from backend.models.documents.website_document import WebsiteDocument
+from backend.models.documents import LazyResponseDocument
 from backend.vector_stores.bob_web_db import BobWebVectorStore
 
 
 class PersonalFinanceAgent(Agent):
     vector_store = BobWebVectorStore(
         database_name="smart-wealth-main-db", container_name="bob-web"
-    )
+    ).coalesce_calls()
 
     def __init__(self, name: str, system_prompt: str) -> None:
         tools = [self.search_loan_documents, self.search_insurance_documents]
         super().__init__(name, tools, system_prompt)
 
+    @staticmethod
+    def page_results(documents: list[LazyResponseDocument]) -> list[dict[str, str]]:
+        """Title, description and content of the website pages, read from the
+        rows without building the documents"""
+        return [
+            {
+                "page_title": doc.get("document_meta.title"),
+                "page_description": doc.get("document_meta.description"),
+                "page_content": doc.get("page_content"),
+            }
+            for doc in documents
+        ]
+
     @staticmethod
     @tool("search_loan_documents", return_direct=False)
     def search_loan_documents(query: str) -> list[dict[str, str]]:
@@ -27,18 +40,7 @@ class PersonalFinanceAgent(Agent):
             with_embeddings=False,
             doc_type="loan",
         )
-        results = []
-        for doc in loan_documents:
-            assert isinstance(doc.document, WebsiteDocument)
-            results.append(
-                {
-                    "page_title": doc.document.document_meta.title,
-                    "page_description": doc.document.document_meta.description,
-                    "page_content": doc.document.page_content,
-                }
-            )
-
-        return results
+        return PersonalFinanceAgent.page_results(loan_documents)
 
     @staticmethod
     @tool("search_insurance_documents", return_direct=False)
@@ -53,15 +55,35 @@ class PersonalFinanceAgent(Agent):
             with_embeddings=False,
             doc_type="insurance",
         )
-        results = []
-        for doc in insurance_documents:
-            assert isinstance(doc.document, WebsiteDocument)
-            results.append(
-                {
-                    "page_title": doc.document.document_meta.title,
-                    "page_description": doc.document.document_meta.description,
-                    "page_content": doc.document.page_content,
-                }
-            )
+        return PersonalFinanceAgent.page_results(insurance_documents)
+
+    @staticmethod
+    async def asearch_loan_documents(query: str) -> list[dict[str, str]]:
+        loan_documents = await PersonalFinanceAgent.vector_store.avector_search(
+            query,
+            top_k=3,
+            threshold=0.3,
+            with_embeddings=False,
+            doc_type="loan",
+        )
+        return PersonalFinanceAgent.page_results(loan_documents)
+
+    @staticmethod
+    async def asearch_insurance_documents(query: str) -> list[dict[str, str]]:
+        insurance_documents = await PersonalFinanceAgent.vector_store.avector_search(
+            query,
+            top_k=3,
+            threshold=0.3,
+            with_embeddings=False,
+            doc_type="insurance",
+        )
+        return PersonalFinanceAgent.page_results(insurance_documents)
+
 
-        return results
+# async implementations used by ainvoke/astream
+PersonalFinanceAgent.search_loan_documents.coroutine = (
+    PersonalFinanceAgent.asearch_loan_documents
+)
+PersonalFinanceAgent.search_insurance_documents.coroutine = (
+    PersonalFinanceAgent.asearch_insurance_documents
+)
@@ -4,7 +4,7 @@ from backend.core.finance_agents_network.agent import Agent
 
 
 class PrincipalAgent(Agent):
-    def __init__(self, name: str, options: list) -> None:
+    def __init__(self, name: str, options: list, parallel: bool = False) -> None:
         self.tools = []
         self.options = ["FINISH"] + options
         self.members = ", ".join(options)
@@ -22,6 +22,12 @@ class PrincipalAgent(Agent):
             " END the conversation when all the workers have finished their tasks. Do not give any worker the same task twice."
             " Whenever the user asks for a financial advice, you should pass the conversation to InvestorAgent."
         ).format(members=self.members)
+        if parallel:
+            self.system_prompt += (
+                " When the request needs several workers whose tasks do not depend on"
+                " each other's results, list all of them in agents so they work at the"
+                " same time."
+            )
 
         self.function_def = {
             "name": "route",
@@ -38,6 +44,14 @@ class PrincipalAgent(Agent):
                 "required": ["next"],
             },
         }
+        if parallel:
+            self.function_def["parameters"]["properties"]["agents"] = {
+                "title": "Agents",
+                "description": "Workers to act next at the same time, when their"
+                " tasks are independent",
+                "type": "array",
+                "items": {"enum": options},
+            }
 
         self.principal_chain_prompt = ChatPromptTemplate.from_messages(
             [
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from langchain_core.runnables import ensure_config
+
+from backend.core.finance_agents_network.search_queries import get_search_queries
+from backend.core.tool_cache import ToolResultCache
+from backend.models.documents import LazyResponseDocument
+from backend.vector_stores.federated_search import FederatedSearch
+
+logger = logging.getLogger(__name__)
+
+COMPANY_ANALYSIS_TTL = float(os.environ.get("SMART_WEALTH_COMPANY_ANALYSIS_TTL", 900))
+RANK_FIELDS = ("rank", "ticker", "growth")
+COMPANY_ANALYSIS_TOOL = "get_company_analysis"
+
+
+def current_chat_id() -> Optional[str]:
+    """chat_id of the configurable of the running graph, None outside a chat.
+    Tools read it from the runnable config propagated by langchain."""
+    return ensure_config().get("configurable", {}).get("chat_id")
+
+
+class CompanyAnalysisEngine:
+    """News and expert analysis of companies, joined with their rank data.
+
+    All the searches of an analysis run concurrently on the federated search.
+    Search results are shared by the tool calls of a chat (identified by the
+    chat_id of the graph config, the conversation), so a query is searched once
+    per chat within ttl_seconds, and the search-derived fields are cached per
+    company, in the result_cache if given (shared by the workers and
+    invalidated on ingestion) or in memory for ttl_seconds. Rank data is never cached, it is joined on every call.
+
+    Examples:
+        >>> engine = CompanyAnalysisEngine(
+        ...     federated_search,
+        ...     {"stock-news": ["Financial results"], "expert-news": ["Financials"]},
+        ...     rank_lookup=get_rank_store().get_companies,
+        ... )
+        >>> engine.analyze([{"company": "Tata Consultancy Services", "rank": 1}])
+        [{"company_name": "Tata Consultancy Services", "rank": 1, ...}]
+    """
+
+    def __init__(
+        self,
+        federated_search: FederatedSearch,
+        search_attributes: dict[str, Sequence[str]],
+        rank_lookup: Optional[Callable[[list[str]], list[dict[str, Any]]]] = None,
+        ttl_seconds: Optional[float] = COMPANY_ANALYSIS_TTL,
+        result_cache: Optional[ToolResultCache] = None,
+    ):
+        self.federated_search = federated_search
+        self.search_attributes = search_attributes
+        self.rank_lookup = rank_lookup
+        self.ttl_seconds = ttl_seconds
+        self.result_cache = result_cache
+        self._analyses: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._chat_searches: dict[
+            str, tuple[float, dict[tuple[str, str], list[LazyResponseDocument]]]
+        ] = {}
+        self._lock = threading.Lock()
+
+    def analyze(
+        self, companies: Iterable[dict[str, Any] | str]
+    ) -> list[dict[str, Any]]:
+        """Analysis of every company, in order and without duplicates
+
+        Args:
+        ------
+        companies: Iterable[dict[str, Any] | str]
+            Company names, or RankStore rows with a "company" key whose rank,
+            ticker and growth are used as is
+
+        Returns:
+        --------
+        analyses: list[dict[str, Any]]
+            company_name, rank, ticker, growth, sector, news_summary, segments and
+            analysis_summary of every company
+        """
+        rows = {}
+        for company in companies:
+            row = {"company": company} if isinstance(company, str) else company
+            if row.get("company"):
+                rows.setdefault(row["company"], row)
+
+        if self.result_cache is not None:
+            analyses = self.result_cache.get_or_compute(
+                COMPANY_ANALYSIS_TOOL,
+                list(rows),
+                self.search_attributes,
+                lambda missing: self._analyze([rows[name] for name in missing]),
+            )
+        else:
+            now = time.monotonic()
+            analyses = {}
+            with self._lock:
+                for name in rows:
+                    cached = self._analyses.get(name)
+                    if cached is not None and now - cached[0] < self.ttl_seconds:
+                        analyses[name] = cached[1]
+
+            missing = [name for name in rows if name not in analyses]
+            if missing:
+                computed = self._analyze([rows[name] for name in missing])
+                with self._lock:
+                    for name, analysis in computed.items():
+                        self._analyses[name] = (now, analysis)
+                analyses.update(computed)
+
+        ranks = self.ranks(list(rows.values()))
+        return [
+            {"company_name": name, **ranks[name], **analyses[name]} for name in rows
+        ]
+
+    def _analyze(self, rows: Sequence[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """Search-derived fields of the companies, see collect"""
+        names = [row["company"] for row in rows]
+        search_results = self.search(names)
+        return {name: self.collect(search_results[name]) for name in names}
+
+    def _chat_cache(
+        self, now: float
+    ) -> dict[tuple[str, str], list[LazyResponseDocument]]:
+        chat_id = current_chat_id()
+        if chat_id is None:
+            return {}
+        with self._lock:
+            for expired in [
+                key
+                for key, (used, _) in self._chat_searches.items()
+                if now - used >= self.ttl_seconds
+            ]:
+                del self._chat_searches[expired]
+            _, searches = self._chat_searches.get(chat_id, (now, {}))
+            self._chat_searches[chat_id] = (now, searches)
+        return searches
+
+    def search(
+        self, companies: Sequence[str]
+    ) -> dict[str, dict[str, list[LazyResponseDocument]]]:
+        """Search results of every company by container, in query order. Queries
+        already searched in the chat are not searched again. Containers with a
+        company index rank only the latest documents of the company."""
+        start = time.perf_counter()
+        searches = [
+            (company, container, query)
+            for company in companies
+            for container, attributes in self.search_attributes.items()
+            for query in get_search_queries(company, attributes)
+        ]
+        chat_searches = self._chat_cache(time.monotonic())
+        pending = {}
+        for company, container, query in searches:
+            if (container, query) not in chat_searches:
+                pending.setdefault((container, query), company)
+        if pending:
+            results = self.federated_search.search_many(
+                [(query, [container]) for container, query in pending],
+                companies=list(pending.values()),
+            )
+            with self._lock:
+                for (container, query), result in zip(pending, results):
+                    chat_searches[(container, query)] = result.results[container]
+
+        company_results = {
+            company: {container: [] for container in self.search_attributes}
+            for company in companies
+        }
+        for company, container, query in searches:
+            company_results[company][container].extend(
+                chat_searches[(container, query)]
+            )
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"Company analysis: {len(pending)} of {len(searches)} searches for"
+            f" {len(companies)} companies in {elapsed:.0f} ms"
+        )
+        return company_results
+
+    def ranks(self, rows: Sequence[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """rank, ticker and growth of the companies. Values of the rows are kept,
+        missing ones are looked up with rank_lookup."""
+        ranks = {
+            row["company"]: {field: row.get(field) for field in RANK_FIELDS}
+            for row in rows
+        }
+        lookup = [
+            name
+            for name, rank in ranks.items()
+            if any(value is None for value in rank.values())
+        ]
+        if lookup and self.rank_lookup is not None:
+            try:
+                found = self.rank_lookup(lookup)
+            except Exception:
+                logger.warning("Could not look up the company ranks", exc_info=True)
+                found = []
+            for row in found:
+                rank = ranks.get(row.get("company"))
+                if rank is None:
+                    continue
+                for field in RANK_FIELDS:
+                    if rank[field] is None:
+                        rank[field] = row.get(field)
+        return ranks
+
+    @staticmethod
+    def collect(results: dict[str, list[LazyResponseDocument]]) -> dict[str, list]:
+        """Sectors and news summaries of the stock news, segments and analysis
+        summaries of the expert news, deduplicated in result order"""
+        news = results.get("stock-news", [])
+        expert = results.get("expert-news", [])
+        return {
+            "sector": list(
+                dict.fromkeys(res.get("document_meta.sector") for res in news)
+            ),
+            "news_summary": list(
+                dict.fromkeys(res.get("document_meta.summary") for res in news)
+            ),
+            "segments": list(
+                dict.fromkeys(
+                    segment
+                    for res in expert
+                    for segment in res.get("document_meta.segments") or []
+                )
+            ),
+            "analysis_summary": list(
+                dict.fromkeys(res.get("document_meta.summary") for res in expert)
+            ),
+        }
+
+    def invalidate(self, company: Optional[str] = None) -> None:
+        """Drop the in memory analysis of the company, or of all companies"""
+        with self._lock:
+            if company is None:
+                self._analyses.clear()
+            else:
+                self._analyses.pop(company, None)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Callable, Iterable, Optional, Sequence
+
+from backend.core.finance_agents_network.search_queries import get_search_queries
+from backend.vector_stores.query_embedding_cache import (
+    QueryEmbeddingCache,
+    get_query_embedding_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_TOP_K_COMPANIES = int(
+    os.environ.get("SMART_WEALTH_PRECOMPUTE_TOP_K_COMPANIES", 50)
+)
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+def agent_search_attributes() -> list[list[str]]:
+    """Search attributes of the agents whose tools run templated queries"""
+    from backend.core.finance_agents_network.agents.investor_agent import (
+        InvestorAgent,
+    )
+    from backend.core.finance_agents_network.agents.market_analyzer_agent import (
+        MarketAnalyzerAgent,
+    )
+
+    return [
+        MarketAnalyzerAgent.stock_news_attributes,
+        MarketAnalyzerAgent.expert_news_attributes,
+        InvestorAgent.stock_news_attributes,
+        InvestorAgent.expert_news_attributes,
+    ]
+
+
+def top_company_names(k: int = PRECOMPUTE_TOP_K_COMPANIES) -> list[str]:
+    from backend.mongo_store.rank_store import RankStore
+
+    return [
+        company["company"]
+        for company in RankStore().get_top_k_companies(k)
+        if company.get("company")
+    ]
+
+
+def templated_queries(
+    companies: Iterable[str], search_attributes: Iterable[Sequence[str]]
+) -> list[str]:
+    """All templated search queries of the companies, without duplicates"""
+    search_attributes = list(search_attributes)
+    queries = []
+    for company in companies:
+        for attributes in search_attributes:
+            queries.extend(get_search_queries(company, attributes))
+    return list(dict.fromkeys(queries))
+
+
+def precompute_query_embeddings(
+    companies: Optional[Iterable[str]] = None,
+    search_attributes: Optional[Iterable[Sequence[str]]] = None,
+    embed_texts: Optional[Callable] = None,
+    query_embedding_cache: Optional[QueryEmbeddingCache] = None,
+    model: Optional[str] = EMBEDDING_MODEL,
+    batch_size: Optional[int] = 16,
+) -> int:
+    """Embed the templated search queries of the top ranked companies that are
+    not cached yet.
+
+    Args:
+    ------
+    companies: Optional[Iterable[str]]
+        Company names, by default the top ranked companies of the RankStore
+    search_attributes: Optional[Iterable[Sequence[str]]]
+        Attribute lists of the queries, by default those of the agents
+    embed_texts: Optional[Callable]
+        Batch embedding function, by default AzureCosmosVectorStore.embed_texts
+    query_embedding_cache: Optional[QueryEmbeddingCache]
+        The cache to fill, by default the process wide cache
+    model: Optional[str]
+        The embedding model
+    batch_size: Optional[int]
+        Number of queries per embedding request
+
+    Returns:
+    --------
+    embedded: int
+        Number of newly embedded queries
+    """
+    if companies is None:
+        companies = top_company_names()
+    if search_attributes is None:
+        search_attributes = agent_search_attributes()
+    if query_embedding_cache is None:
+        query_embedding_cache = get_query_embedding_cache()
+    if embed_texts is None:
+        from backend.core.finance_agents_network.agents.market_analyzer_agent import (
+            MarketAnalyzerAgent,
+        )
+
+        embed_texts = MarketAnalyzerAgent.stock_news_vector_store.embed_texts
+
+    queries = query_embedding_cache.missing(
+        model, templated_queries(companies, search_attributes)
+    )
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start : start + batch_size]
+        response = embed_texts(batch, model=model)
+        embeddings = sorted(response.data, key=lambda e: e.index)
+        query_embedding_cache.put_many(
+            model, [(query, e.embedding) for query, e in zip(batch, embeddings)]
+        )
+    logger.info(f"Precomputed the embeddings of {len(queries)} search queries")
+    return len(queries)
+
+
+def start_precompute_job(**kwargs) -> threading.Thread:
+    """Run precompute_query_embeddings on a background thread, logging failures"""
+
+    def run():
+        try:
+            precompute_query_embeddings(**kwargs)
+        except Exception:
+            logger.exception("Failed to precompute the search query embeddings")
+
+    thread = threading.Thread(target=run, name="query-precompute", daemon=True)
+    thread.start()
+    return thread
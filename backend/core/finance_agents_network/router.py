@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.runnables import Runnable
+
+logger = logging.getLogger(__name__)
+
+FAST_ROUTER_ENABLED = os.environ.get("SMART_WEALTH_FAST_ROUTER", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# minimum margin between the most and second most similar agent centroids
+ROUTER_CONFIDENCE_THRESHOLD = float(
+    os.environ.get("SMART_WEALTH_ROUTER_CONFIDENCE_THRESHOLD", 0.03)
+)
+FINISH = "FINISH"
+
+# keywords of the requests each agent handles, see the PrincipalAgent prompt.
+# Bare words like car, home, policy or gold are ambiguous ("Tata Motors car
+# sales", "RBI policy outlook"), they only match in phrases and are otherwise
+# left to the embedding classifier or the supervisor.
+ROUTE_KEYWORDS = {
+    "MarketAnalyzerAgent": (
+        r"\b(news|headlines?|expert|analy[sz](?:is|e)|market trends?|outlook"
+        r"|quarterly results|earnings)\b"
+    ),
+    "InvestorAgent": (
+        r"\b(invest\w*|allocat\w*|portfolio|principal|mutual funds?"
+        r"|financial advice|sip|wealth"
+        r"|buy(?:ing)? gold|gold (?:etfs?|bonds?|funds?))\b"
+    ),
+    "PersonalFinanceAgent": (
+        r"\b(loans?|insurance|emi|mortgage"
+        r"|(?:buy|buying|purchase) (?:an? |my |our )?(?:new )?"
+        r"(?:house|home|flat|vehicle|car|bike)"
+        r"|(?:term|health|life) (?:insurance )?polic(?:y|ies))\b"
+    ),
+}
+# the supervisor always asks PersonalFinanceAgent for users above 25
+AGE_PATTERN = re.compile(
+    r"\b(?:age(?: is)?|aged)\s*(\d{2})\b|\b(\d{2})\s*(?:years?|yrs?)[\s-]*old\b",
+    re.IGNORECASE,
+)
+PERSONAL_FINANCE_MIN_AGE = 25
+
+# example requests of each agent, their embedding centroids classify requests
+# the keywords do not match
+ROUTE_EXAMPLES = {
+    "MarketAnalyzerAgent": [
+        "What is the latest news about Reliance Industries?",
+        "How is Tata Consultancy Services doing?",
+        "What do experts say about the banking sector?",
+        "Tell me about recent developments at Infosys",
+    ],
+    "InvestorAgent": [
+        "Where should I put my savings?",
+        "I have one lakh rupees, what should I buy?",
+        "Which funds are good for the long term?",
+        "How do I grow my money for retirement?",
+    ],
+    "PersonalFinanceAgent": [
+        "I want to buy a flat next year",
+        "How can I finance my child's education?",
+        "What cover should I take for my family?",
+        "I need money for my wedding",
+    ],
+}
+
+
+@dataclass
+class RouteDecision:
+    """Next hop chosen by the fast router. next is None when the router is not
+    confident and the supervisor LLM decides. agents are the agents the request
+    needs, pending those that did not respond yet (dispatched together by a
+    parallel agent network)."""
+
+    next: Optional[str]
+    path: str
+    confidence: float = 1.0
+    agents: list[str] = field(default_factory=list)
+    pending: list[str] = field(default_factory=list)
+
+
+class RouterMetrics:
+    """Counts and time of the routing decisions by path (rules, embedding, llm)
+    and by next hop"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.paths: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+        self.next_hops: dict[str, int] = {}
+
+    def record(self, path: str, next: str, seconds: float) -> None:
+        with self._lock:
+            self.paths[path] = self.paths.get(path, 0) + 1
+            self.seconds[path] = self.seconds.get(path, 0.0) + seconds
+            self.next_hops[next] = self.next_hops.get(next, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            total = sum(self.paths.values())
+            return {
+                "decisions": total,
+                "paths": {
+                    path: {
+                        "count": count,
+                        "share": count / total,
+                        "mean_ms": self.seconds[path] / count * 1000,
+                    }
+                    for path, count in self.paths.items()
+                },
+                "next": dict(self.next_hops),
+            }
+
+
+router_metrics = RouterMetrics()
+
+
+def last_turn(messages: Sequence[BaseMessage]) -> tuple[Optional[str], list[str]]:
+    """Text of the last user message and names of the agents that responded
+    after it"""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            responded = [message.name for message in messages[index + 1 :]]
+            return messages[index].content, [name for name in responded if name]
+    return None, []
+
+
+class FastRouter:
+    """Chooses the next hop of the agent network locally, in place of the
+    PrincipalAgent supervisor chain.
+
+    The agents a request needs are found by keyword rules, or when none match,
+    by the agent centroid most similar to the request embedding. Agents are
+    asked in order, once per request, and the router finishes when all of them
+    responded. When no rule matches and the margin between the two most
+    similar centroids is below confidence_threshold, the supervisor decides.
+
+    Examples:
+        >>> router = FastRouter(
+        ...     ["MarketAnalyzerAgent", "InvestorAgent", "PersonalFinanceAgent"],
+        ...     supervisor_chain,
+        ...     embed_texts=embed_texts,
+        ... )
+        >>> router.route({"messages": [HumanMessage("Latest news on TCS")]})
+        {"next": "MarketAnalyzerAgent", "agents": ["MarketAnalyzerAgent"]}
+    """
+
+    def __init__(
+        self,
+        agents: Sequence[str],
+        supervisor: Runnable,
+        embed_texts: Optional[Callable[[list[str]], list[Sequence[float]]]] = None,
+        keywords: Optional[dict[str, str]] = None,
+        examples: Optional[dict[str, list[str]]] = None,
+        confidence_threshold: float = ROUTER_CONFIDENCE_THRESHOLD,
+        metrics: Optional[RouterMetrics] = None,
+    ):
+        """
+        Args:
+        ------
+        agents: Sequence[str]
+            Names of the agents, in the order they are asked
+        supervisor: Runnable
+            Supervisor chain returning {"next": ...} and optionally
+            {"agents": [...]}, used when not confident
+        embed_texts: Optional[Callable[[list[str]], list[Sequence[float]]]]
+            Embeds a batch of texts, without it only the rules are used
+        keywords: Optional[dict[str, str]]
+            Keyword pattern of each agent, by default ROUTE_KEYWORDS
+        examples: Optional[dict[str, list[str]]]
+            Example requests of each agent, by default ROUTE_EXAMPLES
+        """
+        self.agents = list(agents)
+        self.supervisor = supervisor
+        self.embed_texts = embed_texts
+        keywords = ROUTE_KEYWORDS if keywords is None else keywords
+        self.keywords = {
+            agent: re.compile(keywords[agent], re.IGNORECASE)
+            for agent in self.agents
+            if agent in keywords
+        }
+        self.examples = ROUTE_EXAMPLES if examples is None else examples
+        self.confidence_threshold = confidence_threshold
+        self.metrics = metrics or router_metrics
+        self._centroids: Optional[tuple[list[str], np.ndarray]] = None
+        self._lock = threading.Lock()
+        self._embed_request = functools.lru_cache(maxsize=1024)(self._embed)
+
+    def _embed(self, text: str) -> np.ndarray:
+        return np.asarray(self.embed_texts([text])[0], dtype=np.float64)
+
+    def centroids(self) -> tuple[list[str], np.ndarray]:
+        """Agents with examples and their normalized example centroids, embedded
+        on first use"""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    agents = [
+                        agent for agent in self.agents if self.examples.get(agent)
+                    ]
+                    texts = [text for agent in agents for text in self.examples[agent]]
+                    embeddings = np.asarray(self.embed_texts(texts), dtype=np.float64)
+                    centroids, start = [], 0
+                    for agent in agents:
+                        end = start + len(self.examples[agent])
+                        centroids.append(embeddings[start:end].mean(axis=0))
+                        start = end
+                    centroids = np.asarray(centroids)
+                    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+                    self._centroids = (agents, centroids)
+        return self._centroids
+
+    def rule_agents(self, text: str) -> list[str]:
+        """Agents whose keywords match the request, in agent order"""
+        agents = {
+            agent for agent, pattern in self.keywords.items() if pattern.search(text)
+        }
+        for match in AGE_PATTERN.finditer(text):
+            age = int(match.group(1) or match.group(2))
+            if age > PERSONAL_FINANCE_MIN_AGE:
+                agents.add("PersonalFinanceAgent")
+        return [agent for agent in self.agents if agent in agents]
+
+    def classify(self, text: str) -> tuple[list[str], str, float]:
+        """Agents the request needs, the path that found them and its confidence.
+        No agents when not confident."""
+        agents = self.rule_agents(text)
+        if agents:
+            return agents, "rules", 1.0
+        if self.embed_texts is None:
+            return [], "llm", 0.0
+
+        names, centroids = self.centroids()
+        embedding = self._embed_request(text)
+        similarities = centroids @ (embedding / np.linalg.norm(embedding))
+        order = np.argsort(similarities)[::-1]
+        margin = float(
+            similarities[order[0]] - (similarities[order[1]] if len(order) > 1 else 0)
+        )
+        if margin < self.confidence_threshold:
+            return [], "llm", margin
+        return [names[order[0]]], "embedding", margin
+
+    def decide(self, messages: Sequence[BaseMessage]) -> RouteDecision:
+        """Next hop of the conversation, next is None when the supervisor decides"""
+        text, responded = last_turn(messages)
+        if not text:
+            return RouteDecision(None, "llm", 0.0)
+        try:
+            agents, path, confidence = self.classify(text)
+        except Exception:
+            logger.warning(
+                "Fast routing failed, falling back to the supervisor", exc_info=True
+            )
+            return RouteDecision(None, "llm", 0.0)
+        if not agents:
+            return RouteDecision(None, path, confidence)
+        pending = [agent for agent in agents if agent not in responded]
+        return RouteDecision(
+            pending[0] if pending else FINISH, path, confidence, agents, pending
+        )
+
+    def _record(
+        self, decision: RouteDecision, result: dict[str, Any], start: float
+    ) -> dict[str, Any]:
+        seconds = time.perf_counter() - start
+        self.metrics.record(decision.path, result["next"], seconds)
+        logger.debug(
+            f"Route {result['next']} by {decision.path} (confidence"
+            f" {decision.confidence:.3f}, agents {decision.agents}) in"
+            f" {seconds * 1000:.0f} ms"
+        )
+        return result
+
+    @staticmethod
+    def result(decision: RouteDecision) -> dict[str, Any]:
+        return {"next": decision.next, "agents": decision.pending}
+
+    def route(self, state: dict[str, Any]) -> dict[str, Any]:
+        """{"next": ..., "agents": [...]} like the supervisor chain"""
+        start = time.perf_counter()
+        decision = self.decide(state["messages"])
+        if decision.next is not None:
+            return self._record(decision, self.result(decision), start)
+        return self._record(decision, self.supervisor.invoke(state), start)
+
+    async def aroute(self, state: dict[str, Any]) -> dict[str, Any]:
+        start = time.perf_counter()
+        # the request may be embedded, off the event loop
+        decision = await asyncio.to_thread(self.decide, state["messages"])
+        if decision.next is not None:
+            return self._record(decision, self.result(decision), start)
+        return self._record(decision, await self.supervisor.ainvoke(state), start)
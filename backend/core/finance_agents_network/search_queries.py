@@ -0,0 +1,19 @@
+from functools import cache
+from typing import Iterable
+
+SEARCH_QUERY_TEMPLATE = "Documents having news related to {attribute} of {company}"
+
+
+@cache
+def _search_queries(
+    company: str, search_attributes: tuple[str, ...]
+) -> tuple[str, ...]:
+    return tuple(
+        SEARCH_QUERY_TEMPLATE.format(attribute=attribute, company=company)
+        for attribute in search_attributes
+    )
+
+
+def get_search_queries(company: str, search_attributes: Iterable[str]) -> list[str]:
+    """Templated vector search queries of a company, one per attribute"""
+    return list(_search_queries(company, tuple(search_attributes)))
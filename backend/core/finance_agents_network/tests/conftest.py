@@ -0,0 +1,34 @@
+import importlib
+from unittest import mock
+
+import pytest
+
+from backend.core import tool_cache
+from backend.mongo_store.rank_store import RankStore
+from backend.vector_stores import azure_cosmos_db
+
+
+@pytest.fixture
+def import_agent(monkeypatch):
+    """Imports an agent module without connecting to Cosmos DB. The tests
+    replace the stores of the agent they use."""
+    monkeypatch.setattr(azure_cosmos_db, "CosmosClient", mock.MagicMock())
+    monkeypatch.setattr(tool_cache, "TOOL_CACHE_PATH", ":memory:")
+    tool_cache.get_tool_result_cache.cache_clear()
+    yield lambda name: importlib.import_module(
+        f"backend.core.finance_agents_network.agents.{name}"
+    )
+    tool_cache.get_tool_result_cache.cache_clear()
+
+
+@pytest.fixture
+def agent_network(monkeypatch):
+    """The agent network module, imported without connecting to Cosmos DB and
+    MongoDB"""
+    monkeypatch.setattr(azure_cosmos_db, "CosmosClient", mock.MagicMock())
+    monkeypatch.setattr(RankStore, "__init__", lambda self: None)
+    monkeypatch.setattr(RankStore, "get_top_k_companies", lambda self, k: [])
+    monkeypatch.setattr(tool_cache, "TOOL_CACHE_PATH", ":memory:")
+    tool_cache.get_tool_result_cache.cache_clear()
+    yield importlib.import_module("backend.core.finance_agents_network.agent_network")
+    tool_cache.get_tool_result_cache.cache_clear()
@@ -0,0 +1,178 @@
+import asyncio
+import json
+from collections import defaultdict
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import MemorySaver
+
+from backend.vector_stores import tokens
+
+AGENTS = ["MarketAnalyzerAgent", "InvestorAgent", "PersonalFinanceAgent"]
+
+
+class WordEncoding:
+    """One token per whitespace separated word"""
+
+    def encode_ordinary_batch(self, texts, num_threads=8):
+        return [text.split() for text in texts]
+
+
+class FakeAgent:
+    """Agent answering with its name, recording the messages it was given"""
+
+    def __init__(self, name, system_prompt):
+        self.name = name
+        self.tools = []
+        self.inputs = []
+
+    def create_agent(self):
+        return RunnableLambda(self.answer, afunc=self.aanswer)
+
+    def answer(self, state):
+        self.inputs.append([message.content for message in state["messages"]])
+        return {"output": f"answer of {self.name}"}
+
+    async def aanswer(self, state):
+        return self.answer(state)
+
+
+class FakeSupervisorLLM:
+    """Supervisor LLM calling route with the given decisions, in order"""
+
+    def __init__(self, decisions):
+        self.decisions = list(decisions)
+        self.inputs = []
+
+    def bind_functions(self, functions, function_call):
+        return RunnableLambda(self.route)
+
+    def route(self, prompt):
+        self.inputs.append([message.content for message in prompt.to_messages()])
+        arguments = json.dumps(self.decisions.pop(0))
+        return AIMessage(
+            content="",
+            additional_kwargs={
+                "function_call": {"name": "route", "arguments": arguments}
+            },
+        )
+
+
+@pytest.fixture
+def build_network(agent_network, monkeypatch):
+    monkeypatch.setattr(tokens, "get_encoding", lambda model: WordEncoding())
+
+    def build(decisions, checkpointer=None, **kwargs):
+        network = agent_network.AgentsNetwork(fast_router=False, **kwargs)
+        network.llm = FakeSupervisorLLM(decisions)
+        for name in AGENTS:
+            network.add_agent(name, FakeAgent, "")
+        return network, network.create_agent_network(checkpointer=checkpointer)
+
+    return build
+
+
+def words(word, count):
+    return " ".join([word] * count)
+
+
+class TestModelInput:
+    def test_stored_conversation_is_not_trimmed(self, build_network):
+        network, graph = build_network(
+            [{"next": "InvestorAgent"}, {"next": "FINISH"}] * 2,
+            checkpointer=MemorySaver(),
+            history_tokens=60,
+        )
+        config = {"configurable": {"thread_id": "chat"}}
+        graph.invoke({"messages": [HumanMessage(words("first", 40))]}, config)
+        graph.invoke({"messages": [HumanMessage(words("second", 40))]}, config)
+
+        stored = graph.get_state(config).values["messages"]
+        assert [message.content for message in stored] == [
+            words("first", 40),
+            "answer of InvestorAgent",
+            words("second", 40),
+            "answer of InvestorAgent",
+        ]
+        # the models only see the latest messages within the token budget
+        investor = network.agents["InvestorAgent"]
+        assert investor.inputs[-1] == ["answer of InvestorAgent", words("second", 40)]
+        assert words("first", 40) not in network.llm.inputs[-1]
+        assert "answer of InvestorAgent" in network.llm.inputs[-1]
+
+    def test_short_history_is_not_copied(self, build_network):
+        network, _ = build_network([], history_tokens=1000)
+        state = {"messages": [HumanMessage("hello")], "next": ""}
+        assert network.model_input(state) is state
+
+
+PARALLEL_DECISIONS = [
+    {"next": "MarketAnalyzerAgent", "agents": ["MarketAnalyzerAgent", "InvestorAgent"]},
+    {"next": "FINISH"},
+]
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def run(graph, state, asynchronous):
+    if asynchronous:
+        return asyncio.run(collect(graph.astream(state, stream_mode="debug")))
+    return list(graph.stream(state, stream_mode="debug"))
+
+
+class TestParallelAgents:
+    @pytest.mark.parametrize("asynchronous", [False, True])
+    def test_agents_run_in_one_step_and_are_joined(self, build_network, asynchronous):
+        network, graph = build_network(PARALLEL_DECISIONS, parallel_agents=True)
+        events = run(
+            graph,
+            {"messages": [HumanMessage("TCS news and my allocation")]},
+            asynchronous,
+        )
+
+        steps = defaultdict(list)
+        for event in events:
+            if event["type"] == "task":
+                steps[event["step"]].append(event["payload"]["name"])
+        agent_steps = [
+            step for step, names in steps.items() if "InvestorAgent" in names
+        ]
+        assert len(agent_steps) == 1
+        (agent_step,) = agent_steps
+        assert sorted(steps[agent_step]) == ["InvestorAgent", "MarketAnalyzerAgent"]
+
+        # the supervisor runs once after the join, on both answers
+        after = [
+            name for step, names in steps.items() if step > agent_step for name in names
+        ]
+        assert after == ["PrincipalAgent"]
+        assert len(network.llm.inputs) == 2
+        assert "answer of MarketAnalyzerAgent" in network.llm.inputs[-1]
+        assert "answer of InvestorAgent" in network.llm.inputs[-1]
+
+    def test_sequential_without_parallel_agents(self, build_network):
+        network, graph = build_network(
+            [*PARALLEL_DECISIONS[:1], {"next": "FINISH"}], parallel_agents=False
+        )
+        graph.invoke({"messages": [HumanMessage("TCS news and my allocation")]})
+
+        assert len(network.agents["MarketAnalyzerAgent"].inputs) == 1
+        assert network.agents["InvestorAgent"].inputs == []
+
+    def test_supervisor_result(self, build_network):
+        network, _ = build_network([])
+        assert network.supervisor_result(
+            {"next": "InvestorAgent", "agents": ["InvestorAgent", "Unknown"]}
+        ) == {"next": "InvestorAgent", "agents": []}
+        assert network.supervisor_result(
+            {
+                "next": "FINISH",
+                "agents": ["InvestorAgent", "InvestorAgent", "MarketAnalyzerAgent"],
+            }
+        ) == {
+            "next": "InvestorAgent",
+            "agents": ["InvestorAgent", "MarketAnalyzerAgent"],
+        }
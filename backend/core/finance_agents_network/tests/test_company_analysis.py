@@ -0,0 +1,158 @@
+from langchain_core.runnables import RunnableLambda
+
+from backend.benchmarks.serialization_benchmark import sample_documents
+from backend.core.finance_agents_network.company_analysis import CompanyAnalysisEngine
+from backend.core.tool_cache import ToolResultCache
+from backend.models.documents import (
+    ExpertDocument,
+    LazyResponseDocument,
+    NewsDocument,
+)
+from backend.vector_stores.federated_search import FederatedSearchResult
+
+SAMPLES = {type(document): document for document in sample_documents()}
+
+
+class FakeFederatedSearch:
+    def __init__(self):
+        self.queries = []
+        self.companies = []
+
+    def search_many(self, queries, companies=None):
+        self.queries.extend(queries)
+        self.companies.extend(companies)
+        results = []
+        for query, (container,) in queries:
+            document_class = (
+                NewsDocument if container == "stock-news" else ExpertDocument
+            )
+            item = SAMPLES[document_class].to_json()
+            item["document_meta"]["summary"] = query
+            results.append(
+                FederatedSearchResult(
+                    query=query,
+                    results={
+                        container: [
+                            LazyResponseDocument(
+                                item, document_class, similarity_score=0.9
+                            )
+                        ]
+                    },
+                )
+            )
+        return results
+
+
+def engine_with(search, rank_lookup=None, result_cache=None):
+    return CompanyAnalysisEngine(
+        search,
+        {
+            "stock-news": ["Acquisition", "Financial results"],
+            "expert-news": ["Financials"],
+        },
+        rank_lookup=rank_lookup,
+        result_cache=result_cache,
+    )
+
+
+class TestCompanyAnalysisEngine:
+    def test_analyze(self):
+        search = FakeFederatedSearch()
+        lookups = []
+
+        def rank_lookup(companies):
+            lookups.append(companies)
+            return [
+                {"company": "Infosys", "rank": 2, "ticker": "INFY.NS", "growth": 4.5}
+            ]
+
+        engine = engine_with(search, rank_lookup)
+        analyses = engine.analyze(
+            [
+                {"company": "TCS", "rank": 1, "ticker": "TCS.NS", "growth": 3.2},
+                "Infosys",
+                "TCS",
+            ]
+        )
+
+        assert [analysis["company_name"] for analysis in analyses] == ["TCS", "Infosys"]
+        assert analyses[0]["rank"] == 1 and analyses[0]["ticker"] == "TCS.NS"
+        assert analyses[1]["rank"] == 2 and analyses[1]["growth"] == 4.5
+        assert lookups == [["Infosys"]]
+        assert len(search.queries) == 6
+        assert search.companies == ["TCS"] * 3 + ["Infosys"] * 3
+        assert analyses[0]["sector"] == ["IT"]
+        assert len(analyses[0]["news_summary"]) == 2
+        assert analyses[0]["segments"] == ["IT"]
+        assert len(analyses[0]["analysis_summary"]) == 1
+
+    def test_analyses_are_cached(self):
+        search = FakeFederatedSearch()
+        engine = engine_with(search)
+        first = engine.analyze(["TCS"])
+        assert engine.analyze(["TCS"]) == first
+        assert len(search.queries) == 3
+
+        engine.invalidate("TCS")
+        engine.analyze(["TCS"])
+        assert len(search.queries) == 6
+
+    def test_ranks_are_not_cached(self):
+        search = FakeFederatedSearch()
+        engine = engine_with(search)
+        engine.analyze([{"company": "TCS", "rank": 1, "ticker": "TCS.NS"}])
+        analyses = engine.analyze([{"company": "TCS", "rank": 7, "ticker": "TCS.NS"}])
+        assert analyses[0]["rank"] == 7
+        assert len(search.queries) == 3
+
+    def test_expired_analyses_are_searched_again(self):
+        search = FakeFederatedSearch()
+        engine = engine_with(search)
+        engine.ttl_seconds = 0
+        engine.analyze(["TCS"])
+        engine.analyze(["TCS"])
+        assert len(search.queries) == 6
+
+    def test_queries_are_searched_once_per_chat(self):
+        search = FakeFederatedSearch()
+        engine = engine_with(search)
+
+        def tool_calls(_):
+            engine.analyze(["TCS"])
+            engine.invalidate()
+            engine.analyze(["TCS", "Infosys"])
+
+        RunnableLambda(tool_calls).invoke(None, {"configurable": {"chat_id": "chat"}})
+        assert len(search.queries) == 6
+
+        engine.invalidate()
+        RunnableLambda(tool_calls).invoke(None, {"configurable": {"chat_id": "other"}})
+        assert len(search.queries) == 12
+
+    def test_rank_lookup_failure(self):
+        def rank_lookup(companies):
+            raise ConnectionError
+
+        analyses = engine_with(FakeFederatedSearch(), rank_lookup).analyze(["TCS"])
+        assert analyses[0]["rank"] is None
+
+    def test_analyses_in_result_cache(self, tmp_path):
+        result_cache = ToolResultCache(tmp_path / "tool_results.db", ttl=lambda: 60)
+        search = FakeFederatedSearch()
+        first = engine_with(search, result_cache=result_cache).analyze(["TCS"])
+
+        # another worker reads the analysis from the shared cache
+        assert engine_with(search, result_cache=result_cache).analyze(["TCS"]) == first
+        assert len(search.queries) == 3
+
+        # the rank of the caller is used on a cache hit
+        analyses = engine_with(search, result_cache=result_cache).analyze(
+            [{"company": "TCS", "rank": 7}]
+        )
+        assert analyses[0]["rank"] == 7
+        assert len(search.queries) == 3
+
+        result_cache.invalidate(["TCS"])
+        engine_with(search, result_cache=result_cache).analyze(["TCS"])
+        assert len(search.queries) == 6
+        result_cache.close()
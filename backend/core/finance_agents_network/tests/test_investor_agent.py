@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from backend.benchmarks.serialization_benchmark import sample_documents
+from backend.document_loader.ticker_index import TickerIndex, TickerIndexEntry
+from backend.models.documents import MutualFundDocument
+
+
+class FakeMutualFundStore:
+    def __init__(self, documents):
+        self.documents = documents
+        self.filters = []
+
+    def filter_documents(self, filters):
+        self.filters.append(filters)
+        return self.documents
+
+    async def afilter_documents(self, filters):
+        return self.filter_documents(filters)
+
+
+class FakeCompanyAnalysis:
+    def analyze(self, companies):
+        return [
+            {"company_name": company["company"], "rank": 1} for company in companies
+        ]
+
+
+class FakeLLM:
+    def __init__(self):
+        self.messages = []
+
+    async def ainvoke(self, messages):
+        self.messages.append(messages)
+        return AIMessage(content='[{"company_name": "TCS", "quantity": 2}]')
+
+
+@pytest.fixture
+def investor_agent(import_agent, monkeypatch):
+    investor_agent = import_agent("investor_agent")
+    fund = next(
+        document
+        for document in sample_documents()
+        if isinstance(document, MutualFundDocument)
+    )
+    monkeypatch.setattr(
+        investor_agent.InvestorAgent,
+        "mutual_fund_vector_store",
+        FakeMutualFundStore([fund]),
+    )
+    monkeypatch.setattr(
+        investor_agent.InvestorAgent, "company_analysis", FakeCompanyAnalysis()
+    )
+    return investor_agent
+
+
+class TestInvestorAgentTools:
+    def test_allocate_mutual_funds_ainvoke(self, investor_agent, monkeypatch):
+        threads = []
+        index = TickerIndex(
+            [TickerIndexEntry("TCS", "Tata Consultancy Services Ltd.")],
+            fallback=lambda company_name: None,
+        )
+
+        def get_ticker_index():
+            threads.append(threading.current_thread())
+            return index
+
+        monkeypatch.setattr(investor_agent, "get_ticker_index", get_ticker_index)
+        result = asyncio.run(
+            investor_agent.InvestorAgent.allocate_mutual_funds.ainvoke(
+                {
+                    "top_companies": [
+                        {"company": "Tata Consultancy Services"},
+                        {"company": "Unlisted Company"},
+                    ]
+                }
+            )
+        )
+
+        store = investor_agent.InvestorAgent.mutual_fund_vector_store
+        assert store.filters == [
+            {
+                "document_meta.scheme_riskometer": {"ilike": "moderate"},
+                "document_meta.tickers": {"in": ["TCS.NS"]},
+            }
+        ]
+        funds = json.loads(result)
+        assert [fund["fund_name"] for fund in funds] == [
+            store.documents[0].document_meta.fund_name
+        ]
+        # the ticker index is resolved off the event loop
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_allocate_stocks_ainvoke(self, investor_agent, monkeypatch):
+        llm = FakeLLM()
+        monkeypatch.setattr(investor_agent, "get_stock_allocation_llm", lambda: llm)
+        result = asyncio.run(
+            investor_agent.InvestorAgent.allocate_stocks.ainvoke(
+                {
+                    "age": 30,
+                    "risk_tolerance": "moderate",
+                    "investment_period": "mid-term",
+                    "top_companies": [{"company": "TCS"}],
+                }
+            )
+        )
+
+        assert json.loads(result) == [{"company_name": "TCS", "quantity": 2}]
+        assert llm.messages[0][1].content == str([{"company_name": "TCS", "rank": 1}])
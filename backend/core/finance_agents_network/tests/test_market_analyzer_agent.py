@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from backend.benchmarks.serialization_benchmark import sample_documents
+from backend.core.tool_cache import ToolResultCache
+from backend.models.documents import (
+    ExpertDocument,
+    LazyResponseDocument,
+    NewsDocument,
+)
+from backend.vector_stores.federated_search import FederatedSearchResult
+
+SAMPLES = {type(document): document for document in sample_documents()}
+
+
+class FakeFederatedSearch:
+    """Two results per query: one shared by every query and one of the query"""
+
+    def __init__(self):
+        self.queries = []
+        self.companies = []
+
+    def result(self, container, summary, segment):
+        document_class = NewsDocument if container == "stock-news" else ExpertDocument
+        item = SAMPLES[document_class].to_json()
+        item["document_meta"]["summary"] = summary
+        if document_class is ExpertDocument:
+            item["document_meta"]["segments"] = [segment]
+        return LazyResponseDocument(item, document_class, similarity_score=0.9)
+
+    def search_many(self, queries, companies=None):
+        self.queries.extend(query for query, _ in queries)
+        self.companies.extend(companies)
+        return [
+            FederatedSearchResult(
+                query=query,
+                results={
+                    container: (
+                        []
+                        if "Unlisted" in query
+                        else [
+                            self.result(container, "shared", "IT"),
+                            self.result(container, query, query.split()[5]),
+                        ]
+                    )
+                },
+            )
+            for query, (container,) in queries
+        ]
+
+
+@pytest.fixture
+def market_analyzer_agent(import_agent, monkeypatch):
+    market_analyzer_agent = import_agent("market_analyzer_agent")
+    agent = market_analyzer_agent.MarketAnalyzerAgent
+    monkeypatch.setattr(agent, "federated_search", FakeFederatedSearch())
+    monkeypatch.setattr(agent, "stock_news_attributes", ["Acquisition", "Financial"])
+    monkeypatch.setattr(agent, "expert_news_attributes", ["Financials", "Market"])
+    tool_cache = ToolResultCache(":memory:", ttl=lambda: 60)
+    monkeypatch.setattr(
+        market_analyzer_agent, "get_tool_result_cache", lambda: tool_cache
+    )
+    return market_analyzer_agent
+
+
+class TestMarketAnalyzerAgent:
+    def test_search_companies(self, market_analyzer_agent):
+        agent = market_analyzer_agent.MarketAnalyzerAgent
+        company_results = agent.search_companies(
+            "get_news_articles", ["TCS", "Infosys", "TCS"], "stock-news", ["A", "B"]
+        )
+
+        queries = agent.get_search_queries(
+            "TCS", ["A", "B"]
+        ) + agent.get_search_queries("Infosys", ["A", "B"])
+        assert agent.federated_search.queries == queries
+        assert agent.federated_search.companies == ["TCS", "TCS", "Infosys", "Infosys"]
+        assert list(company_results) == ["TCS", "Infosys"]
+        assert [res.get("document_meta.summary") for res in company_results["TCS"]] == [
+            "shared",
+            queries[0],
+            "shared",
+            queries[1],
+        ]
+
+        # the fields are read from the rows, the documents are never built
+        news = agent.news_articles(company_results)
+        assert news["TCS"]["news_summary"] == ["shared", queries[0], queries[1]]
+        assert all(
+            res._document is None
+            for results in company_results.values()
+            for res in results
+        )
+
+    def test_news_articles_ainvoke(self, market_analyzer_agent):
+        agent = market_analyzer_agent.MarketAnalyzerAgent
+        news = asyncio.run(
+            agent.get_news_articles.ainvoke(
+                {"company_list": ["Infosys", "Unlisted Company", "TCS"]}
+            )
+        )
+
+        assert [result["company_name"] for result in news] == ["Infosys", "TCS"]
+        assert news[1] == {
+            "company_name": "TCS",
+            "sector": ["IT"],
+            "news_summary": ["shared"]
+            + agent.get_search_queries("TCS", agent.stock_news_attributes),
+        }
+
+    def test_expert_analysis(self, market_analyzer_agent):
+        agent = market_analyzer_agent.MarketAnalyzerAgent
+        analyses = agent.get_expert_analysis.invoke({"company_list": ["TCS"]})
+
+        assert analyses == [
+            {
+                "company_name": "TCS",
+                "segments": ["IT", "Financials", "Market"],
+                "analysis_summary": ["shared"]
+                + agent.get_search_queries("TCS", agent.expert_news_attributes),
+            }
+        ]
+        # the result is cached
+        agent.get_expert_analysis.invoke({"company_list": ["TCS"]})
+        assert len(agent.federated_search.queries) == 2
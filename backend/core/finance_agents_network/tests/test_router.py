@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from backend.core.finance_agents_network.router import FastRouter, RouterMetrics
+
+AGENTS = ["MarketAnalyzerAgent", "InvestorAgent", "PersonalFinanceAgent"]
+WORDS = ["company", "savings", "flat"]
+EXAMPLES = {
+    "MarketAnalyzerAgent": ["company doing"],
+    "InvestorAgent": ["savings"],
+    "PersonalFinanceAgent": ["buy a flat"],
+}
+
+
+def embed_texts(texts):
+    return [[text.lower().count(word) + 0.01 for word in WORDS] for text in texts]
+
+
+class FakeSupervisor:
+    def __init__(self, next="FINISH"):
+        self.next = next
+        self.calls = 0
+
+    def route(self, state):
+        self.calls += 1
+        return {"next": self.next}
+
+    def runnable(self):
+        return RunnableLambda(self.route)
+
+
+def router_with(supervisor, embed=embed_texts):
+    return FastRouter(
+        AGENTS,
+        supervisor.runnable(),
+        embed_texts=embed,
+        examples=EXAMPLES,
+        metrics=RouterMetrics(),
+    )
+
+
+class TestFastRouter:
+    def test_keyword_rules(self):
+        supervisor = FakeSupervisor()
+        router = router_with(supervisor)
+        messages = [HumanMessage("What is the latest news on TCS?")]
+
+        assert router.route({"messages": messages}) == {
+            "next": "MarketAnalyzerAgent",
+            "agents": ["MarketAnalyzerAgent"],
+        }
+        messages.append(AIMessage("TCS news", name="MarketAnalyzerAgent"))
+        assert router.route({"messages": messages}) == {"next": "FINISH", "agents": []}
+        assert supervisor.calls == 0
+        assert router.metrics.snapshot()["paths"]["rules"]["count"] == 2
+
+    def test_agents_are_asked_in_order(self):
+        router = router_with(FakeSupervisor())
+        messages = [
+            HumanMessage(
+                "My age is 27. I want to get a home loan in 5 years."
+                " How can I allocate my money?"
+            )
+        ]
+        hops = []
+        for _ in range(3):
+            hop = router.route({"messages": messages})["next"]
+            hops.append(hop)
+            messages.append(AIMessage("done", name=hop))
+        assert hops == ["InvestorAgent", "PersonalFinanceAgent", "FINISH"]
+
+    def test_pending_agents(self):
+        router = router_with(FakeSupervisor())
+        messages = [
+            HumanMessage("Any news on TCS? Should I invest in it or buy gold?"),
+            AIMessage("TCS news", name="MarketAnalyzerAgent"),
+        ]
+        assert router.route({"messages": messages}) == {
+            "next": "InvestorAgent",
+            "agents": ["InvestorAgent"],
+        }
+
+    def test_previous_turns_are_ignored(self):
+        router = router_with(FakeSupervisor())
+        messages = [
+            HumanMessage("Any news on Infosys?"),
+            AIMessage("Infosys news", name="MarketAnalyzerAgent"),
+            HumanMessage("And the news on TCS?"),
+        ]
+        assert router.route({"messages": messages})["next"] == "MarketAnalyzerAgent"
+
+    @pytest.mark.parametrize(
+        "text, agents",
+        [
+            ("Tata Motors car sales", []),
+            ("Gold prices this week", []),
+            ("Will the new policy help my home town?", []),
+            ("RBI policy outlook", ["MarketAnalyzerAgent"]),
+            ("I am buying a car next month", ["PersonalFinanceAgent"]),
+            ("Which term policy should I take?", ["PersonalFinanceAgent"]),
+            ("Should I buy gold this year?", ["InvestorAgent"]),
+        ],
+    )
+    def test_ambiguous_keywords(self, text, agents):
+        router = router_with(FakeSupervisor())
+        assert router.rule_agents(text) == agents
+
+    def test_ambiguous_keywords_fall_back_to_the_supervisor(self):
+        supervisor = FakeSupervisor("MarketAnalyzerAgent")
+        router = router_with(supervisor)
+        messages = [HumanMessage("Tata Motors car sales")]
+
+        assert router.route({"messages": messages})["next"] == "MarketAnalyzerAgent"
+        assert supervisor.calls == 1
+        assert "rules" not in router.metrics.snapshot()["paths"]
+
+    def test_embedding_classifier(self):
+        supervisor = FakeSupervisor()
+        router = router_with(supervisor)
+        messages = [HumanMessage("Where should my savings go?")]
+
+        assert router.route({"messages": messages})["next"] == "InvestorAgent"
+        assert supervisor.calls == 0
+        assert router.metrics.snapshot()["paths"]["embedding"]["count"] == 1
+
+    def test_low_confidence_falls_back_to_the_supervisor(self):
+        supervisor = FakeSupervisor("InvestorAgent")
+        router = router_with(supervisor)
+        messages = [HumanMessage("Hello there")]
+
+        assert router.route({"messages": messages})["next"] == "InvestorAgent"
+        assert supervisor.calls == 1
+        snapshot = router.metrics.snapshot()
+        assert snapshot["paths"]["llm"]["count"] == 1
+        assert snapshot["next"] == {"InvestorAgent": 1}
+
+    def test_embedding_failure_falls_back_to_the_supervisor(self):
+        def embed(texts):
+            raise ConnectionError
+
+        supervisor = FakeSupervisor()
+        router = router_with(supervisor, embed)
+        assert router.route({"messages": [HumanMessage("Hello")]}) == {"next": "FINISH"}
+        assert supervisor.calls == 1
+
+    def test_aroute(self):
+        supervisor = FakeSupervisor()
+        router = router_with(supervisor)
+        state = {"messages": [HumanMessage("Is TCS a good company to follow?")]}
+
+        assert asyncio.run(router.aroute(state))["next"] == "MarketAnalyzerAgent"
+        assert asyncio.run(router.aroute({"messages": [HumanMessage("Hello")]})) == {
+            "next": "FINISH"
+        }
+        assert supervisor.calls == 1
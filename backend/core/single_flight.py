@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from langchain_core.tools import BaseTool
+
+
+def freeze(value: Any) -> Hashable:
+    """Hashable equivalent of a call argument: lists and tuples as tuples, dicts
+    as sorted items, sets as frozensets and other unhashable values as repr"""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def call_key(*args: Any, **kwargs: Any) -> Hashable:
+    return freeze(args), freeze(kwargs)
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls. The first caller of a key (the
+    leader) runs the call, callers of the same key arriving while it is in
+    flight wait for its result, or its exception, instead of running it again.
+    Nothing is cached, the next call after the leader finishes runs again.
+
+    do coalesces calls across threads, ado coalesces coroutines within an event
+    loop. Followers share the leader's result object, so results are to be
+    treated as read-only.
+
+    Examples:
+        >>> single_flight = SingleFlight()
+        >>> single_flight.do(("embedding", query), get_query_embedding, query)
+        >>> await single_flight.ado(("tool", name, args), tool.ainvoke, args)
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, Future] = {}
+        self._tasks: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(
+        self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = loop.create_task(func(*args, **kwargs))
+                self._tasks[task_key] = task
+                task.add_done_callback(functools.partial(self._forget, task_key))
+            else:
+                self.coalesced += 1
+        # a cancelled caller does not cancel the call of the others
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+
+default_single_flight = SingleFlight()
+
+
+def coalesce(
+    func: Optional[Callable] = None,
+    *,
+    single_flight: Optional[SingleFlight] = None,
+    key: Optional[Callable[..., Hashable]] = None,
+):
+    """Decorator coalescing identical concurrent calls of a function or
+    coroutine function. Calls are identified by the function and key(*args,
+    **kwargs), by default all the arguments (self included for methods).
+
+    Examples:
+        >>> @coalesce
+        ... def get_query_embedding(self, query, model=None): ...
+    """
+
+    def decorator(func: Callable) -> Callable:
+        group = single_flight or default_single_flight
+        make_key = key or call_key
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await group.ado(
+                    (name, make_key(*args, **kwargs)), func, *args, **kwargs
+                )
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return group.do((name, make_key(*args, **kwargs)), func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+def coalesce_methods(
+    obj: Any, *names: str, single_flight: Optional[SingleFlight] = None
+) -> Any:
+    """Coalesce identical concurrent calls of methods of a single object, e.g.
+    a vector store shared by the agents"""
+    for name in names:
+        setattr(
+            obj,
+            name,
+            coalesce(
+                getattr(obj, name),
+                single_flight=single_flight,
+                key=functools.partial(call_key, id(obj), name),
+            ),
+        )
+    return obj
+
+
+def coalesce_tool(
+    tool: BaseTool, single_flight: Optional[SingleFlight] = None
+) -> BaseTool:
+    """Coalesce identical concurrent calls (same tool and arguments) of a tool,
+    on its sync and async implementations. Applying it twice has no effect."""
+    group = single_flight or default_single_flight
+    for attribute in ("func", "coroutine"):
+        func = getattr(tool, attribute, None)
+        if func is None or getattr(func, "__single_flight__", False):
+            continue
+        wrapper = coalesce(
+            func,
+            single_flight=group,
+            key=functools.partial(call_key, tool.name),
+        )
+        wrapper.__single_flight__ = True
+        setattr(tool, attribute, wrapper)
+    return tool
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Annotated, Sequence, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+
+from backend.core.checkpoint import SqliteCheckpointSaver
+
+
+class ChatState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+
+
+def echo(state):
+    return {"messages": [AIMessage(f"{len(state['messages'])} messages", name="echo")]}
+
+
+def chat_graph(checkpointer):
+    graph = StateGraph(ChatState)
+    graph.add_node("echo", echo)
+    graph.add_edge(START, "echo")
+    graph.add_edge("echo", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def config(conversation_id):
+    return {"configurable": {"thread_id": conversation_id}}
+
+
+class TestSqliteCheckpointSaver:
+    def test_conversation_is_resumed(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "conversations.db")
+        graph = chat_graph(saver)
+        graph.invoke({"messages": [HumanMessage("Hi")]}, config("a"))
+        result = graph.invoke({"messages": [HumanMessage("Again")]}, config("a"))
+
+        assert [message.content for message in result["messages"]] == [
+            "Hi",
+            "1 messages",
+            "Again",
+            "3 messages",
+        ]
+        other = graph.invoke({"messages": [HumanMessage("Hi")]}, config("b"))
+        assert len(other["messages"]) == 2
+        assert {
+            checkpoint.config["configurable"]["thread_id"]
+            for checkpoint in saver.list(None)
+        } == {"a", "b"}
+        saver.close()
+
+        # another worker continues from the stored state
+        saver = SqliteCheckpointSaver(tmp_path / "conversations.db")
+        state = chat_graph(saver).get_state(config("a"))
+        assert len(state.values["messages"]) == 4
+        saver.close()
+
+    def test_async_conversation(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "conversations.db")
+        graph = chat_graph(saver)
+
+        async def main():
+            await graph.ainvoke({"messages": [HumanMessage("Hi")]}, config("a"))
+            chunks = [
+                chunk
+                async for chunk in graph.astream(
+                    {"messages": [HumanMessage("Again")]}, config("a")
+                )
+            ]
+            return chunks, await graph.aget_state(config("a"))
+
+        chunks, state = asyncio.run(main())
+        assert chunks[-1]["echo"]["messages"][0].content == "3 messages"
+        assert len(state.values["messages"]) == 4
+        saver.close()
+
+    def test_trimmed_messages_are_removed(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "conversations.db")
+        graph = chat_graph(saver)
+        graph.invoke({"messages": [HumanMessage("Hi")]}, config("a"))
+        history = graph.get_state(config("a")).values["messages"]
+
+        result = graph.invoke(
+            {
+                "messages": [
+                    *(RemoveMessage(id=message.id) for message in history),
+                    HumanMessage("Again"),
+                ]
+            },
+            config("a"),
+        )
+        assert [message.content for message in result["messages"]] == [
+            "Again",
+            "1 messages",
+        ]
+        saver.close()
+
+    def test_history_is_pruned(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "conversations.db", history=3)
+        graph = chat_graph(saver)
+        for _ in range(3):
+            graph.invoke({"messages": [HumanMessage("Hi")]}, config("a"))
+
+        checkpoints = list(saver.list(config("a")))
+        assert len(checkpoints) == 3
+        assert len(graph.get_state(config("a")).values["messages"]) == 6
+        assert len(list(saver.list(config("a"), limit=2))) == 2
+        saver.close()
+
+    def test_delete_thread(self, tmp_path):
+        saver = SqliteCheckpointSaver(tmp_path / "conversations.db")
+        graph = chat_graph(saver)
+        graph.invoke({"messages": [HumanMessage("Hi")]}, config("a"))
+
+        saver.delete_thread("a")
+        assert saver.get_tuple(config("a")) is None
+        assert graph.get_state(config("a")).values == {}
+        saver.close()
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.tools import tool
+
+from backend.core.single_flight import (
+    SingleFlight,
+    coalesce,
+    coalesce_methods,
+    coalesce_tool,
+)
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_are_coalesced(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def search(query):
+            calls.append(query)
+            release.wait(timeout=5)
+            return [query]
+
+        def call(query):
+            return single_flight.do(("search", query), search, query)
+
+        with ThreadPoolExecutor(5) as executor:
+            futures = [executor.submit(call, "TCS") for _ in range(4)]
+            futures.append(executor.submit(call, "Infosys"))
+            while single_flight.calls < 5:
+                pass
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        assert results == [["TCS"]] * 4 + [["Infosys"]]
+        assert sorted(calls) == ["Infosys", "TCS"]
+        assert single_flight.coalesced == 3
+        assert single_flight.in_flight == 0
+
+    def test_calls_after_the_leader_run_again(self):
+        single_flight = SingleFlight()
+        calls = []
+        for _ in range(2):
+            single_flight.do("key", calls.append, 1)
+        assert calls == [1, 1]
+        assert single_flight.coalesced == 0
+
+    def test_exception_is_shared(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(timeout=5)
+            raise ConnectionError("Cosmos unavailable")
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [executor.submit(single_flight.do, "key", fail) for _ in range(3)]
+            while single_flight.calls < 3:
+                pass
+            release.set()
+            for future in futures:
+                with pytest.raises(ConnectionError):
+                    future.result(timeout=5)
+
+        assert single_flight.coalesced == 2
+        assert single_flight.in_flight == 0
+
+    def test_ado(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def embed(query):
+            calls.append(query)
+            await asyncio.sleep(0.01)
+            return [0.1, 0.2]
+
+        async def main():
+            return await asyncio.gather(
+                *(single_flight.ado(("embed", "TCS"), embed, "TCS") for _ in range(3))
+            )
+
+        assert asyncio.run(main()) == [[0.1, 0.2]] * 3
+        assert calls == ["TCS"]
+        assert single_flight.in_flight == 0
+
+
+class TestCoalesce:
+    def test_unhashable_arguments(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        @coalesce(single_flight=single_flight)
+        def filter_documents(filters, columns=None):
+            calls.append(filters)
+            release.wait(timeout=5)
+            return len(calls)
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [
+                executor.submit(
+                    filter_documents, {"ticker": ["TCS.NS"]}, columns=["id"]
+                )
+                for _ in range(3)
+            ]
+            while single_flight.calls < 3:
+                pass
+            release.set()
+            assert [future.result(timeout=5) for future in futures] == [1, 1, 1]
+
+    def test_methods_of_different_objects_are_not_coalesced(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        class Store:
+            def __init__(self, name):
+                self.name = name
+
+            def search(self, query):
+                release.wait(timeout=5)
+                return self.name
+
+        stores = [
+            coalesce_methods(Store(name), "search", single_flight=single_flight)
+            for name in ("stock-news", "expert-news")
+        ]
+        with ThreadPoolExecutor(2) as executor:
+            futures = [executor.submit(store.search, "TCS") for store in stores]
+            while single_flight.calls < 2:
+                pass
+            release.set()
+            assert [future.result(timeout=5) for future in futures] == [
+                "stock-news",
+                "expert-news",
+            ]
+        assert single_flight.coalesced == 0
+
+    def test_coalesce_tool(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        @tool("get_news_articles")
+        def get_news_articles(company_list: list) -> list:
+            """Get news summaries for the provided list of companies."""
+            calls.append(company_list)
+            return company_list
+
+        async def aget_news_articles(company_list: list) -> list:
+            calls.append(company_list)
+            await asyncio.sleep(0.01)
+            return company_list
+
+        get_news_articles.coroutine = aget_news_articles
+        coalesce_tool(get_news_articles, single_flight)
+        func = get_news_articles.func
+        assert coalesce_tool(get_news_articles, single_flight).func is func
+
+        assert get_news_articles.invoke({"company_list": ["TCS"]}) == ["TCS"]
+
+        async def main():
+            return await asyncio.gather(
+                *(
+                    get_news_articles.ainvoke({"company_list": ["TCS"]})
+                    for _ in range(3)
+                )
+            )
+
+        assert asyncio.run(main()) == [["TCS"]] * 3
+        assert calls == [["TCS"], ["TCS"]]
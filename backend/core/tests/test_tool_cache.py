@@ -0,0 +1,142 @@
+from datetime import datetime
+
+import pytest
+
+from backend.core.tool_cache import (
+    MARKET_TIMEZONE,
+    ToolResultCache,
+    company_cache_key,
+    is_market_open,
+    next_market_open,
+    result_ttl,
+)
+from backend.document_loader import ticker_index
+from backend.document_loader.ticker_index import TickerIndex, TickerIndexEntry
+
+
+def ist(*args) -> datetime:
+    return datetime(*args, tzinfo=MARKET_TIMEZONE)
+
+
+@pytest.fixture
+def tool_cache(tmp_path):
+    tool_cache = ToolResultCache(tmp_path / "tool_results.db", ttl=lambda: 60)
+    yield tool_cache
+    tool_cache.close()
+
+
+class TestMarketHours:
+    def test_is_market_open(self):
+        # 2024-10-18 is a Friday
+        assert is_market_open(ist(2024, 10, 18, 9, 15))
+        assert is_market_open(ist(2024, 10, 18, 15, 29))
+        assert not is_market_open(ist(2024, 10, 18, 15, 30))
+        assert not is_market_open(ist(2024, 10, 18, 9, 0))
+        assert not is_market_open(ist(2024, 10, 19, 11, 0))
+
+    def test_next_market_open(self):
+        assert next_market_open(ist(2024, 10, 17, 8, 0)) == ist(2024, 10, 17, 9, 15)
+        assert next_market_open(ist(2024, 10, 17, 16, 0)) == ist(2024, 10, 18, 9, 15)
+        assert next_market_open(ist(2024, 10, 18, 16, 0)) == ist(2024, 10, 21, 9, 15)
+
+    def test_result_ttl(self):
+        kwargs = dict(market_hours_ttl=600, off_hours_ttl=43200)
+        assert result_ttl(ist(2024, 10, 17, 11, 0), **kwargs) == 600
+        assert result_ttl(ist(2024, 10, 17, 9, 0), **kwargs) == 900
+        assert result_ttl(ist(2024, 10, 17, 9, 10), **kwargs) == 600
+        assert result_ttl(ist(2024, 10, 18, 16, 0), **kwargs) == 43200
+
+
+class TestToolResultCache:
+    def test_get_put(self, tool_cache):
+        tool_cache.put("get_news_articles", "TCS", ["Acquisition"], {"sector": ["IT"]})
+
+        assert tool_cache.get("get_news_articles", "tcs ", ["Acquisition"]) == {
+            "sector": ["IT"]
+        }
+        assert tool_cache.get("get_news_articles", "TCS", ["Financials"]) is None
+        assert tool_cache.get("get_expert_analysis", "TCS", ["Acquisition"]) is None
+
+    def test_expired_results(self, tmp_path):
+        tool_cache = ToolResultCache(tmp_path / "tool_results.db", ttl=lambda: -1)
+        tool_cache.put("get_news_articles", "TCS", [], {})
+        assert tool_cache.get("get_news_articles", "TCS", []) is None
+        tool_cache.close()
+
+    def test_get_or_compute(self, tool_cache):
+        computed = []
+
+        def compute(companies):
+            computed.append(companies)
+            return {company: {"company_name": company} for company in companies}
+
+        tool_cache.put("tool", "TCS", [], {"company_name": "cached"})
+        results = tool_cache.get_or_compute("tool", ["TCS", "Infosys"], [], compute)
+
+        assert results == {
+            "TCS": {"company_name": "cached"},
+            "Infosys": {"company_name": "Infosys"},
+        }
+        assert computed == [["Infosys"]]
+        tool_cache.get_or_compute("tool", ["TCS", "Infosys"], [], compute)
+        assert computed == [["Infosys"]]
+
+    def test_invalidate(self, tool_cache):
+        tool_cache.put("get_news_articles", "TCS", [], {})
+        tool_cache.put("get_expert_analysis", "TCS", [], {})
+        tool_cache.put("get_news_articles", "Infosys", [], {})
+
+        assert tool_cache.invalidate(["tcs"]) == 2
+        assert len(tool_cache) == 1
+        assert tool_cache.invalidate([]) == 0
+
+    def test_companies_are_keyed_by_ticker(self, tmp_path):
+        index = TickerIndex(
+            [TickerIndexEntry("TCS", "Tata Consultancy Services Ltd.")],
+            fallback=lambda company_name: None,
+        )
+        tool_cache = ToolResultCache(
+            tmp_path / "tool_results.db", ttl=lambda: 60, resolve=index.lookup
+        )
+        tool_cache.put("get_company_analysis", "TCS", [], {"sector": ["IT"]})
+        tool_cache.put("get_company_analysis", "Infosys", [], {})
+
+        assert tool_cache.get_many(
+            "get_company_analysis", ["Tata Consultancy Services", "TCS.NS"], []
+        ) == {
+            "Tata Consultancy Services": {"sector": ["IT"]},
+            "TCS.NS": {"sector": ["IT"]},
+        }
+        assert tool_cache.invalidate(["Tata Consultancy Services Ltd."]) == 1
+        assert tool_cache.get("get_company_analysis", "infosys", []) == {}
+        tool_cache.close()
+
+    def test_resolve_failure(self, tmp_path):
+        def resolve(company):
+            raise ConnectionError
+
+        tool_cache = ToolResultCache(
+            tmp_path / "tool_results.db", ttl=lambda: 60, resolve=resolve
+        )
+        tool_cache.put("get_news_articles", "TCS", [], {})
+        assert tool_cache.get("get_news_articles", "tcs", []) == {}
+        tool_cache.close()
+
+    def test_company_cache_key(self, tmp_path, monkeypatch):
+        file_path = tmp_path / "ticker_index.json"
+        monkeypatch.setattr(ticker_index, "TICKER_INDEX_PATH", str(file_path))
+        ticker_index.get_ticker_index.cache_clear()
+
+        # the index is never built for a cache key
+        assert company_cache_key("Tata Consultancy Services Ltd.") == (
+            "TATA CONSULTANCY SERVICES"
+        )
+        assert ticker_index.get_ticker_index.cache_info().currsize == 0
+
+        TickerIndex(
+            [TickerIndexEntry("TCS", "Tata Consultancy Services Ltd.")],
+            fallback=lambda company_name: None,
+        ).save(file_path)
+        assert company_cache_key("Tata Consultancy Services") == "TCS.NS"
+        assert company_cache_key("Unlisted Company") == "UNLISTED COMPANY"
+        ticker_index.get_ticker_index.cache_clear()
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+from functools import cache
+from os import PathLike
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from backend.models import json_codec
+from backend.models.documents import BaseDocument
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_PATH = os.environ.get("SMART_WEALTH_TOOL_CACHE_PATH", "tool_results.db")
+MARKET_HOURS_TTL = float(os.environ.get("SMART_WEALTH_TOOL_CACHE_MARKET_TTL", 600))
+OFF_HOURS_TTL = float(os.environ.get("SMART_WEALTH_TOOL_CACHE_OFF_HOURS_TTL", 43200))
+
+# NSE trading session, Monday to Friday. Exchange holidays are not accounted for.
+MARKET_TIMEZONE = timezone(timedelta(hours=5, minutes=30), "IST")
+MARKET_OPEN = dt_time(9, 15)
+MARKET_CLOSE = dt_time(15, 30)
+
+
+def is_market_open(now: datetime) -> bool:
+    now = now.astimezone(MARKET_TIMEZONE)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now: datetime) -> datetime:
+    """Start of the next trading session after now"""
+    now = now.astimezone(MARKET_TIMEZONE)
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TIMEZONE)
+
+
+def result_ttl(
+    now: Optional[datetime] = None,
+    market_hours_ttl: Optional[float] = MARKET_HOURS_TTL,
+    off_hours_ttl: Optional[float] = OFF_HOURS_TTL,
+) -> float:
+    """Seconds a tool result computed at now stays fresh: market_hours_ttl while
+    the market is open, otherwise until the next session opens, at most
+    off_hours_ttl"""
+    now = now or datetime.now(MARKET_TIMEZONE)
+    if is_market_open(now):
+        return market_hours_ttl
+    until_open = (next_market_open(now) - now).total_seconds()
+    return max(min(until_open, off_hours_ttl), market_hours_ttl)
+
+
+def normalize_company(company: str) -> str:
+    return " ".join(company.lower().split())
+
+
+def document_companies(documents: Iterable[BaseDocument]) -> set[str]:
+    """Companies the documents are about: company name and ticker (with and
+    without exchange suffix) of news, companies of expert analysis"""
+    companies = set()
+    for document in documents:
+        meta = document.document_meta
+        if getattr(meta, "company_name", None):
+            companies.add(meta.company_name)
+        if getattr(meta, "ticker", None):
+            companies.update({meta.ticker, meta.ticker.split(".")[0]})
+        companies.update(getattr(meta, "companies", None) or [])
+    return companies
+
+
+class ToolResultCache:
+    """Local SQLite cache of agent tool results, keyed by tool, company and
+    the search attributes of the tool.
+
+    Companies are keyed by the key resolve returns, e.g. their ticker, so the
+    names the agents ask for (e.g. "TCS") and the company names and tickers of
+    the ingested documents (e.g. "Tata Consultancy Services Ltd.", "TCS.NS")
+    share the same entries. resolve is called on every get, put and invalidate
+    and must not do I/O. Without a key companies are keyed by their normalized
+    name.
+
+    Entries expire after result_ttl, short during market hours and until the
+    next session after close. The database is shared by the api workers and
+    the ingestion jobs, which invalidate the companies of the documents they
+    ingest.
+
+    Examples:
+        >>> cache = ToolResultCache("tool_results.db")
+        >>> cache.put("get_news_articles", "TCS", ["Acquisition"], {"sector": ["IT"]})
+        >>> cache.get("get_news_articles", "TCS", ["Acquisition"])
+        {"sector": ["IT"]}
+        >>> cache.invalidate(["TCS"])
+    """
+
+    def __init__(
+        self,
+        db_path: PathLike | str = TOOL_CACHE_PATH,
+        ttl: Optional[Callable[[], float]] = result_ttl,
+        resolve: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.resolve = resolve
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._initialize()
+
+    def _initialize(self):
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS tool_results (
+                    tool TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    attributes TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (tool, company, attributes)
+                )
+                """)
+
+    @staticmethod
+    def attributes_key(attributes: Any) -> str:
+        return json_codec.dumps(attributes)
+
+    def company_key(self, company: str) -> str:
+        """Resolved key of the company, or its normalized name"""
+        key = None
+        if self.resolve is not None:
+            try:
+                key = self.resolve(company)
+            except Exception:
+                logger.warning(f"Could not resolve the key of {company}", exc_info=True)
+        return normalize_company(key or company)
+
+    def get_many(
+        self, tool: str, companies: Iterable[str], attributes: Any
+    ) -> dict[str, Any]:
+        """Fresh cached results of the companies, missing companies are left out"""
+        keys: dict[str, list[str]] = {}
+        for company in companies:
+            keys.setdefault(self.company_key(company), []).append(company)
+        if not keys:
+            return {}
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT company, result FROM tool_results WHERE tool = ?"
+                " AND attributes = ? AND expires_at > ?"
+                f" AND company IN ({', '.join('?' * len(keys))})",
+                (tool, self.attributes_key(attributes), time.time(), *keys),
+            ).fetchall()
+        return {
+            company: json_codec.loads(result)
+            for key, result in rows
+            for company in keys[key]
+        }
+
+    def get(self, tool: str, company: str, attributes: Any) -> Optional[Any]:
+        return self.get_many(tool, [company], attributes).get(company)
+
+    def put_many(self, tool: str, results: dict[str, Any], attributes: Any) -> None:
+        expires_at = time.time() + self.ttl()
+        attributes = self.attributes_key(attributes)
+        rows = [
+            (
+                tool,
+                self.company_key(company),
+                attributes,
+                json_codec.dumps(result),
+                expires_at,
+            )
+            for company, result in results.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO tool_results"
+                " (tool, company, attributes, result, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def put(self, tool: str, company: str, attributes: Any, result: Any) -> None:
+        self.put_many(tool, {company: result}, attributes)
+
+    def get_or_compute(
+        self,
+        tool: str,
+        companies: Sequence[str],
+        attributes: Any,
+        compute: Callable[[list[str]], dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Results of the companies, computing and caching the missing ones
+
+        Args:
+        ------
+        tool: str
+            Name of the tool
+        companies: Sequence[str]
+            The companies
+        attributes: Any
+            Json serializable search attributes of the tool
+        compute: Callable[[list[str]], dict[str, Any]]
+            Computes the results of the missing companies, by company
+        """
+        results = self.get_many(tool, companies, attributes)
+        missing = [company for company in companies if company not in results]
+        if missing:
+            computed = compute(missing)
+            self.put_many(tool, computed, attributes)
+            results.update(computed)
+        return results
+
+    def invalidate(self, companies: Iterable[str]) -> int:
+        """Drop the results of the companies for every tool"""
+        companies = list(
+            {
+                key
+                for company in companies
+                for key in (self.company_key(company), normalize_company(company))
+            }
+        )
+        if not companies:
+            return 0
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM tool_results"
+                f" WHERE company IN ({', '.join('?' * len(companies))})",
+                companies,
+            ).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM tool_results"
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def company_cache_key(company: str) -> str:
+    """Ticker of the company in the shared ticker index, without network
+    lookups, or its normalized name. The index is only used once it is loaded
+    or saved locally, it is never built for a cache key."""
+    from backend.document_loader.ticker_index import (
+        TICKER_INDEX_PATH,
+        get_ticker_index,
+        normalize_company_name,
+    )
+
+    if get_ticker_index.cache_info().currsize or os.path.exists(TICKER_INDEX_PATH):
+        ticker = get_ticker_index().lookup(company)
+        if ticker is not None:
+            return ticker
+    return normalize_company_name(company)
+
+
+@cache
+def get_tool_result_cache() -> ToolResultCache:
+    """Process wide tool result cache at SMART_WEALTH_TOOL_CACHE_PATH, keyed by
+    the tickers of the shared ticker index"""
+    return ToolResultCache(TOOL_CACHE_PATH, resolve=company_cache_key)
+
+
+def invalidate_document_companies(
+    documents: Iterable[BaseDocument], tool_cache: Optional[ToolResultCache] = None
+) -> int:
+    """Drop the cached tool results of the companies of the ingested documents,
+    in tool_cache or the process wide cache
+
+    Returns:
+    --------
+    invalidated: int
+        Number of dropped results
+    """
+    companies = document_companies(documents)
+    if not companies:
+        return 0
+    if tool_cache is None:
+        tool_cache = get_tool_result_cache()
+    invalidated = tool_cache.invalidate(companies)
+    logger.info(f"Invalidated {invalidated} tool results of {len(companies)} companies")
+    return invalidated
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 import json
+from collections import Counter, defaultdict
 from io import StringIO
 from os import PathLike
 from typing import Any, Iterable, Optional, Sequence, TypeVar, Generator, Generic
 
-from backend.models.documents import BaseDocument, BaseTextDocument
+from backend.core.tool_cache import ToolResultCache, invalidate_document_companies
+from backend.document_loader.deduplication import MinHashDeduplicator
+from backend.document_loader.document_export import export_documents
+from backend.document_loader.ingestion_manifest import IngestionManifest
+from backend.models.documents import BaseDocument, BaseTextDocument, CompactCorpus
 from backend.vector_stores import AzureCosmosVectorStore
 
 T = TypeVar("T", bound=BaseDocument)
@@ -23,7 +28,9 @@ class BaseDocumentLoader(Generic[T]):
         self.tag_map: dict[str, list[str]] = tag_map if tag_map else {}
         self.documents: list[T] = []
 
-    def split_documents(self, **kwargs) -> list[BaseDocument]:
+    def split_documents(
+        self, documents: Optional[list[T]] = None, **kwargs
+    ) -> list[BaseDocument]:
         raise NotImplementedError()
 
     def iter_from_attrs(self, attrs: list[str] | str) -> Generator[Any]:
@@ -138,14 +145,31 @@ class BaseDocumentLoader(Generic[T]):
             json.dump(content, file)
 
     def save_documents(self, filepath: PathLike, jsonl: Optional[bool] = False) -> None:
-        """save the documents to the given filepath"""
-        content = [doc.to_json() for doc in self.documents]
+        """save the documents to the given filepath, one document at a time"""
         with open(filepath, "w") as file:
             if jsonl:
-                for line in content:
-                    file.write(json.dumps(line) + "\n")
+                for doc in self.documents:
+                    file.write(doc.model_dump_json() + "\n")
             else:
-                json.dump(content, file)
+                file.write("[")
+                for idx, doc in enumerate(self.documents):
+                    if idx:
+                        file.write(", ")
+                    file.write(doc.model_dump_json())
+                file.write("]")
+
+    def to_corpus(self) -> CompactCorpus:
+        """Columnar copy of the documents, see CompactCorpus"""
+        return CompactCorpus.from_documents(self.documents)
+
+    def export_documents(
+        self,
+        filepath: PathLike,
+        embeddings: Optional[Sequence[Sequence[float]]] = None,
+    ) -> int:
+        """Stream the documents to a parquet (.parquet) or zstd compressed jsonl
+        (.jsonl.zst) file, optionally with their embeddings"""
+        return export_documents(self.documents, filepath, embeddings=embeddings)
 
     def _load_documents(self, dataset: list[dict]) -> None:
         raise NotImplementedError()
@@ -161,9 +185,32 @@ class BaseTextDocumentLoader(BaseDocumentLoader[T]):
         super().__init__(tag_set=tag_set, tag_map=tag_map)
         self.documents: list[T] = []
 
-    def split_documents(self, **kwargs) -> list[BaseTextDocument]:
+    def split_documents(
+        self, documents: Optional[list[T]] = None, **kwargs
+    ) -> list[BaseTextDocument]:
         raise NotImplementedError()
 
+    def remove_near_duplicates(
+        self,
+        threshold: Optional[float] = 0.85,
+        num_perm: Optional[int] = 128,
+        shingle_size: Optional[int] = 5,
+    ) -> int:
+        """Collapse near-duplicate documents in place, keeping the sources of the
+        dropped documents in document_meta.duplicate_sources.
+
+        Returns:
+        --------
+        removed: int
+            Number of removed documents
+        """
+        deduplicator = MinHashDeduplicator(
+            threshold=threshold, num_perm=num_perm, shingle_size=shingle_size
+        )
+        num_documents = len(self.documents)
+        self.documents = deduplicator.deduplicate(self.documents)
+        return num_documents - len(self.documents)
+
     def embed_upsert_to_vector_store(
         self,
         database_name: str,
@@ -172,21 +219,86 @@ class BaseTextDocumentLoader(BaseDocumentLoader[T]):
         max_token_limit: Optional[int] = float("inf"),
         document_range: Optional[tuple[int, int]] = (0, float("inf")),
         split_document_kwargs: Optional[dict] = None,
+        manifest: Optional[IngestionManifest] = None,
+        delete_removed: Optional[bool] = False,
+        deduplicate: Optional[bool] = False,
+        deduplication_kwargs: Optional[dict] = None,
+        tool_cache: Optional[ToolResultCache] = None,
     ) -> int:
+        """Split, embed and upload the documents to the vector store.
+
+        If a manifest is provided, only new or modified documents are split and
+        embedded, and the previously uploaded chunks of modified documents are
+        deleted once their replacements are uploaded. With delete_removed, the
+        chunks of documents missing from this load are deleted as well.
+
+        With deduplicate, near-duplicate documents are collapsed before
+        splitting (see remove_near_duplicates).
+
+        The cached agent tool results of the companies of the uploaded documents
+        are invalidated, in tool_cache or the process wide tool result cache.
+        """
         if not split_document_kwargs:
             split_document_kwargs = {}
+        if not deduplication_kwargs:
+            deduplication_kwargs = {}
+
+        if deduplicate:
+            self.remove_near_duplicates(**deduplication_kwargs)
 
         vector_store = AzureCosmosVectorStore(
             database_name=database_name, container_name=container_name
         )
+
+        documents = self.documents
+        plan = None
+        chunk_ids: dict[str, list[tuple[str, Any]]] = defaultdict(list)
+        on_upsert = None
+        if manifest:
+            plan = manifest.plan(
+                container_name, self.documents, delete_removed=delete_removed
+            )
+            documents = plan.documents
+            manifest.mark_pending(plan)
+
+            def on_upsert(document: BaseDocument, item: dict[str, Any]) -> None:
+                chunk_ids[manifest.document_key(document)].append(
+                    (item["id"], vector_store.partition_key_value(item))
+                )
+
         if should_split:
-            documents_to_upload = self.split_documents(**split_document_kwargs)
+            documents_to_upload = (
+                self.split_documents(documents=documents, **split_document_kwargs)
+                if documents
+                else []
+            )
         else:
-            documents_to_upload = self.documents
+            documents_to_upload = documents
         total_tokens = vector_store.embed_upsert_documents(
             documents=documents_to_upload,
             template_iter=self.iter_documents_from_template,
             max_token_limit=max_token_limit,
             document_range=document_range,
+            on_upsert=on_upsert,
         )
+
+        if plan:
+            # documents with chunks outside of document_range stay pending and
+            # keep their previous chunks, they are ingested again on the next run.
+            # Documents split into no chunks are done, their old chunks go.
+            num_chunks = Counter(
+                manifest.document_key(document) for document in documents_to_upload
+            )
+            plan = plan.restrict(
+                key
+                for key in plan.content_hashes
+                if len(chunk_ids.get(key, [])) == num_chunks[key]
+            )
+            manifest.mark_embedded(plan, chunk_ids)
+            vector_store.delete_documents(
+                chunk for chunks in plan.stale_chunks.values() for chunk in chunks
+            )
+
+        # cached agent tool results of the ingested companies are outdated
+        invalidate_document_companies(documents, tool_cache)
         return total_tokens
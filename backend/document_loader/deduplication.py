@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import re
+import zlib
+from collections import defaultdict
+from typing import Iterable, Optional, Sequence, TypeVar
+
+import numpy as np
+
+from backend.models.documents import BaseTextDocument
+
+T = TypeVar("T", bound=BaseTextDocument)
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def optimal_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    """Get the number of LSH bands and rows per band whose S-curve
+    threshold (1/b)^(1/r) is closest to the given threshold."""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashDeduplicator:
+    """Near-duplicate detection over document contents using MinHash and LSH.
+
+    Contents are normalized, split into word shingles and hashed into MinHash
+    signatures. Documents sharing an LSH bucket are compared on their estimated
+    Jaccard similarity, and documents above the threshold are grouped together.
+
+    Attributes:
+    -----------
+    threshold: float
+        Minimum estimated Jaccard similarity for two documents to be duplicates
+    num_perm: int
+        Number of hash permutations of the MinHash signature
+    shingle_size: int
+        Number of words per shingle
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = 0.85,
+        num_perm: Optional[int] = 128,
+        shingle_size: Optional[int] = 5,
+        seed: Optional[int] = 1,
+    ):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = optimal_bands(num_perm, threshold)
+
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def shingles(self, content: str) -> set[int]:
+        tokens = _TOKEN_PATTERN.findall(content.lower())
+        size = min(self.shingle_size, len(tokens)) or 1
+        return {
+            zlib.crc32(" ".join(tokens[i : i + size]).encode("utf-8")) & 0x7FFFFFFF
+            for i in range(max(len(tokens) - size + 1, 1))
+        }
+
+    def signature(self, content: str) -> np.ndarray:
+        """MinHash signature of the content"""
+        shingles = np.fromiter(self.shingles(content), dtype=np.uint64)
+        hashes = (np.outer(shingles, self._a) + self._b) % _MERSENNE_PRIME
+        return hashes.min(axis=0)
+
+    def cluster(self, contents: Sequence[str]) -> list[list[int]]:
+        """Group the indices of near-duplicate contents. Every group is sorted
+        and the groups are ordered by their first index."""
+        signatures = [self.signature(content) for content in contents]
+
+        parents = list(range(len(contents)))
+
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        for band in range(self.bands):
+            buckets: dict[bytes, list[int]] = defaultdict(list)
+            start = band * self.rows
+            for idx, signature in enumerate(signatures):
+                buckets[signature[start : start + self.rows].tobytes()].append(idx)
+
+            for candidates in buckets.values():
+                first = candidates[0]
+                for idx in candidates[1:]:
+                    root_first, root_idx = find(first), find(idx)
+                    if root_first == root_idx:
+                        continue
+                    similarity = np.mean(signatures[first] == signatures[idx])
+                    if similarity >= self.threshold:
+                        parents[max(root_first, root_idx)] = min(root_first, root_idx)
+
+        groups: dict[int, list[int]] = defaultdict(list)
+        for idx in range(len(contents)):
+            groups[find(idx)].append(idx)
+        return sorted(groups.values(), key=lambda group: group[0])
+
+    def deduplicate(self, documents: Iterable[T]) -> list[T]:
+        """Collapse near-duplicate documents, keeping the first document of every
+        group. The sources of the dropped duplicates are recorded in the
+        document_meta.duplicate_sources of the kept document."""
+        documents = list(documents)
+        groups = self.cluster([document.page_content for document in documents])
+
+        deduplicated = []
+        for group in groups:
+            document = documents[group[0]]
+            sources = [documents[idx].document_meta.source for idx in group[1:]]
+            if sources:
+                duplicate_sources = document.document_meta.duplicate_sources
+                document.document_meta.duplicate_sources = list(
+                    dict.fromkeys([*duplicate_sources, *sources])
+                )
+            deduplicated.append(document)
+        return deduplicated
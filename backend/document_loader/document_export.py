@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import typing
+from datetime import datetime
+from os import PathLike
+from typing import Any, Generator, Iterable, Optional, Sequence, Type
+
+import numpy as np
+
+from backend.models import documents as document_models
+from backend.models import json_codec
+from backend.models.documents import BaseDocument
+from backend.models.documents.base_document import _strip_optional
+
+PARQUET_SUFFIXES = (".parquet",)
+JSONL_ZSTD_SUFFIXES = (".jsonl.zst", ".jsonl.zstd")
+
+_META_PREFIX = "document_meta."
+_EMBEDDING_COLUMN = "embedding"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "pyarrow is required for parquet export. Install it with `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstandard is required for compressed jsonl export."
+            " Install it with `pip install zstandard`."
+        ) from e
+    return zstandard
+
+
+def _batched(iterable: Iterable[Any], size: int) -> Generator[list[Any]]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _arrow_type(annotation: Any):
+    """Arrow type of a field annotation. Returns None for fields stored as json strings."""
+    pa = _import_pyarrow()
+    annotation = _strip_optional(annotation)
+    origin = typing.get_origin(annotation) or annotation
+    if annotation is bool:
+        return pa.bool_()
+    if annotation is int:
+        return pa.int64()
+    if annotation is float:
+        return pa.float64()
+    if annotation is datetime:
+        return pa.timestamp("us")
+    if annotation is str or getattr(annotation, "__name__", "") == "HttpUrl":
+        return pa.string()
+    if origin in (list, typing.List):
+        args = typing.get_args(annotation)
+        if not args or args[0] is str:
+            return pa.list_(pa.string())
+    return None
+
+
+def document_columns(document_class: Type[BaseDocument]) -> dict[str, Any]:
+    """Flattened columns of the document class mapped to their arrow types.
+    document_meta fields are prefixed with "document_meta." and columns with
+    type None are stored as json strings."""
+    columns = {}
+    for name, field in document_class.model_fields.items():
+        if name == "document_meta":
+            for meta_name, meta_field in field.annotation.model_fields.items():
+                columns[_META_PREFIX + meta_name] = _arrow_type(meta_field.annotation)
+        else:
+            columns[name] = _arrow_type(field.annotation)
+    return columns
+
+
+def flatten_document(document: BaseDocument, columns: dict[str, Any]) -> dict[str, Any]:
+    """Flatten the document into a row of the given columns"""
+    content = document.model_dump()
+    meta = content.pop("document_meta")
+    row = {}
+    for column, arrow_type in columns.items():
+        if column.startswith(_META_PREFIX):
+            value = meta.get(column[len(_META_PREFIX) :])
+        else:
+            value = content.get(column)
+        if value is not None:
+            if arrow_type is None:
+                value = json.dumps(value, default=str)
+            elif str(arrow_type) == "string":
+                value = str(value)
+        row[column] = value
+    return row
+
+
+def unflatten_row(row: dict[str, Any], json_columns: set[str]) -> dict[str, Any]:
+    """Inverse of flatten_document"""
+    content: dict[str, Any] = {"document_meta": {}}
+    for column, value in row.items():
+        if column in json_columns and value is not None:
+            value = json.loads(value)
+        if column.startswith(_META_PREFIX):
+            content["document_meta"][column[len(_META_PREFIX) :]] = value
+        else:
+            content[column] = value
+    return content
+
+
+def write_parquet(
+    documents: Iterable[BaseDocument],
+    filepath: PathLike | str,
+    document_class: Optional[Type[BaseDocument]] = None,
+    embeddings: Optional[Sequence[Sequence[float]]] = None,
+    batch_size: Optional[int] = 1024,
+    compression: Optional[str] = "zstd",
+) -> int:
+    """Stream the documents to a parquet file with flattened document_meta columns.
+
+    Args:
+    ------
+    documents: Iterable[BaseDocument]
+        The documents to export, all of the same class
+    filepath: PathLike | str
+        The parquet file path
+    document_class: Optional[Type[BaseDocument]]
+        The class of the documents, by default the class of the first document
+    embeddings: Optional[Sequence[Sequence[float]]]
+        Embeddings of the documents in the same order, stored as a fixed size
+        float32 list column
+    batch_size: Optional[int]
+        Number of documents per row group
+    compression: Optional[str]
+        Parquet compression codec
+
+    Returns:
+    --------
+    count: int
+        Number of exported documents
+    """
+    pa = _import_pyarrow()
+    documents = iter(documents)
+    first = next(documents, None)
+    if first is None:
+        return 0
+    if document_class is None:
+        document_class = type(first)
+
+    columns = document_columns(document_class)
+    row_schema = pa.schema(
+        [
+            pa.field(name, arrow_type if arrow_type else pa.string())
+            for name, arrow_type in columns.items()
+        ]
+    )
+    schema = row_schema
+    dimensions = None
+    if embeddings is not None:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        dimensions = embeddings.shape[1]
+        schema = schema.append(
+            pa.field(_EMBEDDING_COLUMN, pa.list_(pa.float32(), dimensions))
+        )
+    json_columns = [name for name, arrow_type in columns.items() if arrow_type is None]
+    schema = schema.with_metadata(
+        {
+            "document_type": document_class.__name__,
+            "json_columns": json.dumps(json_columns),
+        }
+    )
+
+    count = 0
+    with pa.parquet.ParquetWriter(filepath, schema, compression=compression) as writer:
+        for batch in _batched(itertools.chain([first], documents), batch_size):
+            table = pa.Table.from_pylist(
+                [flatten_document(document, columns) for document in batch],
+                schema=row_schema,
+            )
+            if dimensions:
+                batch_embeddings = embeddings[count : count + len(batch)]
+                table = table.append_column(
+                    schema.field(_EMBEDDING_COLUMN),
+                    pa.FixedSizeListArray.from_arrays(
+                        pa.array(batch_embeddings.reshape(-1), pa.float32()),
+                        dimensions,
+                    ),
+                )
+            writer.write_table(table.replace_schema_metadata(schema.metadata))
+            count += len(batch)
+    return count
+
+
+def iter_parquet(
+    filepath: PathLike | str,
+    document_class: Optional[Type[BaseDocument]] = None,
+    with_embeddings: Optional[bool] = False,
+    batch_size: Optional[int] = 1024,
+    validate: Optional[bool] = False,
+) -> Generator[BaseDocument | tuple[BaseDocument, Optional[np.ndarray]]]:
+    """Read documents from a parquet file written by write_parquet. The rows are
+    trusted (see construct_trusted) unless validate is set.
+
+    Yields:
+    -------
+    document: BaseDocument | tuple[BaseDocument, Optional[np.ndarray]]
+        The document, or the document with its float32 embedding if with_embeddings
+    """
+    pa = _import_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(filepath)
+    metadata = parquet_file.schema_arrow.metadata
+    if document_class is None:
+        document_class = getattr(
+            document_models, metadata[b"document_type"].decode("utf-8")
+        )
+    json_columns = set(json.loads(metadata[b"json_columns"]))
+    has_embeddings = _EMBEDDING_COLUMN in parquet_file.schema_arrow.names
+
+    for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+        embeddings = None
+        if has_embeddings:
+            column = record_batch.column(_EMBEDDING_COLUMN)
+            embeddings = column.flatten().to_numpy().reshape(len(column), -1)
+            record_batch = record_batch.drop_columns([_EMBEDDING_COLUMN])
+        for idx, row in enumerate(record_batch.to_pylist()):
+            row = unflatten_row(row, json_columns)
+            if validate:
+                document = document_class(**row)
+            else:
+                document = document_class.from_trusted(row)
+            if with_embeddings:
+                yield document, embeddings[idx] if embeddings is not None else None
+            else:
+                yield document
+
+
+def write_jsonl_zst(
+    documents: Iterable[BaseDocument],
+    filepath: PathLike | str,
+    embeddings: Optional[Sequence[Sequence[float]]] = None,
+    level: Optional[int] = 3,
+) -> int:
+    """Stream the documents to a zstd compressed jsonl file, one to_json() per line.
+    Embeddings are stored under the "embedding" key of every line.
+
+    Returns:
+    --------
+    count: int
+        Number of exported documents
+    """
+    zstandard = _import_zstandard()
+    embeddings = iter(embeddings) if embeddings is not None else None
+    count = 0
+    with open(filepath, "wb") as file:
+        compressor = zstandard.ZstdCompressor(level=level)
+        with compressor.stream_writer(file) as writer:
+            for document in documents:
+                line = document.to_json()
+                if embeddings is not None:
+                    line[_EMBEDDING_COLUMN] = np.asarray(
+                        next(embeddings), dtype=np.float32
+                    )
+                writer.write(json_codec.dumps_bytes(line) + b"\n")
+                count += 1
+    return count
+
+
+def iter_jsonl_zst(
+    filepath: PathLike | str,
+    document_class: Type[BaseDocument],
+    with_embeddings: Optional[bool] = False,
+    validate: Optional[bool] = False,
+) -> Generator[BaseDocument | tuple[BaseDocument, Optional[np.ndarray]]]:
+    """Read documents from a zstd compressed jsonl file written by
+    write_jsonl_zst. The lines are trusted (see construct_trusted) unless
+    validate is set."""
+    zstandard = _import_zstandard()
+    with open(filepath, "rb") as file:
+        reader = zstandard.ZstdDecompressor().stream_reader(file)
+        for line in io.TextIOWrapper(reader, encoding="utf-8"):
+            content = json_codec.loads(line)
+            embedding = content.pop(_EMBEDDING_COLUMN, None)
+            if validate:
+                document = document_class(**content)
+            else:
+                document = document_class.from_trusted(content)
+            if with_embeddings:
+                if embedding is not None:
+                    embedding = np.asarray(embedding, dtype=np.float32)
+                yield document, embedding
+            else:
+                yield document
+
+
+def export_documents(
+    documents: Iterable[BaseDocument],
+    filepath: PathLike | str,
+    embeddings: Optional[Sequence[Sequence[float]]] = None,
+) -> int:
+    """Export the documents in the format given by the file suffix
+    (.parquet or .jsonl.zst)"""
+    filepath_str = str(filepath)
+    if filepath_str.endswith(PARQUET_SUFFIXES):
+        return write_parquet(documents, filepath, embeddings=embeddings)
+    if filepath_str.endswith(JSONL_ZSTD_SUFFIXES):
+        return write_jsonl_zst(documents, filepath, embeddings=embeddings)
+    raise ValueError(
+        f"Unsupported export format: {filepath}."
+        f" Supported suffixes are {PARQUET_SUFFIXES + JSONL_ZSTD_SUFFIXES}"
+    )
+
+
+def read_documents(
+    filepath: PathLike | str,
+    document_class: Optional[Type[BaseDocument]] = None,
+) -> list[BaseDocument]:
+    """Read documents exported by export_documents"""
+    filepath_str = str(filepath)
+    if filepath_str.endswith(PARQUET_SUFFIXES):
+        return list(iter_parquet(filepath, document_class))
+    if filepath_str.endswith(JSONL_ZSTD_SUFFIXES):
+        if document_class is None:
+            raise ValueError(
+                f"document_class must be provided to read {filepath}, jsonl exports"
+                " do not store the document type"
+            )
+        return list(iter_jsonl_zst(filepath, document_class))
+    raise ValueError(f"Unsupported export format: {filepath}")
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from os import PathLike
+from typing import Any, Iterable, Optional
+
+from backend.models.documents import BaseDocument
+
+
+class EmbeddingStatus:
+    PENDING = "pending"
+    EMBEDDED = "embedded"
+
+
+@dataclass
+class IngestionPlan:
+    """Documents to (re-)ingest and chunks to delete for a single ingestion run.
+
+    Attributes:
+    -----------
+    container_name: str
+        The container the plan was computed for
+    documents: list[BaseDocument]
+        New or modified documents
+    content_hashes: dict[str, str]
+        Content hash of every new or modified document key
+    stale_chunks: dict[str, list[tuple[str, Any]]]
+        Previously uploaded chunks (id, partition key) of the modified documents
+    removed_keys: list[str]
+        Document keys present in the manifest but missing from the current load
+    unchanged_keys: list[str]
+        Document keys that are skipped in this run
+    """
+
+    container_name: str
+    documents: list[BaseDocument] = field(default_factory=list)
+    content_hashes: dict[str, str] = field(default_factory=dict)
+    stale_chunks: dict[str, list[tuple[str, Any]]] = field(default_factory=dict)
+    removed_keys: list[str] = field(default_factory=list)
+    unchanged_keys: list[str] = field(default_factory=list)
+
+    def restrict(self, keys: Iterable[str]) -> IngestionPlan:
+        """Plan limited to the given new or modified documents, e.g. those fully
+        uploaded by a run with a limited document range. Removed documents are
+        kept."""
+        keys = set(keys) & self.content_hashes.keys()
+        return IngestionPlan(
+            container_name=self.container_name,
+            documents=[
+                document
+                for document in self.documents
+                if IngestionManifest.document_key(document) in keys
+            ],
+            content_hashes={
+                key: content_hash
+                for key, content_hash in self.content_hashes.items()
+                if key in keys
+            },
+            stale_chunks={
+                key: chunks
+                for key, chunks in self.stale_chunks.items()
+                if key in keys or key in self.removed_keys
+            },
+            removed_keys=list(self.removed_keys),
+            unchanged_keys=list(self.unchanged_keys),
+        )
+
+
+class IngestionManifest:
+    """Local SQLite manifest of ingested documents.
+
+    Every document is identified by its key (document type and source url) and
+    stored along with a hash of its content, the ids of the chunks uploaded to
+    the vector store and its embedding status. The manifest is used to only
+    process new or modified documents on subsequent ingestion runs.
+
+    Examples:
+        >>> manifest = IngestionManifest("ingestion_manifest.db")
+        >>> loader = NewsDocumentLoader("news.json")
+        >>> loader.embed_upsert_to_vector_store(
+        ...     database_name="smart-wealth-main-db",
+        ...     container_name="stock-news",
+        ...     manifest=manifest,
+        ... )
+    """
+
+    def __init__(self, db_path: PathLike | str = "ingestion_manifest.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._initialize()
+
+    def _initialize(self):
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    container_name TEXT NOT NULL,
+                    document_key TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    chunk_ids TEXT NOT NULL DEFAULT '[]',
+                    status TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (container_name, document_key)
+                )
+                """)
+
+    @staticmethod
+    def document_key(document: BaseDocument) -> str:
+        """Identity of the document. Chunks of a split document share the
+        document_meta of their parent and hence the same key."""
+        return f"{document.document_type}:{document.document_meta.source}"
+
+    @staticmethod
+    def content_hash(documents: Iterable[BaseDocument]) -> str:
+        """Hash of the documents content, ignoring the creation timestamp. An
+        empty duplicate_sources is left out, so documents without near
+        duplicates keep the hash they had before the field existed."""
+        sha = hashlib.sha256()
+        for document in documents:
+            content = document.to_json()
+            content["document_meta"].pop("date_created", None)
+            if not content["document_meta"].get("duplicate_sources"):
+                content["document_meta"].pop("duplicate_sources", None)
+            sha.update(json.dumps(content, sort_keys=True).encode("utf-8"))
+        return sha.hexdigest()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def get(self, container_name: str, document_key: str) -> Optional[dict[str, Any]]:
+        """Get the manifest entry of a document"""
+        row = self._connection.execute(
+            "SELECT content_hash, chunk_ids, status, updated_at FROM documents"
+            " WHERE container_name = ? AND document_key = ?",
+            (container_name, document_key),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "content_hash": row[0],
+            "chunk_ids": [tuple(chunk) for chunk in json.loads(row[1])],
+            "status": row[2],
+            "updated_at": row[3],
+        }
+
+    def plan(
+        self,
+        container_name: str,
+        documents: Iterable[BaseDocument],
+        delete_removed: Optional[bool] = False,
+    ) -> IngestionPlan:
+        """Compare the documents with the manifest and plan the ingestion run.
+
+        Args:
+        ------
+        container_name: str
+            The container the documents are ingested into
+        documents: Iterable[BaseDocument]
+            All documents of the current load
+        delete_removed: Optional[bool]
+            Whether documents missing from the current load should be deleted.
+            Keep disabled for loaders that only provide the latest documents (e.g. daily news).
+
+        Returns:
+        --------
+        plan: IngestionPlan
+        """
+        grouped: dict[str, list[BaseDocument]] = defaultdict(list)
+        for document in documents:
+            grouped[self.document_key(document)].append(document)
+
+        known = {
+            row[0]: (row[1], row[2], row[3])
+            for row in self._connection.execute(
+                "SELECT document_key, content_hash, chunk_ids, status FROM documents"
+                " WHERE container_name = ?",
+                (container_name,),
+            )
+        }
+
+        plan = IngestionPlan(container_name=container_name)
+        for key, group in grouped.items():
+            content_hash = self.content_hash(group)
+            if key in known:
+                known_hash, chunk_ids, status = known[key]
+                if known_hash == content_hash and status == EmbeddingStatus.EMBEDDED:
+                    plan.unchanged_keys.append(key)
+                    continue
+                plan.stale_chunks[key] = [tuple(c) for c in json.loads(chunk_ids)]
+            plan.documents.extend(group)
+            plan.content_hashes[key] = content_hash
+
+        if delete_removed:
+            for key, (_, chunk_ids, _) in known.items():
+                if key not in grouped:
+                    plan.removed_keys.append(key)
+                    plan.stale_chunks[key] = [tuple(c) for c in json.loads(chunk_ids)]
+
+        return plan
+
+    def mark_pending(self, plan: IngestionPlan) -> None:
+        """Mark all documents of the plan as pending, keeping their old chunk ids"""
+        now = datetime.now().isoformat()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                """
+                INSERT INTO documents (container_name, document_key, content_hash, status, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (container_name, document_key) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    (
+                        plan.container_name,
+                        key,
+                        content_hash,
+                        EmbeddingStatus.PENDING,
+                        now,
+                    )
+                    for key, content_hash in plan.content_hashes.items()
+                ],
+            )
+
+    def mark_embedded(
+        self, plan: IngestionPlan, chunk_ids: dict[str, list[tuple[str, Any]]]
+    ) -> None:
+        """Record the uploaded chunks of the plan and drop removed documents"""
+        now = datetime.now().isoformat()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE documents SET chunk_ids = ?, status = ?, updated_at = ?"
+                " WHERE container_name = ? AND document_key = ?",
+                [
+                    (
+                        json.dumps(chunk_ids.get(key, [])),
+                        EmbeddingStatus.EMBEDDED,
+                        now,
+                        plan.container_name,
+                        key,
+                    )
+                    for key in plan.content_hashes
+                ],
+            )
+            self._connection.executemany(
+                "DELETE FROM documents WHERE container_name = ? AND document_key = ?",
+                [(plan.container_name, key) for key in plan.removed_keys],
+            )
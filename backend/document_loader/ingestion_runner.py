@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from backend.core.tool_cache import ToolResultCache, invalidate_document_companies
+from backend.document_loader.base_document_loader import BaseDocumentLoader
+from backend.document_loader.ingestion_manifest import IngestionManifest
+from backend.models.documents import BaseDocument
+from backend.vector_stores import AzureCosmosVectorStore
+from backend.vector_stores.tokens import (
+    count_tokens_batch,
+    token_limit,
+    truncate_to_limit,
+)
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageReport:
+    """Counters of a single pipeline stage"""
+
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0
+    max_queue_size: int = 0
+
+    def throughput(self, wall_seconds: float) -> float:
+        return self.items_out / wall_seconds if wall_seconds else 0.0
+
+
+@dataclass
+class ThroughputReport:
+    """Summary of an ingestion run"""
+
+    stages: list[StageReport] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    total_tokens: int = 0
+
+    def __str__(self) -> str:
+        lines = [
+            f"{'stage':<8} {'workers':>7} {'in':>7} {'out':>7} {'busy(s)':>9}"
+            f" {'items/s':>9} {'max queue':>9}"
+        ]
+        for stage in self.stages:
+            lines.append(
+                f"{stage.name:<8} {stage.workers:>7} {stage.items_in:>7}"
+                f" {stage.items_out:>7} {stage.busy_seconds:>9.2f}"
+                f" {stage.throughput(self.wall_seconds):>9.2f}"
+                f" {stage.max_queue_size:>9}"
+            )
+        lines.append(
+            f"wall time: {self.wall_seconds:.2f}s, total tokens: {self.total_tokens}"
+        )
+        return "\n".join(lines)
+
+
+class _TokenRateLimiter:
+    """Sliding one minute window of embedding token usage"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._usage: deque[tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+
+    def wait(self, tokens: int) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._usage and now - self._usage[0][0] > 60:
+                    self._usage.popleft()
+                used = sum(t for _, t in self._usage)
+                if not self._usage or used + tokens <= self.tokens_per_minute:
+                    self._usage.append((now, tokens))
+                    return
+                sleep_for = 60 - (now - self._usage[0][0])
+            time.sleep(max(sleep_for, 0.1))
+
+
+class IngestionRunner:
+    """Pipelined ingestion of a loader into the vector store.
+
+    The stages (tag, split, embed, upsert) run on their own worker threads and
+    are connected by bounded queues, so splitting, embedding requests and
+    Cosmos writes overlap while a slow stage applies backpressure upstream.
+    Works with every loader, loaders without split_documents are passed
+    through unsplit.
+
+    The loaders read their whole file when they are created, so by default
+    loading is done before the run starts. To overlap reading with the stages,
+    pass an iterator of documents to run, e.g. iter_parquet of an export. With
+    a manifest the documents are read in full first, as the ingestion plan
+    compares the whole load with the manifest.
+
+    Examples:
+        >>> loader = WebsiteDocumentLoader("bob_web.json", source_map=SourceMap.LOAN)
+        >>> runner = IngestionRunner(
+        ...     loader,
+        ...     database_name="smart-wealth-main-db",
+        ...     container_name="bob-web",
+        ...     should_split=True,
+        ...     embed_workers=4,
+        ... )
+        >>> report = runner.run()
+        >>> print(report)
+    """
+
+    def __init__(
+        self,
+        loader: BaseDocumentLoader,
+        database_name: str,
+        container_name: str,
+        should_split: Optional[bool] = False,
+        split_document_kwargs: Optional[dict] = None,
+        tag_kwargs: Optional[dict] = None,
+        split_workers: Optional[int] = 1,
+        embed_workers: Optional[int] = 4,
+        upsert_workers: Optional[int] = 4,
+        embed_batch_size: Optional[int] = 16,
+        queue_size: Optional[int] = 64,
+        model: Optional[str] = "text-embedding-ada-002",
+        rate_limit: Optional[int] = 349000,
+        max_token_limit: Optional[int] = float("inf"),
+        manifest: Optional[IngestionManifest] = None,
+        delete_removed: Optional[bool] = False,
+        vector_store: Optional[AzureCosmosVectorStore] = None,
+        tool_cache: Optional[ToolResultCache] = None,
+    ):
+        self.loader = loader
+        self.container_name = container_name
+        self.should_split = should_split
+        self.split_document_kwargs = split_document_kwargs or {}
+        self.tag_kwargs = tag_kwargs
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+        self.model = model
+        self.max_token_limit = max_token_limit
+        self.manifest = manifest
+        self.delete_removed = delete_removed
+        self.tool_cache = tool_cache
+        self.vector_store = (
+            vector_store
+            if vector_store
+            else AzureCosmosVectorStore(
+                database_name=database_name, container_name=container_name
+            )
+        )
+        self.workers = {
+            "tag": 1,
+            "split": split_workers,
+            "embed": embed_workers,
+            "upsert": upsert_workers,
+        }
+
+        self._rate_limiter = _TokenRateLimiter(rate_limit)
+        self._stop = threading.Event()
+        self._errors: list[BaseException] = []
+        self._lock = threading.Lock()
+        self._total_tokens = 0
+        self._chunk_ids: dict[str, list[tuple[str, Any]]] = defaultdict(list)
+
+    def _put(self, out_queue: queue.Queue, item: Any) -> bool:
+        """Put with backpressure, giving up if the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _tag(self, document: BaseDocument) -> list[BaseDocument]:
+        if self.tag_kwargs is not None:
+            self.loader.set_tags([document], **self.tag_kwargs)
+        return [document]
+
+    def _split(self, document: BaseDocument) -> list[BaseDocument]:
+        if not self.should_split:
+            return [document]
+        try:
+            return self.loader.split_documents(
+                documents=[document], **self.split_document_kwargs
+            )
+        except NotImplementedError:
+            return [document]
+
+    def _embed(
+        self, batch: list[BaseDocument]
+    ) -> list[tuple[BaseDocument, list[float]]]:
+        contents = [
+            content for content, _ in self.loader.iter_documents_from_template(batch)
+        ]
+        counts = count_tokens_batch(contents, self.model)
+        limit = token_limit(self.model)
+        for idx, count in enumerate(counts):
+            if count > limit:
+                logger.warning(
+                    f"Truncating a {count} token input to the {limit} token limit"
+                    f" of {self.model}"
+                )
+                contents[idx], counts[idx] = truncate_to_limit(
+                    contents[idx], self.model, limit
+                )
+        self._rate_limiter.wait(sum(counts))
+        response = self.vector_store.embed_texts(contents, model=self.model)
+        with self._lock:
+            self._total_tokens += response.usage.total_tokens
+            if self._total_tokens > self.max_token_limit:
+                raise RuntimeError(
+                    f"Max token limit exceeded. Max token limit is {self.max_token_limit}."
+                    f" Current Usage is {self._total_tokens}."
+                )
+        embeddings = sorted(response.data, key=lambda e: e.index)
+        return [(document, e.embedding) for document, e in zip(batch, embeddings)]
+
+    def _upsert(self, item: tuple[BaseDocument, list[float]]) -> list[dict]:
+        document, embedding = item
+        upserted = self.vector_store.upsert_document(document, embedding=embedding)
+        if self.manifest:
+            with self._lock:
+                self._chunk_ids[self.manifest.document_key(document)].append(
+                    (upserted["id"], self.vector_store.partition_key_value(upserted))
+                )
+        return [upserted]
+
+    def _run_stage(
+        self,
+        report: StageReport,
+        in_queue: queue.Queue,
+        out_queue: Optional[queue.Queue],
+        func: Callable[[Any], Iterable[Any]],
+        finished: Callable[[], None],
+        batch_size: Optional[int] = None,
+    ) -> None:
+        def process(item):
+            start = time.perf_counter()
+            results = func(item)
+            with self._lock:
+                report.busy_seconds += time.perf_counter() - start
+                report.items_in += len(item) if batch_size else 1
+                report.items_out += len(results)
+            if out_queue is not None:
+                for result in results:
+                    if not self._put(out_queue, result):
+                        return
+
+        batch = []
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = in_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                with self._lock:
+                    report.max_queue_size = max(
+                        report.max_queue_size, in_queue.qsize() + 1
+                    )
+                if item is _DONE:
+                    break
+                if batch_size:
+                    batch.append(item)
+                    if len(batch) >= batch_size:
+                        process(batch)
+                        batch = []
+                else:
+                    process(item)
+            if batch and not self._stop.is_set():
+                process(batch)
+        except BaseException as e:
+            logger.exception(f"Ingestion stage {report.name} failed")
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            finished()
+
+    def run(
+        self, documents: Optional[Iterable[BaseDocument]] = None
+    ) -> ThroughputReport:
+        """Run the pipeline to completion and report the throughput of every stage
+
+        Args:
+        ------
+        documents: Optional[Iterable[BaseDocument]]
+            Documents to ingest, by default the documents of the loader. An
+            iterator is consumed while the stages run, unless a manifest is set.
+        """
+        start = time.perf_counter()
+
+        if documents is None:
+            documents = self.loader.documents
+        plan = None
+        if self.manifest:
+            plan = self.manifest.plan(
+                self.container_name,
+                list(documents),
+                delete_removed=self.delete_removed,
+            )
+            documents = plan.documents
+            self.manifest.mark_pending(plan)
+
+        stages = [
+            ("tag", self._tag, None),
+            ("split", self._split, None),
+            ("embed", self._embed, self.embed_batch_size),
+            ("upsert", self._upsert, None),
+        ]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+        reports = [StageReport(name, self.workers[name]) for name, _, _ in stages]
+        threads = []
+
+        for idx, (name, func, batch_size) in enumerate(stages):
+            out_queue = queues[idx + 1] if idx + 1 < len(stages) else None
+            remaining = [self.workers[name]]
+
+            def finished(remaining=remaining, out_queue=out_queue, idx=idx):
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and out_queue is not None:
+                    for _ in range(self.workers[stages[idx + 1][0]]):
+                        self._put(out_queue, _DONE)
+
+            for worker in range(self.workers[name]):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(reports[idx], queues[idx], out_queue, func, finished),
+                    kwargs={"batch_size": batch_size},
+                    name=f"ingestion-{name}-{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        ingested = []
+        for document in documents:
+            if not self._put(queues[0], document):
+                break
+            ingested.append(document)
+        for _ in range(self.workers["tag"]):
+            self._put(queues[0], _DONE)
+
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        if plan:
+            self.manifest.mark_embedded(plan, self._chunk_ids)
+            self.vector_store.delete_documents(
+                chunk for chunks in plan.stale_chunks.values() for chunk in chunks
+            )
+
+        # cached agent tool results of the ingested companies are outdated
+        invalidate_document_companies(ingested, self.tool_cache)
+
+        report = ThroughputReport(
+            stages=reports,
+            wall_seconds=time.perf_counter() - start,
+            total_tokens=self._total_tokens,
+        )
+        logger.info(f"Ingestion finished\n{report}")
+        return report
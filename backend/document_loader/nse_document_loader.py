@@ -1,18 +1,29 @@
 from __future__ import annotations
 
 import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from functools import cache
 
 import requests
 import json
 from os import PathLike
-from typing import Optional
+from typing import Optional, Sequence
 
 from backend.document_loader.base_document_loader import BaseDocumentLoader
 from backend.document_loader.url_config import NseUrlConfig
 from backend.models.documents import NseIndexDocument, NseIndexDocumentMeta
 
-from tenacity import retry, stop_after_attempt, retry_if_result
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    retry,
+    stop_after_attempt,
+    retry_if_result,
+    retry_if_exception_type,
+    wait_exponential,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def is_none_result(result):
@@ -70,37 +81,45 @@ class NseIndexLoader(BaseDocumentLoader[NseIndexDocument]):
 
     def _load_documents(self, dataset: list[dict]):
         for doc in dataset:
-            if "meta" in doc:
-                metadata = NseIndexDocumentMeta(
-                    source=self.request_config["url"],
-                    open=doc["open"],
-                    day_high=doc["dayHigh"],
-                    day_low=doc["dayLow"],
-                    year_high=doc["yearHigh"],
-                    year_low=doc["yearLow"],
-                    last_price=doc["lastPrice"],
-                    change=doc["change"],
-                    percentage_change=doc["pChange"],
-                    last_updated_time=datetime.datetime.strptime(
-                        doc["lastUpdateTime"], "%d-%b-%Y %H:%M:%S"
-                    ),
-                    previous_close=doc["previousClose"],
-                    total_traded_volume=doc["totalTradedVolume"],
-                    percentage_change_365=doc["perChange365d"],
-                    percentage_change_30=doc["perChange30d"],
-                    chart_day_img_path=doc["chartTodayPath"],
-                    chart_365_img_path=doc["chart365dPath"],
-                    chart_30_img_path=doc["chart30dPath"],
-                )
-                document = NseIndexDocument(
-                    symbol=doc["symbol"],
-                    company_name=doc["meta"]["companyName"],
-                    industry=doc["meta"].get("industry", "NA"),
-                    isin=doc["meta"]["isin"],
-                    document_meta=metadata,
-                )
+            document = self.document_from_row(doc, self.request_config["url"])
+            if document:
                 self.documents.append(document)
 
+    @staticmethod
+    def document_from_row(doc: dict, source: str) -> Optional[NseIndexDocument]:
+        """Parse a constituent row of the NSE index API. Returns None for rows
+        without meta, such as the index itself."""
+        if "meta" not in doc:
+            return None
+        metadata = NseIndexDocumentMeta(
+            source=source,
+            open=doc["open"],
+            day_high=doc["dayHigh"],
+            day_low=doc["dayLow"],
+            year_high=doc["yearHigh"],
+            year_low=doc["yearLow"],
+            last_price=doc["lastPrice"],
+            change=doc["change"],
+            percentage_change=doc["pChange"],
+            last_updated_time=datetime.datetime.strptime(
+                doc["lastUpdateTime"], "%d-%b-%Y %H:%M:%S"
+            ),
+            previous_close=doc["previousClose"],
+            total_traded_volume=doc["totalTradedVolume"],
+            percentage_change_365=doc["perChange365d"],
+            percentage_change_30=doc["perChange30d"],
+            chart_day_img_path=doc["chartTodayPath"],
+            chart_365_img_path=doc["chart365dPath"],
+            chart_30_img_path=doc["chart30dPath"],
+        )
+        return NseIndexDocument(
+            symbol=doc["symbol"],
+            company_name=doc["meta"]["companyName"],
+            industry=doc["meta"].get("industry", "NA"),
+            isin=doc["meta"]["isin"],
+            document_meta=metadata,
+        )
+
     @staticmethod
     @cache
     @retry(stop=stop_after_attempt(5), reraise=True)
@@ -179,3 +198,103 @@ class NseIndexLoader(BaseDocumentLoader[NseIndexDocument]):
     def get_company_names(self):
         for company_name in self.iter_from_attrs(["company_name"]):
             yield company_name
+
+
+class NseMultiIndexLoader(BaseDocumentLoader[NseIndexDocument]):
+    """Document Loader for multiple NSE indices.
+    The indices are fetched concurrently over a shared keep-alive session
+    primed with the NSE cookies, and their constituents are merged into one
+    document set deduplicated by symbol.
+
+    Attributes:
+    -----------
+    indices: Sequence[str]
+        The indices to load, by default NseUrlConfig.indices
+    max_workers: int
+        Maximum number of concurrent requests, by default one per index
+    index_members: dict[str, list[str]]
+        The indices every symbol is a constituent of
+    failed_indices: dict[str, Exception]
+        The indices that could not be fetched after retrying
+    """
+
+    def __init__(
+        self,
+        indices: Optional[Sequence[str]] = None,
+        max_workers: Optional[int] = None,
+        session: Optional[requests.Session] = None,
+        tag_set: Optional[list] = None,
+    ):
+        self.indices = list(indices) if indices else list(NseUrlConfig.indices)
+        self.max_workers = max_workers if max_workers else len(self.indices)
+        self.session = session if session else self.create_session(self.max_workers)
+        self.index_members: dict[str, list[str]] = {}
+        self.failed_indices: dict[str, Exception] = {}
+        super().__init__(tag_set)
+
+        self._initialize()
+
+    @staticmethod
+    def create_session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.headers.update(NseUrlConfig.get_session_config()["headers"])
+        return session
+
+    def prime_session(self) -> None:
+        """Visit the NSE home page to obtain the cookies required by the API"""
+        self.session.get(**NseUrlConfig.get_session_config())
+
+    @retry(
+        stop=stop_after_attempt(4),
+        wait=wait_exponential(multiplier=0.5, max=8),
+        retry=retry_if_exception_type((requests.RequestException, ValueError)),
+        reraise=True,
+    )
+    def fetch_index(self, index: str) -> list[dict]:
+        response = self.session.get(timeout=10, **NseUrlConfig.get_index_config(index))
+        if response.status_code in (401, 403):
+            self.prime_session()
+        response.raise_for_status()
+        return response.json()["data"]
+
+    def _fetch_index(self, index: str) -> Optional[list[dict]]:
+        try:
+            return self.fetch_index(index)
+        except Exception as e:
+            logger.warning(f"Failed to fetch NSE index {index}: {e}")
+            self.failed_indices[index] = e
+            return None
+
+    def _initialize(self):
+        try:
+            self.prime_session()
+        except requests.RequestException as e:
+            logger.warning(f"Failed to prime the NSE session: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            datasets = list(executor.map(self._fetch_index, self.indices))
+
+        for index, dataset in zip(self.indices, datasets):
+            if dataset:
+                self._load_documents(dataset, index)
+
+    def _load_documents(self, dataset: list[dict], index: str):
+        source = NseUrlConfig.get_index_config(index)["url"]
+        for doc in dataset:
+            if "meta" not in doc:
+                continue
+            symbol = doc["symbol"]
+            if symbol not in self.index_members:
+                self.index_members[symbol] = []
+                self.documents.append(NseIndexLoader.document_from_row(doc, source))
+            self.index_members[symbol].append(index)
+
+    def get_symbols(self):
+        for symbol in self.iter_from_attrs("symbol"):
+            yield symbol
+
+    def get_company_names(self):
+        for company_name in self.iter_from_attrs(["company_name"]):
+            yield company_name
@@ -15,3 +15,71 @@ def nse_index_data() -> list[dict]:
     config = NseUrlConfig.get_index_config("NIFTY 50")
     response = requests.get(**config)
     return response.json()["data"]
+
+
+def make_nse_index_row(symbol: str, company_name: str) -> dict:
+    return {
+        "symbol": symbol,
+        "open": 100.0,
+        "dayHigh": 110.0,
+        "dayLow": 95.0,
+        "yearHigh": 150.0,
+        "yearLow": 80.0,
+        "lastPrice": 105.0,
+        "change": 5.0,
+        "pChange": 5.0,
+        "lastUpdateTime": "18-Oct-2024 16:00:00",
+        "previousClose": 100.0,
+        "totalTradedVolume": 1000,
+        "perChange365d": 10.0,
+        "perChange30d": 2.0,
+        "chartTodayPath": f"https://static.nseindia.com/{symbol}-today.svg",
+        "chart365dPath": f"https://static.nseindia.com/{symbol}-365.svg",
+        "chart30dPath": f"https://static.nseindia.com/{symbol}-30.svg",
+        "meta": {"companyName": company_name, "isin": f"INE{symbol}", "industry": "IT"},
+    }
+
+
+class FakeNseResponse:
+    def __init__(self, data: list[dict], status_code: int = 200):
+        self.data = data
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def json(self):
+        return {"data": self.data}
+
+
+class FakeNseSession:
+    """Session returning canned index constituents keyed by index name"""
+
+    def __init__(self, index_data: dict[str, list[dict]]):
+        self.index_data = index_data
+        self.requested_urls = []
+
+    def get(self, url: str, **kwargs) -> FakeNseResponse:
+        self.requested_urls.append(url)
+        for index, data in self.index_data.items():
+            if url.endswith(f"index={index}"):
+                return FakeNseResponse(data)
+        return FakeNseResponse([])
+
+
+@pytest.fixture
+def nse_multi_index_session() -> FakeNseSession:
+    return FakeNseSession(
+        {
+            "NIFTY 50": [
+                {"symbol": "NIFTY 50"},
+                make_nse_index_row("TCS", "Tata Consultancy Services Limited"),
+                make_nse_index_row("INFY", "Infosys Limited"),
+            ],
+            "NIFTY IT": [
+                make_nse_index_row("INFY", "Infosys Limited"),
+                make_nse_index_row("LTIM", "LTIMindtree Limited"),
+            ],
+        }
+    )
@@ -0,0 +1,40 @@
+from backend.document_loader.deduplication import MinHashDeduplicator, optimal_bands
+from backend.models.documents import WebsiteDocument, WebsiteBaseDocumentMeta
+
+ARTICLE = (
+    "Reliance Industries reported a twelve percent rise in quarterly profit on"
+    " Friday, beating analyst estimates as its retail and telecom businesses"
+    " offset weakness in the oil to chemicals segment. Revenue from operations"
+    " rose to a record high while the board approved a bonus issue of shares."
+)
+
+
+def make_document(source: str, page_content: str) -> WebsiteDocument:
+    metadata = WebsiteBaseDocumentMeta(source=source, title="sample title")
+    return WebsiteDocument(page_content=page_content, document_meta=metadata)
+
+
+class TestMinHashDeduplicator:
+    def test_optimal_bands(self):
+        bands, rows = optimal_bands(128, 0.85)
+        assert bands * rows == 128
+        assert abs((1 / bands) ** (1 / rows) - 0.85) < 0.1
+
+    def test_near_duplicates_are_collapsed(self):
+        documents = [
+            make_document("https://a.com", ARTICLE),
+            make_document("https://b.com", "An unrelated article about gold prices."),
+            make_document("https://c.com", ARTICLE + " Shares closed higher."),
+            make_document("https://d.com", ARTICLE.upper()),
+        ]
+        deduplicated = MinHashDeduplicator(threshold=0.8).deduplicate(documents)
+
+        assert [d.document_meta.source for d in deduplicated] == [
+            "https://a.com",
+            "https://b.com",
+        ]
+        assert deduplicated[0].document_meta.duplicate_sources == [
+            "https://c.com",
+            "https://d.com",
+        ]
+        assert deduplicated[1].document_meta.duplicate_sources == []
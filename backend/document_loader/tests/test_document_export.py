@@ -0,0 +1,100 @@
+import datetime
+import json
+
+import numpy as np
+import pytest
+
+from backend.document_loader.base_document_loader import BaseTextDocumentLoader
+from backend.document_loader.document_export import (
+    export_documents,
+    iter_jsonl_zst,
+    iter_parquet,
+    read_documents,
+)
+from backend.models.documents import NewsDocument, NewsDocumentMeta
+
+
+@pytest.fixture
+def documents() -> list[NewsDocument]:
+    return [
+        NewsDocument(
+            page_content=f"content {idx}",
+            document_meta=NewsDocumentMeta(
+                source=f"https://news.com/{idx}",
+                tags=["news", f"tag-{idx}"],
+                author_name="author",
+                company_name="TCS",
+                keywords=["it", "results"],
+                headline=f"headline {idx}",
+                news_sentiment={"positive": 0.8, "negative": 0.2},
+                market_trend="bullish",
+                sector="IT",
+                summary="summary",
+                date_published=datetime.datetime(2024, 10, 17, 9, idx),
+                date_created=datetime.datetime(2024, 10, 18, 9, idx),
+            ),
+        )
+        for idx in range(5)
+    ]
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    return np.arange(15, dtype=np.float32).reshape(5, 3)
+
+
+class TestDocumentExport:
+    def test_parquet_round_trip(self, tmp_path, documents, embeddings):
+        pytest.importorskip("pyarrow")
+        filepath = tmp_path / "news.parquet"
+        assert export_documents(documents, filepath, embeddings=embeddings) == 5
+
+        assert read_documents(filepath) == documents
+        rows = list(iter_parquet(filepath, with_embeddings=True, batch_size=2))
+        assert [document for document, _ in rows] == documents
+        np.testing.assert_array_equal(
+            np.stack([embedding for _, embedding in rows]), embeddings
+        )
+
+    def test_jsonl_zst_round_trip(self, tmp_path, documents, embeddings):
+        pytest.importorskip("zstandard")
+        filepath = tmp_path / "news.jsonl.zst"
+        assert export_documents(documents, filepath, embeddings=embeddings) == 5
+
+        assert read_documents(filepath, NewsDocument) == documents
+        rows = list(iter_jsonl_zst(filepath, NewsDocument, with_embeddings=True))
+        np.testing.assert_array_equal(
+            np.stack([embedding for _, embedding in rows]), embeddings
+        )
+        assert list(iter_jsonl_zst(filepath, NewsDocument, validate=True)) == documents
+
+    def test_trusted_documents_are_typed(self, tmp_path, documents):
+        pytest.importorskip("pyarrow")
+        pytest.importorskip("zstandard")
+        for name in ("news.parquet", "news.jsonl.zst"):
+            export_documents(documents, tmp_path / name)
+            document = read_documents(tmp_path / name, NewsDocument)[0]
+            assert isinstance(document.document_meta, NewsDocumentMeta)
+            assert document.document_meta.date_published == datetime.datetime(
+                2024, 10, 17, 9, 0
+            )
+
+    def test_jsonl_zst_requires_document_class(self, tmp_path, documents):
+        with pytest.raises(ValueError):
+            read_documents(tmp_path / "news.jsonl.zst")
+
+    def test_unsupported_format(self, tmp_path, documents):
+        with pytest.raises(ValueError):
+            export_documents(documents, tmp_path / "news.csv")
+
+    def test_save_documents(self, tmp_path, documents):
+        loader = BaseTextDocumentLoader()
+        loader.documents = documents
+        loader.save_documents(tmp_path / "news.json")
+        loader.save_documents(tmp_path / "news.jsonl", jsonl=True)
+
+        with open(tmp_path / "news.json") as file:
+            content = json.load(file)
+        with open(tmp_path / "news.jsonl") as file:
+            lines = [json.loads(line) for line in file]
+        assert content == lines == [document.to_json() for document in documents]
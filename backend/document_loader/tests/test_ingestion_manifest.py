@@ -0,0 +1,243 @@
+import hashlib
+import json
+
+import pytest
+
+from backend.benchmarks.serialization_benchmark import sample_documents
+from backend.core.tool_cache import ToolResultCache
+from backend.document_loader import base_document_loader
+from backend.document_loader.base_document_loader import BaseTextDocumentLoader
+from backend.document_loader.ingestion_manifest import (
+    EmbeddingStatus,
+    IngestionManifest,
+)
+from backend.models.documents import (
+    NewsDocument,
+    WebsiteDocument,
+    WebsiteBaseDocumentMeta,
+)
+
+
+def make_document(source: str, page_content: str) -> WebsiteDocument:
+    metadata = WebsiteBaseDocumentMeta(source=source, title="sample title")
+    return WebsiteDocument(page_content=page_content, document_meta=metadata)
+
+
+class FakeVectorStore:
+    instances = []
+
+    def __init__(self, database_name, container_name):
+        self.deleted = []
+        self.instances.append(self)
+
+    def embed_upsert_documents(
+        self, documents, template_iter, max_token_limit, document_range, on_upsert
+    ):
+        for idx, (_, document) in enumerate(template_iter(documents)):
+            if document_range[0] <= idx < document_range[1]:
+                on_upsert(document, {"id": f"{document.page_content}-{idx}"})
+        return 0
+
+    def partition_key_value(self, item):
+        return "pk"
+
+    def delete_documents(self, items):
+        self.deleted.extend(items)
+
+
+@pytest.fixture
+def manifest(tmp_path) -> IngestionManifest:
+    manifest = IngestionManifest(tmp_path / "manifest.db")
+    yield manifest
+    manifest.close()
+
+
+class TestIngestionManifest:
+    def test_new_documents_are_planned(self, manifest):
+        documents = [
+            make_document("https://a.com", "a"),
+            make_document("https://b.com", "b"),
+        ]
+        plan = manifest.plan("bob-web", documents)
+        assert plan.documents == documents
+        assert plan.stale_chunks == {}
+
+    def test_unchanged_documents_are_skipped(self, manifest):
+        documents = [
+            make_document("https://a.com", "a"),
+            make_document("https://b.com", "b"),
+        ]
+        plan = manifest.plan("bob-web", documents)
+        manifest.mark_pending(plan)
+        manifest.mark_embedded(plan, {})
+
+        documents[1] = make_document("https://b.com", "b modified")
+        documents.append(make_document("https://c.com", "c"))
+        plan = manifest.plan("bob-web", documents)
+        assert [d.document_meta.source for d in plan.documents] == [
+            "https://b.com",
+            "https://c.com",
+        ]
+        assert plan.unchanged_keys == ["WebsiteDocument:https://a.com"]
+
+    def test_pending_documents_are_retried(self, manifest):
+        documents = [make_document("https://a.com", "a")]
+        manifest.mark_pending(manifest.plan("bob-web", documents))
+        plan = manifest.plan("bob-web", documents)
+        assert plan.documents == documents
+
+    def test_duplicate_sources_in_content_hash(self):
+        document = make_document("https://a.com", "a")
+        content = document.to_json()
+        content["document_meta"].pop("duplicate_sources")
+        content["document_meta"].pop("date_created")
+        # the hash of a document without near duplicates is unchanged by the field
+        assert (
+            IngestionManifest.content_hash([document])
+            == hashlib.sha256(
+                json.dumps(content, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+        )
+
+        duplicated = make_document("https://a.com", "a")
+        duplicated.document_meta.duplicate_sources = ["https://b.com"]
+        assert IngestionManifest.content_hash(
+            [duplicated]
+        ) != IngestionManifest.content_hash([document])
+
+    def test_stale_and_removed_chunks(self, manifest):
+        documents = [
+            make_document("https://a.com", "a"),
+            make_document("https://b.com", "b"),
+        ]
+        plan = manifest.plan("bob-web", documents)
+        manifest.mark_pending(plan)
+        manifest.mark_embedded(
+            plan,
+            {
+                "WebsiteDocument:https://a.com": [("1", "pk")],
+                "WebsiteDocument:https://b.com": [("2", "pk"), ("3", "pk")],
+            },
+        )
+
+        plan = manifest.plan(
+            "bob-web",
+            [make_document("https://a.com", "a modified")],
+            delete_removed=True,
+        )
+        assert plan.removed_keys == ["WebsiteDocument:https://b.com"]
+        assert plan.stale_chunks == {
+            "WebsiteDocument:https://a.com": [("1", "pk")],
+            "WebsiteDocument:https://b.com": [("2", "pk"), ("3", "pk")],
+        }
+
+        manifest.mark_pending(plan)
+        manifest.mark_embedded(plan, {"WebsiteDocument:https://a.com": [("4", "pk")]})
+        assert manifest.get("bob-web", "WebsiteDocument:https://b.com") is None
+        assert manifest.get("bob-web", "WebsiteDocument:https://a.com")[
+            "chunk_ids"
+        ] == [("4", "pk")]
+
+    def test_restrict(self, manifest):
+        documents = [
+            make_document("https://a.com", "a"),
+            make_document("https://b.com", "b"),
+        ]
+        plan = manifest.plan("bob-web", documents)
+        plan.stale_chunks["WebsiteDocument:https://b.com"] = [("1", "pk")]
+        plan = plan.restrict(["WebsiteDocument:https://a.com"])
+        assert plan.documents == documents[:1]
+        assert list(plan.content_hashes) == ["WebsiteDocument:https://a.com"]
+        assert plan.stale_chunks == {}
+
+
+class TestEmbedUpsertWithManifest:
+    def test_documents_outside_of_range_stay_pending(self, manifest, monkeypatch):
+        monkeypatch.setattr(
+            base_document_loader, "AzureCosmosVectorStore", FakeVectorStore
+        )
+        loader = BaseTextDocumentLoader()
+        loader.documents = [
+            make_document(f"https://{name}.com", name) for name in ("a", "b", "c")
+        ]
+        loader.embed_upsert_to_vector_store("db", "bob-web", manifest=manifest)
+
+        loader.documents = [
+            make_document(f"https://{name}.com", f"{name} modified")
+            for name in ("a", "b", "c")
+        ]
+        loader.embed_upsert_to_vector_store(
+            "db", "bob-web", manifest=manifest, document_range=(0, 1)
+        )
+
+        assert FakeVectorStore.instances[-1].deleted == [("a-0", "pk")]
+        a = manifest.get("bob-web", "WebsiteDocument:https://a.com")
+        assert a["status"] == EmbeddingStatus.EMBEDDED
+        assert a["chunk_ids"] == [("a modified-0", "pk")]
+        b = manifest.get("bob-web", "WebsiteDocument:https://b.com")
+        assert b["status"] == EmbeddingStatus.PENDING
+        assert b["chunk_ids"] == [("b-1", "pk")]
+
+        plan = manifest.plan("bob-web", loader.documents)
+        assert [d.page_content for d in plan.documents] == [
+            "b modified",
+            "c modified",
+        ]
+        assert plan.stale_chunks == {
+            "WebsiteDocument:https://b.com": [("b-1", "pk")],
+            "WebsiteDocument:https://c.com": [("c-2", "pk")],
+        }
+
+    def test_documents_without_chunks_are_embedded(self, manifest, monkeypatch):
+        monkeypatch.setattr(
+            base_document_loader, "AzureCosmosVectorStore", FakeVectorStore
+        )
+
+        class SplittingLoader(BaseTextDocumentLoader):
+            def split_documents(self, documents=None, **kwargs):
+                # an empty page has no chunks
+                return [document for document in documents if document.page_content]
+
+        loader = SplittingLoader()
+        loader.documents = [
+            make_document(f"https://{name}.com", name) for name in ("a", "b")
+        ]
+        loader.embed_upsert_to_vector_store(
+            "db", "bob-web", manifest=manifest, should_split=True
+        )
+
+        loader.documents = [
+            make_document("https://a.com", "a"),
+            make_document("https://b.com", ""),
+        ]
+        loader.embed_upsert_to_vector_store(
+            "db", "bob-web", manifest=manifest, should_split=True
+        )
+
+        assert FakeVectorStore.instances[-1].deleted == [("b-1", "pk")]
+        b = manifest.get("bob-web", "WebsiteDocument:https://b.com")
+        assert b["status"] == EmbeddingStatus.EMBEDDED
+        assert b["chunk_ids"] == []
+        assert manifest.plan("bob-web", loader.documents).documents == []
+
+    def test_tool_results_are_invalidated(self, manifest, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            base_document_loader, "AzureCosmosVectorStore", FakeVectorStore
+        )
+        tool_cache = ToolResultCache(tmp_path / "tool_results.db", ttl=lambda: 60)
+        tool_cache.put("get_company_analysis", "TCS", [], {})
+        tool_cache.put("get_company_analysis", "Infosys", [], {})
+
+        loader = BaseTextDocumentLoader()
+        loader.documents = [
+            document
+            for document in sample_documents()
+            if isinstance(document, NewsDocument)
+        ]
+        loader.embed_upsert_to_vector_store(
+            "db", "stock-news", manifest=manifest, tool_cache=tool_cache
+        )
+
+        assert len(tool_cache) == 1
+        assert tool_cache.get("get_company_analysis", "Infosys", []) == {}
+        tool_cache.close()
@@ -0,0 +1,164 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.benchmarks.serialization_benchmark import sample_documents
+from backend.core.tool_cache import ToolResultCache
+from backend.document_loader.base_document_loader import BaseTextDocumentLoader
+from backend.document_loader.ingestion_manifest import IngestionManifest
+from backend.document_loader.ingestion_runner import IngestionRunner
+from backend.models.documents import (
+    NewsDocument,
+    WebsiteDocument,
+    WebsiteBaseDocumentMeta,
+)
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.items = {}
+        self.deleted = []
+        self._lock = threading.Lock()
+
+    def embed_texts(self, texts, model=None):
+        data = [
+            SimpleNamespace(index=idx, embedding=[text])
+            for idx, text in enumerate(texts)
+        ]
+        return SimpleNamespace(
+            data=list(reversed(data)), usage=SimpleNamespace(total_tokens=len(texts))
+        )
+
+    def upsert_document(self, document, embedding=None):
+        with self._lock:
+            item = {"id": str(len(self.items)), **document.to_json()}
+            item["contextVector"] = embedding
+            self.items[item["id"]] = item
+        return item
+
+    def partition_key_value(self, item):
+        return item["document_meta"]["date_created"]
+
+    def delete_documents(self, items):
+        self.deleted.extend(items)
+
+
+@pytest.fixture
+def loader() -> BaseTextDocumentLoader:
+    loader = BaseTextDocumentLoader()
+    loader.documents = [
+        WebsiteDocument(
+            page_content="x" * idx,
+            document_meta=WebsiteBaseDocumentMeta(
+                source=f"https://{idx}.com", title="title"
+            ),
+        )
+        for idx in range(1, 51)
+    ]
+    return loader
+
+
+class TestIngestionRunner:
+    def test_run(self, loader):
+        vector_store = FakeVectorStore()
+        runner = IngestionRunner(
+            loader,
+            database_name="db",
+            container_name="bob-web",
+            should_split=True,
+            embed_batch_size=8,
+            queue_size=4,
+            vector_store=vector_store,
+        )
+        report = runner.run()
+
+        assert report.total_tokens == 50
+        assert [stage.items_out for stage in report.stages] == [50, 50, 50, 50]
+        assert len(vector_store.items) == 50
+        for item in vector_store.items.values():
+            assert item["contextVector"] == [f"None\n\n{item['page_content']}"]
+
+    def test_run_overlaps_reading_an_iterator(self, loader):
+        vector_store = FakeVectorStore()
+        overlapped = threading.Event()
+
+        def read_documents():
+            for idx, document in enumerate(loader.documents):
+                yield document
+                if idx == 4:
+                    # the first documents are upserted while the rest is read
+                    deadline = time.monotonic() + 5
+                    while not vector_store.items and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    if vector_store.items:
+                        overlapped.set()
+
+        runner = IngestionRunner(
+            BaseTextDocumentLoader(),
+            database_name="db",
+            container_name="bob-web",
+            embed_batch_size=2,
+            vector_store=vector_store,
+        )
+        report = runner.run(read_documents())
+
+        assert overlapped.is_set()
+        assert report.stages[-1].items_out == 50
+
+    def test_run_with_manifest(self, loader, tmp_path):
+        manifest = IngestionManifest(tmp_path / "manifest.db")
+        vector_store = FakeVectorStore()
+        kwargs = dict(
+            database_name="db",
+            container_name="bob-web",
+            manifest=manifest,
+            vector_store=vector_store,
+        )
+        IngestionRunner(loader, **kwargs).run()
+        loader.documents[0] = WebsiteDocument(
+            page_content="modified",
+            document_meta=loader.documents[0].document_meta,
+        )
+        report = IngestionRunner(loader, **kwargs).run()
+
+        assert report.stages[-1].items_out == 1
+        assert [item_id for item_id, _ in vector_store.deleted] == ["0"]
+        manifest.close()
+
+    def test_max_token_limit(self, loader):
+        runner = IngestionRunner(
+            loader,
+            database_name="db",
+            container_name="bob-web",
+            embed_batch_size=8,
+            max_token_limit=10,
+            vector_store=FakeVectorStore(),
+        )
+        with pytest.raises(RuntimeError):
+            runner.run()
+
+    def test_run_invalidates_tool_results(self, tmp_path):
+        tool_cache = ToolResultCache(tmp_path / "tool_results.db")
+        tool_cache.put("get_news_articles", "Tata Consultancy Services", [], {})
+        tool_cache.put("get_company_analysis", "TCS", [], {})
+        tool_cache.put("get_news_articles", "Infosys", [], {})
+
+        loader = BaseTextDocumentLoader()
+        loader.documents = [
+            document
+            for document in sample_documents()
+            if isinstance(document, NewsDocument)
+        ]
+        IngestionRunner(
+            loader,
+            database_name="db",
+            container_name="stock-news",
+            vector_store=FakeVectorStore(),
+            tool_cache=tool_cache,
+        ).run()
+
+        assert len(tool_cache) == 1
+        assert tool_cache.get("get_news_articles", "Infosys", []) == {}
+        tool_cache.close()
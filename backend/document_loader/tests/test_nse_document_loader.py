@@ -1,4 +1,12 @@
-from backend.document_loader.nse_document_loader import NseIndexLoader
+import io
+
+from urllib3 import HTTPConnectionPool, HTTPResponse
+
+from backend.document_loader.nse_document_loader import (
+    NseIndexLoader,
+    NseMultiIndexLoader,
+)
+from backend.document_loader.url_config import NseUrlConfig
 
 
 class TestNseIndexDocumentLoader:
@@ -21,3 +29,31 @@ class TestNseIndexDocumentLoader:
         loader = NseIndexLoader(dataset=nse_index_data)
         for company_name in loader.get_company_names():
             assert isinstance(company_name, str)
+
+
+class TestNseMultiIndexLoader:
+    def test_merges_indices(self, nse_multi_index_session):
+        loader = NseMultiIndexLoader(
+            indices=["NIFTY 50", "NIFTY IT"], session=nse_multi_index_session
+        )
+        assert list(loader.get_symbols()) == ["TCS", "INFY", "LTIM"]
+        assert loader.index_members["INFY"] == ["NIFTY 50", "NIFTY IT"]
+        assert loader.failed_indices == {}
+        assert nse_multi_index_session.requested_urls[0] == NseUrlConfig.base_url
+
+    def test_default_session(self, monkeypatch):
+        def urlopen(pool, method, url, *args, **kwargs):
+            return HTTPResponse(
+                body=io.BytesIO(b'{"data": []}'),
+                status=200,
+                headers={"Content-Type": "application/json"},
+                preload_content=False,
+            )
+
+        # connection pools are still created by the mounted adapter
+        monkeypatch.setattr(HTTPConnectionPool, "urlopen", urlopen)
+        loader = NseMultiIndexLoader(indices=["NIFTY 50", "NIFTY IT"])
+
+        adapter = loader.session.get_adapter(NseUrlConfig.base_url)
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 2
+        assert loader.failed_indices == {}
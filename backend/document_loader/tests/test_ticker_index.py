@@ -0,0 +1,95 @@
+import pytest
+
+from backend.document_loader import ticker_index
+from backend.document_loader.nse_document_loader import NseMultiIndexLoader
+from backend.document_loader.ticker_index import (
+    TickerIndex,
+    TickerIndexEntry,
+    normalize_company_name,
+)
+
+
+@pytest.fixture
+def entries() -> list[TickerIndexEntry]:
+    return [
+        TickerIndexEntry("RELIANCE", "Reliance Industries Limited", "INE002A01018"),
+        TickerIndexEntry("LT", "Larsen & Toubro Ltd.", "INE018A01030"),
+        TickerIndexEntry("HDFCBANK", "HDFC Bank Ltd.", "INE040A01034"),
+    ]
+
+
+class TestTickerIndex:
+    def test_normalize_company_name(self):
+        assert normalize_company_name("Larsen & Toubro Ltd.") == "LARSEN AND TOUBRO"
+        assert normalize_company_name("Bajaj-Auto Private Limited") == "BAJAJ AUTO"
+
+    def test_lookup(self, entries):
+        index = TickerIndex(entries, fallback=lambda name: None)
+        assert index.resolve("RELIANCE INDUSTRIES LTD") == "RELIANCE.NS"
+        assert index.resolve("Larsen and Toubro") == "LT.NS"
+        assert index.resolve("HDFCBANK") == "HDFCBANK.NS"
+        assert index.resolve("INE002A01018") == "RELIANCE.NS"
+        assert index.resolve("Reliance Industry") == "RELIANCE.NS"
+
+    def test_fallback_is_remembered(self, entries, tmp_path):
+        calls = []
+
+        def fallback(name):
+            calls.append(name)
+            return "TCS.NS" if "Tata" in name else None
+
+        file_path = tmp_path / "ticker_index.json"
+        index = TickerIndex(entries, file_path=file_path, fallback=fallback)
+        assert index.resolve("Tata Consultancy Services") == "TCS.NS"
+        assert index.resolve("Tata Consultancy Services") == "TCS.NS"
+        assert index.resolve("Unknown Company") is None
+        assert index.resolve("Unknown Company") is None
+        assert calls == ["Tata Consultancy Services", "Unknown Company"]
+
+        index.flush()
+        loaded = TickerIndex.load(file_path, fallback=fallback)
+        assert len(loaded) == len(entries)
+        assert loaded.lookup("TATA CONSULTANCY SERVICES LIMITED") == "TCS.NS"
+
+    def test_fuzzy_matches_are_remembered(self, entries, tmp_path):
+        file_path = tmp_path / "ticker_index.json"
+        index = TickerIndex(entries, file_path=file_path, fallback=lambda name: None)
+        assert index.resolve("Reliance Industry") == "RELIANCE.NS"
+        assert index.aliases == {"RELIANCE INDUSTRY": "RELIANCE.NS"}
+        # aliases are written in batches
+        assert not file_path.exists()
+
+        index.flush()
+        loaded = TickerIndex.load(file_path, fallback=lambda name: None)
+        assert loaded.aliases == {"RELIANCE INDUSTRY": "RELIANCE.NS"}
+
+    @pytest.mark.parametrize(
+        "entry, company_name",
+        [
+            (
+                TickerIndexEntry("ICICIAMC", "ICICI Asset Management Company Ltd."),
+                "HDFC Asset Management Company",
+            ),
+            (
+                TickerIndexEntry("SBILIFE", "SBI Life Insurance Company Ltd."),
+                "HDFC Life Insurance Company",
+            ),
+        ],
+    )
+    def test_similar_companies_do_not_match(self, entry, company_name):
+        index = TickerIndex([entry], fallback=lambda name: None)
+        assert index.lookup(company_name) is None
+        assert index.aliases == {}
+
+    def test_build_on_cold_start(self, monkeypatch, nse_multi_index_session, tmp_path):
+        monkeypatch.setattr(
+            ticker_index,
+            "NseMultiIndexLoader",
+            lambda: NseMultiIndexLoader(
+                indices=["NIFTY 50", "NIFTY IT"], session=nse_multi_index_session
+            ),
+        )
+        file_path = tmp_path / "ticker_index.json"
+        index = TickerIndex.load_or_build(file_path, fallback=lambda name: None)
+        assert index.resolve("Infosys") == "INFY.NS"
+        assert len(TickerIndex.load(file_path)) == 3
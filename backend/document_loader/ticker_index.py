@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import atexit
+import difflib
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from functools import cache
+from os import PathLike
+from typing import Callable, Iterable, Optional
+
+from backend.document_loader.nse_document_loader import (
+    NseIndexLoader,
+    NseMultiIndexLoader,
+)
+from backend.models.documents import NseIndexDocument
+
+logger = logging.getLogger(__name__)
+
+TICKER_INDEX_PATH = os.environ.get(
+    "SMART_WEALTH_TICKER_INDEX_PATH", "ticker_index.json"
+)
+
+_COMPANY_SUFFIXES = {
+    "LTD",
+    "LIMITED",
+    "PVT",
+    "PRIVATE",
+    "INC",
+    "CORP",
+    "CORPORATION",
+}
+_NON_ALPHANUMERIC = re.compile(r"[^A-Z0-9 ]+")
+
+
+def normalize_company_name(company_name: str) -> str:
+    """Normalize a company name for lookups, e.g. "Larsen & Toubro Ltd." -> "LARSEN AND TOUBRO" """
+    name = company_name.upper().replace("&", " AND ").replace("-", " ")
+    tokens = _NON_ALPHANUMERIC.sub("", name).split()
+    while tokens and tokens[-1] in _COMPANY_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+@dataclass
+class TickerIndexEntry:
+    symbol: str
+    company_name: str
+    isin: Optional[str] = None
+    exchange_suffix: str = ".NS"
+
+    @property
+    def ticker(self) -> str:
+        """Yahoo Finance ticker of the entry"""
+        if self.exchange_suffix and not self.symbol.endswith(self.exchange_suffix):
+            return f"{self.symbol}{self.exchange_suffix}"
+        return self.symbol
+
+
+class TickerIndex:
+    """Local company name to ticker resolution index.
+
+    The index is built from NSE index constituents and resolves names by exact
+    normalized name, symbol, ISIN and finally fuzzy matching over candidates
+    sharing the first token of the query, so that e.g. "HDFC Life Insurance"
+    never matches "SBI Life Insurance". Only on a miss the Yahoo Finance search
+    API is queried, and the result is remembered as an alias. Aliases are
+    written to file_path by flush, at exit for the shared index.
+
+    Attributes:
+    -----------
+    entries: list[TickerIndexEntry]
+        The constituents of the index
+    aliases: dict[str, str]
+        Normalized names resolved by fuzzy matching or through the fallback to
+        their tickers, saved with the index
+    cutoff: float
+        Minimum similarity for fuzzy matches
+    """
+
+    def __init__(
+        self,
+        entries: Optional[Iterable[TickerIndexEntry]] = None,
+        aliases: Optional[dict[str, str]] = None,
+        file_path: Optional[PathLike | str] = None,
+        cutoff: Optional[float] = 0.85,
+        fallback: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.entries: list[TickerIndexEntry] = []
+        self.aliases: dict[str, str] = dict(aliases) if aliases else {}
+        self.file_path = file_path
+        self.cutoff = cutoff
+        self.fallback = fallback if fallback else self.yahoo_finance_lookup
+
+        self._by_name: dict[str, str] = {}
+        self._by_key: dict[str, str] = {}
+        self._by_token: dict[str, set[str]] = defaultdict(set)
+        self._misses: set[str] = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        for entry in entries or []:
+            self.add(entry)
+
+    @staticmethod
+    def yahoo_finance_lookup(company_name: str) -> Optional[str]:
+        try:
+            return NseIndexLoader.get_ticker_from_company_name(
+                company_name, without_limited=True
+            )
+        except Exception as e:
+            logger.warning(f"Ticker lookup failed for {company_name}: {e}")
+            return None
+
+    def add(self, entry: TickerIndexEntry) -> None:
+        name = normalize_company_name(entry.company_name)
+        self.entries.append(entry)
+        self._by_name[name] = entry.ticker
+        self._by_key[entry.symbol.upper()] = entry.ticker
+        self._by_key[entry.ticker.upper()] = entry.ticker
+        if entry.isin:
+            self._by_key[entry.isin.upper()] = entry.ticker
+        for token in name.split():
+            self._by_token[token].add(name)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, company_name: str) -> Optional[str]:
+        """Resolve the ticker from the local index only"""
+        name = normalize_company_name(company_name)
+        if name in self._by_name:
+            return self._by_name[name]
+        if name in self.aliases:
+            return self.aliases[name]
+        key = company_name.strip().upper()
+        if key in self._by_key:
+            return self._by_key[key]
+
+        # the first token distinguishes companies of the same kind, e.g. "HDFC"
+        # and "ICICI" asset management companies
+        first_token = name.split()[0] if name else ""
+        candidates = [
+            candidate
+            for candidate in self._by_token.get(first_token, ())
+            if candidate.split()[0] == first_token
+        ]
+        matches = difflib.get_close_matches(name, candidates, n=1, cutoff=self.cutoff)
+        if matches:
+            ticker = self._by_name[matches[0]]
+            self.remember(name, ticker)
+            return ticker
+        return None
+
+    def remember(self, name: str, ticker: str) -> None:
+        """Add an alias of a normalized name, persisted to file_path by flush"""
+        with self._lock:
+            self.aliases[name] = ticker
+            self._dirty = True
+
+    def flush(self) -> None:
+        """Save the index to file_path if aliases were added since the last save"""
+        with self._lock:
+            if self._dirty and self.file_path:
+                self._save(self.file_path)
+
+    def resolve(self, company_name: str) -> Optional[str]:
+        """Resolve the ticker of the company, falling back to the network on a miss"""
+        ticker = self.lookup(company_name)
+        if ticker is not None:
+            return ticker
+
+        name = normalize_company_name(company_name)
+        if name in self._misses:
+            return None
+        ticker = self.fallback(company_name)
+        if ticker is None:
+            with self._lock:
+                self._misses.add(name)
+        else:
+            self.remember(name, ticker)
+        return ticker
+
+    @classmethod
+    def from_documents(
+        cls, documents: Iterable[NseIndexDocument], **kwargs
+    ) -> TickerIndex:
+        entries = []
+        for document in documents:
+            if document.company_name:
+                entries.append(
+                    TickerIndexEntry(
+                        symbol=document.symbol,
+                        company_name=document.company_name,
+                        isin=document.isin,
+                    )
+                )
+        return cls(entries, **kwargs)
+
+    def save(self, file_path: PathLike | str) -> None:
+        """save the index to the given filepath"""
+        with self._lock:
+            self._save(file_path)
+
+    def _save(self, file_path: PathLike | str) -> None:
+        content = {
+            "entries": [asdict(entry) for entry in self.entries],
+            "aliases": self.aliases,
+        }
+        with open(file_path, "w") as file:
+            json.dump(content, file)
+        self._dirty = False
+
+    @classmethod
+    def load(cls, file_path: PathLike | str, **kwargs) -> TickerIndex:
+        """load the index from the given filepath"""
+        with open(file_path, "r") as file:
+            content = json.load(file)
+        return cls(
+            entries=[TickerIndexEntry(**entry) for entry in content["entries"]],
+            aliases=content["aliases"],
+            file_path=file_path,
+            **kwargs,
+        )
+
+    @classmethod
+    def load_or_build(cls, file_path: PathLike | str, **kwargs) -> TickerIndex:
+        """Load the index if it exists, else build it from the NSE index constituents"""
+        if os.path.exists(file_path):
+            return cls.load(file_path, **kwargs)
+
+        loader = NseMultiIndexLoader()
+        ticker_index = cls.from_documents(
+            loader.documents, file_path=file_path, **kwargs
+        )
+        if len(ticker_index) and not loader.failed_indices:
+            ticker_index.save(file_path)
+        return ticker_index
+
+
+@cache
+def get_ticker_index() -> TickerIndex:
+    """Shared ticker index persisted at TICKER_INDEX_PATH, its learned aliases
+    are saved at exit"""
+    ticker_index = TickerIndex.load_or_build(TICKER_INDEX_PATH)
+    atexit.register(ticker_index.flush)
+    return ticker_index
@@ -1,10 +1,28 @@
 class NseUrlConfig:
-    indices = ["NIFTY 50"]
+    base_url = "https://www.nseindia.com"
+    indices = [
+        "NIFTY 50",
+        "NIFTY NEXT 50",
+        "NIFTY 100",
+        "NIFTY MIDCAP 100",
+        "NIFTY SMLCAP 100",
+        "NIFTY 500",
+        "NIFTY BANK",
+        "NIFTY FINANCIAL SERVICES",
+        "NIFTY IT",
+        "NIFTY AUTO",
+        "NIFTY PHARMA",
+        "NIFTY FMCG",
+        "NIFTY METAL",
+        "NIFTY ENERGY",
+        "NIFTY REALTY",
+        "NIFTY MEDIA",
+    ]
 
     @staticmethod
     def get_index_config(index: str):
         index_config = {
-            "url": f"https://www.nseindia.com/api/equity-stockIndices?index={index}",
+            "url": f"{NseUrlConfig.base_url}/api/equity-stockIndices?index={index}",
             "headers": {
                 "Connection": "keep-alive",
                 "Cache-Control": "max-age=0",
@@ -23,6 +41,21 @@ class NseUrlConfig:
         }
         return index_config
 
+    @staticmethod
+    def get_session_config():
+        return {
+            "url": NseUrlConfig.base_url,
+            "headers": {
+                "Connection": "keep-alive",
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/79.0.3945.79 Safari/537.36",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Encoding": "gzip, deflate",
+                "Accept-Language": "en-US,en;q=0.9,hi;q=0.8",
+            },
+            "timeout": 10,
+        }
+
     @staticmethod
     def get_yf_query_config(query: str):
         return {
@@ -121,12 +121,15 @@ class WebsiteDocumentLoader(BaseTextDocumentLoader[WebsiteDocument]):
 
     def split_documents(
         self,
+        documents: Optional[list[WebsiteDocument]] = None,
         max_size_threshold: Optional[int] = 20000,
         min_size_threshold: Optional[int] = 25,
         sub_split_threshold: Optional[int] = 350,
         **kwargs,
     ) -> list[WebsiteDocument]:
-        """Split WebsiteDocuments"""
+        """Split WebsiteDocuments. Splits all the loaded documents if documents is not provided."""
+        if documents is None:
+            documents = self.documents
 
         def should_ignore(_document: WebsiteDocument):
             _size = len(_document.page_content.split(" "))
@@ -154,14 +157,14 @@ class WebsiteDocumentLoader(BaseTextDocumentLoader[WebsiteDocument]):
         )
 
         docs = []
-        for document in self.documents:
+        for document in documents:
             size = len(document.page_content.split(" "))
             if should_ignore(document):
                 continue
             elif size > sub_split_threshold:
-                documents = main_splitter.split_text(document.page_content)
+                split_documents = main_splitter.split_text(document.page_content)
                 temp_documents = []
-                for temp_document in documents:
+                for temp_document in split_documents:
                     if len(temp_document.page_content.split(" ")) < min_size_threshold:
                         continue
                     elif (
@@ -183,10 +186,10 @@ class WebsiteDocumentLoader(BaseTextDocumentLoader[WebsiteDocument]):
                                 document_meta=document.document_meta,
                             )
                         )
-                documents = temp_documents
+                split_documents = temp_documents
             else:
-                documents = [document]
-            docs.extend(documents)
+                split_documents = [document]
+            docs.extend(split_documents)
 
         return docs
 
@@ -198,10 +201,11 @@ class WebsiteDocumentLoader(BaseTextDocumentLoader[WebsiteDocument]):
         self, filepath: PathLike, jsonl: Optional[bool] = False
     ) -> None:
         """save the faqs to the given filepath"""
-        content = [doc.to_json() for doc in self.faqs]
         with open(filepath, "w") as file:
             if jsonl:
-                for c in content:
-                    file.write(json.dumps(c) + "\n")
+                for doc in self.faqs:
+                    file.write(doc.model_dump_json() + "\n")
             else:
-                json.dump(content, file)
+                file.write(
+                    "[" + ", ".join(doc.model_dump_json() for doc in self.faqs) + "]"
+                )
@@ -15,7 +15,11 @@ from backend.models.documents.mutualfund_document import (
     MutualFundDocument,
     MutualFundDocumentMeta,
 )
-from backend.models.documents.embedding_document import ResponseDocument
+from backend.models.documents.embedding_document import (
+    ResponseDocument,
+    LazyResponseDocument,
+)
+from backend.models.documents.corpus import CompactCorpus
 
 __all__ = [
     "BaseDocumentMeta",
@@ -34,4 +38,6 @@ __all__ = [
     "MutualFundDocument",
     "MutualFundDocumentMeta",
     "ResponseDocument",
+    "LazyResponseDocument",
+    "CompactCorpus",
 ]
@@ -1,20 +1,98 @@
-import json
-from typing import Any
-
-from pydantic import BaseModel
+import types
+import typing
 from datetime import datetime
+from functools import cache, partial
+from typing import Any, Callable, Optional, Union
+
+from pydantic import BaseModel, TypeAdapter
+
+
+def _strip_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _parse_datetime(value: Any) -> Any:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _trusted_converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Converter of a field value read from the store, None if it is used as is"""
+    annotation = _strip_optional(annotation)
+    origin = typing.get_origin(annotation) or annotation
+    if annotation in (Any, str, int, bool) or origin in (list, dict):
+        return None
+    if annotation is float:
+        return float
+    if annotation is datetime:
+        return _parse_datetime
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return partial(construct_trusted, annotation)
+    return TypeAdapter(annotation).validate_python
+
+
+@cache
+def _trusted_plan(
+    model_class: type[BaseModel],
+) -> tuple[tuple[str, Optional[Callable[[Any], Any]], Any], ...]:
+    plan = []
+    for name, field in model_class.model_fields.items():
+        if field.is_required():
+            default = None
+        else:
+            default = partial(field.get_default, call_default_factory=True)
+        plan.append((name, _trusted_converter(field.annotation), default))
+    return tuple(plan)
+
+
+def construct_trusted(model_class: type[BaseModel], data: dict[str, Any]) -> Any:
+    """Build the model from json data written by to_json without validating it.
+
+    Only datetimes, floats and non json native types are converted, nested
+    models are constructed recursively and unknown keys are ignored. This is
+    the same as model_construct, without its per call field introspection.
+    """
+    if not isinstance(data, dict):
+        return data
+    values = {}
+    defaults = []
+    for name, converter, default in _trusted_plan(model_class):
+        if name in data:
+            value = data[name]
+            if converter is not None and value is not None:
+                value = converter(value)
+            values[name] = value
+        elif default is not None:
+            defaults.append((name, default))
+    fields_set = set(values)
+    for name, default in defaults:
+        values[name] = default()
+    model = object.__new__(model_class)
+    object.__setattr__(model, "__dict__", values)
+    object.__setattr__(model, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(model, "__pydantic_extra__", None)
+    object.__setattr__(model, "__pydantic_private__", None)
+    return model
 
 
 class BaseDocumentMeta(BaseModel):
     source: str
 
     tags: list = []
+    duplicate_sources: list[str] = []
 
     is_ai_generated: bool = False
     date_created: datetime = datetime.now()
 
-    def to_json(self):
-        return json.loads(self.model_dump_json())
+    def to_json(self) -> dict[str, Any]:
+        return self.model_dump(mode="json")
+
+    @classmethod
+    def from_trusted(cls, data: dict[str, Any]):
+        return construct_trusted(cls, data)
 
 
 class BaseDocument(BaseModel):
@@ -24,8 +102,14 @@ class BaseDocument(BaseModel):
     def document_type(self):
         return self.__class__.__name__
 
-    def to_json(self):
-        return json.loads(self.model_dump_json())
+    def to_json(self) -> dict[str, Any]:
+        return self.model_dump(mode="json")
+
+    @classmethod
+    def from_trusted(cls, data: dict[str, Any]):
+        """Build the document from data written by to_json, e.g. items read from
+        the vector store, skipping validation"""
+        return construct_trusted(cls, data)
 
 
 class BaseTextDocument(BaseDocument):
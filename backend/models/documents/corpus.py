@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import sys
+import typing
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Generator, Iterable, Optional
+
+from backend.models.documents import BaseDocument
+from backend.models.documents.base_document import _strip_optional
+
+_META_PREFIX = "document_meta."
+
+# string fields holding free text, stored in a utf-8 buffer instead of a dictionary
+TEXT_FIELDS = frozenset(
+    {
+        "page_content",
+        "question",
+        "answer",
+        "summary",
+        "headline",
+        "description",
+        "investment_objective",
+    }
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_NULL = -1
+
+
+class _TextColumn:
+    """Strings concatenated in a single utf-8 buffer with end offsets"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array("q")
+        self.nulls = array("b")
+
+    def append(self, value: Optional[str]) -> None:
+        if value is not None:
+            self.buffer += value.encode("utf-8")
+        self.offsets.append(len(self.buffer))
+        self.nulls.append(value is None)
+
+    def __getitem__(self, idx: int) -> Optional[str]:
+        if self.nulls[idx]:
+            return None
+        start = self.offsets[idx - 1] if idx else 0
+        return self.buffer[start : self.offsets[idx]].decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            len(self.buffer)
+            + self.offsets.itemsize * len(self.offsets)
+            + len(self.nulls)
+        )
+
+
+class _DictionaryColumn:
+    """Repeated strings stored once, with a code per row"""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.index: dict[str, int] = {}
+        self.codes = array("l")
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NULL
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        return code
+
+    def append(self, value: Optional[str]) -> None:
+        self.codes.append(self.encode(value))
+
+    def __getitem__(self, idx: int) -> Optional[str]:
+        code = self.codes[idx]
+        return None if code == _NULL else self.values[code]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(value) for value in self.values) + (
+            self.codes.itemsize * len(self.codes)
+        )
+
+
+class _StringListColumn(_DictionaryColumn):
+    """Lists of repeated strings (tags, keywords) as dictionary codes with end offsets"""
+
+    def __init__(self):
+        super().__init__()
+        self.offsets = array("q")
+        self.nulls = array("b")
+
+    def append(self, value: Optional[list[str]]) -> None:
+        if value is not None:
+            self.codes.extend(self.encode(item) for item in value)
+        self.offsets.append(len(self.codes))
+        self.nulls.append(value is None)
+
+    def __getitem__(self, idx: int) -> Optional[list[str]]:
+        if self.nulls[idx]:
+            return None
+        start = self.offsets[idx - 1] if idx else 0
+        return [self.values[code] for code in self.codes[start : self.offsets[idx]]]
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            super().nbytes + self.offsets.itemsize * len(self.offsets) + len(self.nulls)
+        )
+
+
+class _DatetimeColumn:
+    """Datetimes as microseconds since the epoch of their wall time, the tzinfo
+    of aware datetimes is kept aside"""
+
+    _null = -(2**63)
+
+    def __init__(self):
+        self.values = array("q")
+        self.tzinfos: dict[int, Any] = {}
+
+    def append(self, value: Optional[datetime]) -> None:
+        if value is None:
+            self.values.append(self._null)
+            return
+        if value.tzinfo is not None:
+            self.tzinfos[len(self.values)] = value.tzinfo
+            value = value.replace(tzinfo=None)
+        self.values.append((value - _EPOCH) // timedelta(microseconds=1))
+
+    def __getitem__(self, idx: int) -> Optional[datetime]:
+        value = self.values[idx]
+        if value == self._null:
+            return None
+        value = _EPOCH + timedelta(microseconds=value)
+        tzinfo = self.tzinfos.get(idx)
+        return value.replace(tzinfo=tzinfo) if tzinfo is not None else value
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values)
+
+
+class _ObjectColumn:
+    """Any other value, kept as is"""
+
+    def __init__(self):
+        self.values: list[Any] = []
+
+    def append(self, value: Any) -> None:
+        self.values.append(value)
+
+    def __getitem__(self, idx: int) -> Any:
+        return self.values[idx]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values) + sum(
+            sys.getsizeof(value) for value in self.values
+        )
+
+
+def _column_for(name: str, annotation: Any):
+    annotation = _strip_optional(annotation)
+    origin = typing.get_origin(annotation) or annotation
+    if annotation is str:
+        if name.rsplit(".", 1)[-1] in TEXT_FIELDS:
+            return _TextColumn()
+        return _DictionaryColumn()
+    if origin in (list, typing.List):
+        args = typing.get_args(annotation)
+        if not args or args[0] is str:
+            return _StringListColumn()
+    if annotation is datetime:
+        return _DatetimeColumn()
+    return _ObjectColumn()
+
+
+class CompactCorpus:
+    """Columnar in-memory corpus of documents of a single class.
+
+    Free text fields (page_content, summary, ...) are stored in a contiguous
+    utf-8 buffer with offsets, repeated strings (source, source_map, sector,
+    tags, ...) are dictionary encoded and datetimes are packed into an int64
+    array. Documents are built back on access, so loader output can be held
+    in a fraction of the memory of the equivalent pydantic objects.
+
+    Examples:
+        >>> corpus = CompactCorpus.from_documents(loader.documents)
+        >>> len(corpus), corpus.nbytes
+        >>> corpus[0]
+        NewsDocument(...)
+        >>> loader.documents = corpus.to_documents()
+    """
+
+    def __init__(self, document_class: type[BaseDocument]):
+        self.document_class = document_class
+        self._columns: dict[str, Any] = {}
+        for name, field in document_class.model_fields.items():
+            if name == "document_meta":
+                for meta_name, meta_field in field.annotation.model_fields.items():
+                    column = _META_PREFIX + meta_name
+                    self._columns[column] = _column_for(column, meta_field.annotation)
+            else:
+                self._columns[name] = _column_for(name, field.annotation)
+        self._size = 0
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[BaseDocument],
+        document_class: Optional[type[BaseDocument]] = None,
+    ) -> CompactCorpus:
+        documents = iter(documents)
+        if document_class is None:
+            first = next(documents, None)
+            if first is None:
+                raise ValueError("document_class is required for an empty corpus")
+            corpus = cls(type(first))
+            corpus.append(first)
+        else:
+            corpus = cls(document_class)
+        corpus.extend(documents)
+        return corpus
+
+    def append(self, document: BaseDocument) -> None:
+        if not isinstance(document, self.document_class):
+            raise TypeError(
+                f"Expected {self.document_class.__name__},"
+                f" got {type(document).__name__}"
+            )
+        meta = document.document_meta
+        for name, column in self._columns.items():
+            if name.startswith(_META_PREFIX):
+                value = getattr(meta, name[len(_META_PREFIX) :], None)
+            else:
+                value = getattr(document, name, None)
+            column.append(value)
+        self._size += 1
+
+    def extend(self, documents: Iterable[BaseDocument]) -> None:
+        for document in documents:
+            self.append(document)
+
+    def row(self, idx: int) -> dict[str, Any]:
+        """The fields of a document, with document_meta as a nested dict"""
+        if idx < 0:
+            idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError("corpus index out of range")
+        row: dict[str, Any] = {"document_meta": {}}
+        for name, column in self._columns.items():
+            if name.startswith(_META_PREFIX):
+                row["document_meta"][name[len(_META_PREFIX) :]] = column[idx]
+            else:
+                row[name] = column[idx]
+        return row
+
+    def __getitem__(self, idx: int) -> BaseDocument:
+        return self.document_class.from_trusted(self.row(idx))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Generator[BaseDocument]:
+        for idx in range(self._size):
+            yield self[idx]
+
+    def to_documents(self) -> list[BaseDocument]:
+        return list(self)
+
+    def unique_values(self, name: str) -> list[str]:
+        """Distinct values of a dictionary encoded column, e.g. "document_meta.sector" """
+        column = self._columns[name]
+        if not isinstance(column, _DictionaryColumn):
+            raise ValueError(f"{name} is not a dictionary encoded column")
+        return list(column.values)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns"""
+        return sum(column.nbytes for column in self._columns.values())
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, List, Optional
+
+import numpy as np
+
 from backend.models.documents import BaseDocument
 
 
@@ -10,3 +13,86 @@ class ResponseDocument(BaseModel):
     similarity_score: float
 
     embedding: Optional[List[float]] = None
+
+
+class LazyResponseDocument:
+    """Search result that keeps the raw row of the vector store and builds the
+    document on first access. The embedding is stored as a float32 array.
+
+    Attributes:
+    -----------
+    similarity_score: float
+        Similarity of the document to the query
+    embedding: Optional[np.ndarray]
+        float32 embedding of the document, None unless requested in the search
+    """
+
+    __slots__ = (
+        "similarity_score",
+        "embedding",
+        "_item",
+        "_document_class",
+        "_validate",
+        "_document",
+    )
+
+    def __init__(
+        self,
+        item: dict[str, Any],
+        document_class: type[BaseDocument],
+        similarity_score: float,
+        embedding: Optional[List[float] | np.ndarray] = None,
+        validate: Optional[bool] = False,
+    ):
+        self.similarity_score = similarity_score
+        self.embedding = (
+            np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+        )
+        self._item = item
+        self._document_class = document_class
+        self._validate = validate
+        self._document = None
+
+    @property
+    def document(self) -> BaseDocument:
+        if self._document is None:
+            if self._validate:
+                self._document = self._document_class(**self._item)
+            else:
+                self._document = self._document_class.from_trusted(self._item)
+        return self._document
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        """The row as returned by the vector store"""
+        return self._item
+
+    def get(self, path: str, default: Any = None) -> Any:
+        """Read a field of the raw row without building the document
+
+        Args:
+        ------
+        path: str
+            Dotted path of the field, e.g. "document_meta.summary"
+        default: Any
+            Value returned if the field is missing
+        """
+        value = self._item
+        for key in path.split("."):
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+        return value
+
+    def to_response_document(self) -> ResponseDocument:
+        return ResponseDocument(
+            document=self.document,
+            similarity_score=self.similarity_score,
+            embedding=self.embedding.tolist() if self.embedding is not None else None,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(document_type={self._document_class.__name__},"
+            f" similarity_score={self.similarity_score})"
+        )
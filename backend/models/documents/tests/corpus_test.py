@@ -0,0 +1,70 @@
+import datetime
+
+import pytest
+
+from backend.models.documents import (
+    CompactCorpus,
+    NewsDocument,
+    NewsDocumentMeta,
+    WebsiteBaseDocumentMeta,
+    WebsiteDocument,
+)
+
+
+@pytest.fixture
+def news_documents() -> list[NewsDocument]:
+    return [
+        NewsDocument(
+            page_content=f"Quarterly results of company {idx} – ₹ crore",
+            document_meta=NewsDocumentMeta(
+                source=f"https://news.com/{idx}",
+                tags=["news", "results"],
+                author_name="author",
+                company_name=f"Company {idx % 3}",
+                keywords=["results"] if idx % 2 else [],
+                headline=f"headline {idx}",
+                news_sentiment={"positive": 0.8, "negative": 0.2},
+                market_trend="bullish",
+                sector="IT",
+                summary="" if idx == 0 else f"summary {idx}",
+                date_published=datetime.datetime(
+                    2024, 10, 17, 9, idx, tzinfo=datetime.timezone.utc
+                ),
+                date_created=datetime.datetime(2024, 10, 18, 9, idx),
+                ticker=None if idx % 2 else "TCS.NS",
+            ),
+        )
+        for idx in range(6)
+    ]
+
+
+class TestCompactCorpus:
+    def test_round_trip(self, news_documents):
+        corpus = CompactCorpus.from_documents(news_documents)
+        assert len(corpus) == 6
+        assert corpus.to_documents() == news_documents
+        assert corpus[-1] == news_documents[-1]
+        assert corpus.unique_values("document_meta.sector") == ["IT"]
+        assert corpus.unique_values("document_meta.tags") == ["news", "results"]
+        with pytest.raises(IndexError):
+            corpus[6]
+
+    def test_website_documents(self, webpage_content):
+        documents = [
+            WebsiteDocument(
+                page_content=f"{webpage_content.page_content} {idx}",
+                document_meta=WebsiteBaseDocumentMeta(
+                    title=webpage_content.title,
+                    source=webpage_content.source,
+                    source_map="loan",
+                    date_created=webpage_content.date_created,
+                ),
+            )
+            for idx in range(3)
+        ]
+        corpus = CompactCorpus(WebsiteDocument)
+        corpus.extend(documents)
+        assert list(corpus) == documents
+        assert corpus.unique_values("document_meta.source") == [webpage_content.source]
+        with pytest.raises(TypeError):
+            corpus.append(NewsDocument.model_construct())
@@ -1,11 +1,17 @@
 import datetime
+import json
 
+from backend.models import json_codec
 from backend.models.documents.base_document import BaseDocument, BaseDocumentMeta
 from backend.models.documents.website_document import (
     WebsiteDocument,
     WebsiteBaseDocumentMeta,
 )
 from backend.models.documents.faq_document import FaqBaseDocumentMeta, FaqDocument
+from backend.models.documents.nse_document import (
+    NseIndexDocument,
+    NseIndexDocumentMeta,
+)
 
 
 class TestDocument:
@@ -59,3 +65,61 @@ class TestDocument:
         assert json_doc["question"] == faq_content.question
         assert json_doc["answer"] == faq_content.answer
         assert json_doc["document_meta"]["title"] == faq_content.title
+
+    def test_to_json_matches_json_round_trip(self, webpage_content):
+        metadata = WebsiteBaseDocumentMeta(
+            title=webpage_content.title,
+            source=webpage_content.source,
+            tags=["loan"],
+            date_created=datetime.datetime.now(),
+        )
+        document = WebsiteDocument(
+            page_content=webpage_content.page_content, document_meta=metadata
+        )
+        assert document.to_json() == json.loads(document.model_dump_json())
+        assert metadata.to_json() == json.loads(metadata.model_dump_json())
+        assert json_codec.loads(json_codec.dumps(document.to_json())) == (
+            document.to_json()
+        )
+        assert WebsiteDocument(**json_codec.loads(document.model_dump_json())) == (
+            document
+        )
+
+    def test_from_trusted(self, webpage_content):
+        metadata = NseIndexDocumentMeta(
+            source=webpage_content.source,
+            open=100,
+            day_high=110.0,
+            day_low=95.0,
+            year_high=150.0,
+            year_low=80.0,
+            last_price=101.0,
+            change=1.0,
+            percentage_change=1.0,
+            last_updated_time=datetime.datetime(2024, 10, 18, 9, 15),
+            previous_close=None,
+            total_traded_volume=None,
+            percentage_change_365=10.0,
+            percentage_change_30=2.0,
+            chart_day_img_path="https://static.nseindia.com/today.svg",
+            chart_365_img_path="https://static.nseindia.com/365.svg",
+            chart_30_img_path="https://static.nseindia.com/30.svg",
+        )
+        document = NseIndexDocument(
+            symbol="TCS",
+            company_name="Tata Consultancy Services",
+            industry="IT",
+            isin=None,
+            document_meta=metadata,
+        )
+        item = {"id": "1", "_ts": 1729243500, **document.to_json()}
+        del item["document_meta"]["tags"]
+
+        trusted = NseIndexDocument.from_trusted(item)
+        assert trusted == document
+        assert trusted == NseIndexDocument(**item)
+        assert isinstance(trusted.document_meta, NseIndexDocumentMeta)
+        assert isinstance(trusted.document_meta.open, float)
+        assert trusted.document_meta.last_updated_time == metadata.last_updated_time
+        assert trusted.document_meta.tags == []
+        assert trusted.to_json() == document.to_json()
@@ -0,0 +1,51 @@
+import datetime
+
+import numpy as np
+
+from backend.models.documents import (
+    LazyResponseDocument,
+    ResponseDocument,
+    WebsiteBaseDocumentMeta,
+    WebsiteDocument,
+)
+
+
+class TestLazyResponseDocument:
+    def make_item(self, webpage_content) -> dict:
+        document = WebsiteDocument(
+            page_content=webpage_content.page_content,
+            document_meta=WebsiteBaseDocumentMeta(
+                title=webpage_content.title,
+                source=webpage_content.source,
+                date_created=datetime.datetime(2024, 10, 18, 9, 15),
+            ),
+        )
+        return {"id": "1", **document.to_json()}
+
+    def test_document_is_built_on_access(self, webpage_content):
+        item = self.make_item(webpage_content)
+        response = LazyResponseDocument(
+            item, WebsiteDocument, similarity_score=0.9, embedding=[0.1, 0.2, 0.3]
+        )
+        assert response._document is None
+        assert response.get("document_meta.title") == webpage_content.title
+        assert response.get("document_meta.missing", "default") == "default"
+        assert response._document is None
+
+        document = response.document
+        assert isinstance(document, WebsiteDocument)
+        assert document.page_content == webpage_content.page_content
+        assert response.document is document
+        assert response.embedding.dtype == np.float32
+        np.testing.assert_allclose(response.embedding, [0.1, 0.2, 0.3])
+
+    def test_to_response_document(self, webpage_content):
+        item = self.make_item(webpage_content)
+        response = LazyResponseDocument(
+            item, WebsiteDocument, similarity_score=0.9, validate=True
+        )
+        eager = response.to_response_document()
+        assert isinstance(eager, ResponseDocument)
+        assert eager.document == WebsiteDocument(**item)
+        assert eager.similarity_score == 0.9
+        assert eager.embedding is None
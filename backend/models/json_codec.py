@@ -0,0 +1,63 @@
+"""JSON codec used on the hot serialization paths (document exports, the tool
+result cache, checkpoints and API responses). Uses orjson when it is installed
+and falls back to the standard library json module otherwise. Cosmos DB uploads
+are serialized by the Cosmos SDK and saved documents by pydantic
+(model_dump_json), not by this codec.
+
+The output of the two backends is not byte-identical: the standard library
+adds whitespace after separators, writes numpy float32 values with their
+float64 digits (0.1 becomes 0.10000000149011612) where orjson keeps the
+shortest float32 representation, and formats datetimes with isoformat where
+orjson uses its own RFC 3339 formatting. Do not compare or hash encoded output
+produced by different environments."""
+
+from __future__ import annotations
+
+import datetime
+import json
+from typing import Any
+
+import numpy as np
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize obj to utf-8 encoded JSON"""
+    if orjson is not None:
+        return orjson.dumps(
+            obj,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """Serialize obj to a JSON string"""
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """Deserialize a JSON string or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
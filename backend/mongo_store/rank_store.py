@@ -1,4 +1,6 @@
 import os
+from functools import cache
+
 import pymongo
 
 
@@ -14,3 +16,12 @@ class RankStore:
             list(self.collection.find(query, projection={"_id": False})),
             key=lambda x: x["rank"],
         )
+
+    def get_companies(self, companies: list[str]):
+        query = {"company": {"$in": list(companies)}}
+        return list(self.collection.find(query, projection={"_id": False}))
+
+
+@cache
+def get_rank_store() -> RankStore:
+    return RankStore()
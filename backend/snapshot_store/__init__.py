@@ -0,0 +1,3 @@
+from .nse_snapshot_store import NseSnapshotStore
+
+__all__ = ["NseSnapshotStore"]
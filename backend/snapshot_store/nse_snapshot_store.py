@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import datetime
+import logging
+import os
+import shutil
+import threading
+from os import PathLike
+from typing import Iterable, Optional, Sequence
+from uuid import uuid4
+
+import numpy as np
+
+from backend.models.documents import NseIndexDocument
+
+logger = logging.getLogger(__name__)
+
+
+class NseSnapshotStore:
+    """Local columnar store of NSE index snapshots.
+
+    Every field is stored as a NumPy array, partitioned by the trading date of
+    last_updated_time. Each append writes a new part to the partitions it
+    touches, skipping rows whose (symbol, last_updated_time) is already stored,
+    and reads memory-map the arrays so range queries only touch the pages of
+    the requested partitions.
+
+    Layout:
+        {root}/date=YYYY-MM-DD/part-{id}/{field}.npy
+
+    Examples:
+        >>> store = NseSnapshotStore("nse_snapshots")
+        >>> store.append(NseMultiIndexLoader().documents)
+        >>> history = store.query("TCS", start=datetime.datetime(2024, 10, 18, 9, 15))
+        >>> history["last_updated_time"], history["last_price"]
+    """
+
+    symbol_dtype = np.dtype("U32")
+    time_dtype = np.dtype("datetime64[s]")
+    value_fields = [
+        "open",
+        "day_high",
+        "day_low",
+        "year_high",
+        "year_low",
+        "last_price",
+        "change",
+        "percentage_change",
+        "previous_close",
+        "total_traded_volume",
+        "percentage_change_365",
+        "percentage_change_30",
+    ]
+
+    def __init__(self, root: PathLike | str):
+        self.root = root
+        self._keys: dict[str, set[tuple[str, np.datetime64]]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def fields(self) -> list[str]:
+        return ["symbol", "last_updated_time", *self.value_fields]
+
+    def _partition_path(self, date: datetime.date) -> str:
+        return os.path.join(self.root, f"date={date.isoformat()}")
+
+    def partitions(
+        self,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> list[datetime.date]:
+        """Dates of the stored partitions within [start, end]"""
+        dates = []
+        for name in os.listdir(self.root):
+            if not name.startswith("date="):
+                continue
+            date = datetime.date.fromisoformat(name[len("date=") :])
+            if (start is None or date >= start) and (end is None or date <= end):
+                dates.append(date)
+        return sorted(dates)
+
+    def _parts(self, date: datetime.date) -> list[str]:
+        path = self._partition_path(date)
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.startswith("part-")
+        )
+
+    @staticmethod
+    def _load_part(
+        part: str, fields: Sequence[str], mmap: Optional[bool] = True
+    ) -> dict[str, np.ndarray]:
+        mmap_mode = "r" if mmap else None
+        return {
+            field: np.load(os.path.join(part, f"{field}.npy"), mmap_mode=mmap_mode)
+            for field in fields
+        }
+
+    def _partition_keys(self, date: datetime.date) -> set[tuple[str, np.datetime64]]:
+        key = date.isoformat()
+        if key not in self._keys:
+            keys = set()
+            for part in self._parts(date):
+                columns = self._load_part(part, ["symbol", "last_updated_time"])
+                keys.update(zip(columns["symbol"], columns["last_updated_time"]))
+            self._keys[key] = keys
+        return self._keys[key]
+
+    def _write_part(self, date: datetime.date, columns: dict[str, np.ndarray]) -> str:
+        partition = self._partition_path(date)
+        os.makedirs(partition, exist_ok=True)
+        part_id = (
+            f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid4().hex[:8]}"
+        )
+        tmp_path = os.path.join(partition, f".tmp-{part_id}")
+        os.makedirs(tmp_path)
+        for field, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{field}.npy"), values)
+        part_path = os.path.join(partition, f"part-{part_id}")
+        os.rename(tmp_path, part_path)
+        return part_path
+
+    def append(self, documents: Iterable[NseIndexDocument]) -> int:
+        """Append a snapshot of the documents, skipping already stored rows.
+
+        Returns:
+        --------
+        appended: int
+            Number of appended rows
+        """
+        rows: dict[datetime.date, dict[tuple[str, np.datetime64], NseIndexDocument]]
+        rows = {}
+        for document in documents:
+            updated_time = document.document_meta.last_updated_time
+            key = (document.symbol, np.datetime64(updated_time, "s"))
+            rows.setdefault(updated_time.date(), {})[key] = document
+
+        appended = 0
+        with self._lock:
+            for date, partition_rows in rows.items():
+                keys = self._partition_keys(date)
+                new_rows = [
+                    (key, document)
+                    for key, document in partition_rows.items()
+                    if key not in keys
+                ]
+                if not new_rows:
+                    continue
+
+                columns = {
+                    "symbol": np.array(
+                        [key[0] for key, _ in new_rows], dtype=self.symbol_dtype
+                    ),
+                    "last_updated_time": np.array(
+                        [key[1] for key, _ in new_rows], dtype=self.time_dtype
+                    ),
+                }
+                for field in self.value_fields:
+                    columns[field] = np.array(
+                        [
+                            getattr(document.document_meta, field)
+                            for _, document in new_rows
+                        ],
+                        dtype=np.float64,
+                    )
+                self._write_part(date, columns)
+                keys.update(key for key, _ in new_rows)
+                appended += len(new_rows)
+
+        logger.info(f"Appended {appended} rows to the NSE snapshot store")
+        return appended
+
+    def query(
+        self,
+        symbol: str,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[str, np.ndarray]:
+        """Get the snapshots of a symbol within [start, end], sorted by time.
+
+        Args:
+        ------
+        symbol: str
+            The symbol to query
+        start: Optional[datetime.datetime]
+            Start of the time range, by default unbounded
+        end: Optional[datetime.datetime]
+            End of the time range, by default unbounded
+        fields: Optional[Sequence[str]]
+            The value fields to return, by default all
+
+        Returns:
+        --------
+        columns: dict[str, np.ndarray]
+            last_updated_time and the requested fields
+        """
+        if fields is None:
+            fields = self.value_fields
+        fields = ["last_updated_time", *fields]
+
+        start_time = np.datetime64(start, "s") if start else None
+        end_time = np.datetime64(end, "s") if end else None
+
+        selected: dict[str, list[np.ndarray]] = {field: [] for field in fields}
+        for date in self.partitions(
+            start.date() if start else None, end.date() if end else None
+        ):
+            for part in self._parts(date):
+                columns = self._load_part(part, ["symbol", *fields])
+                mask = columns["symbol"] == symbol
+                if start_time is not None:
+                    mask &= columns["last_updated_time"] >= start_time
+                if end_time is not None:
+                    mask &= columns["last_updated_time"] <= end_time
+                if mask.any():
+                    for field in fields:
+                        selected[field].append(np.asarray(columns[field][mask]))
+
+        if not selected["last_updated_time"]:
+            return {
+                field: np.array(
+                    [],
+                    dtype=(
+                        self.time_dtype if field == "last_updated_time" else np.float64
+                    ),
+                )
+                for field in fields
+            }
+
+        result = {field: np.concatenate(values) for field, values in selected.items()}
+        order = np.argsort(result["last_updated_time"], kind="stable")
+        return {field: values[order] for field, values in result.items()}
+
+    def compact(self, date: datetime.date) -> None:
+        """Merge all parts of a partition into one part sorted by symbol and time"""
+        with self._lock:
+            parts = self._parts(date)
+            if len(parts) <= 1:
+                return
+            columns = {field: [] for field in self.fields}
+            for part in parts:
+                for field, values in self._load_part(
+                    part, self.fields, mmap=False
+                ).items():
+                    columns[field].append(values)
+            merged = {
+                field: np.concatenate(values) for field, values in columns.items()
+            }
+            order = np.lexsort((merged["last_updated_time"], merged["symbol"]))
+            self._write_part(
+                date, {field: values[order] for field, values in merged.items()}
+            )
+            for part in parts:
+                shutil.rmtree(part)
@@ -0,0 +1,91 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from backend.models.documents import NseIndexDocument, NseIndexDocumentMeta
+from backend.snapshot_store import NseSnapshotStore
+
+
+def make_document(
+    symbol: str, last_updated_time: datetime.datetime, last_price: float
+) -> NseIndexDocument:
+    metadata = NseIndexDocumentMeta(
+        source="https://www.nseindia.com/api/equity-stockIndices?index=NIFTY 50",
+        open=100.0,
+        day_high=110.0,
+        day_low=95.0,
+        year_high=150.0,
+        year_low=80.0,
+        last_price=last_price,
+        change=last_price - 100.0,
+        percentage_change=last_price - 100.0,
+        last_updated_time=last_updated_time,
+        previous_close=100.0,
+        total_traded_volume=None,
+        percentage_change_365=10.0,
+        percentage_change_30=2.0,
+        chart_day_img_path="https://static.nseindia.com/today.svg",
+        chart_365_img_path="https://static.nseindia.com/365.svg",
+        chart_30_img_path="https://static.nseindia.com/30.svg",
+    )
+    return NseIndexDocument(
+        symbol=symbol,
+        company_name=symbol,
+        industry="IT",
+        isin=None,
+        document_meta=metadata,
+    )
+
+
+@pytest.fixture
+def snapshots() -> list[list[NseIndexDocument]]:
+    day = datetime.datetime(2024, 10, 17, 9, 15)
+    next_day = datetime.datetime(2024, 10, 18, 9, 15)
+    return [
+        [make_document("TCS", day, 101.0), make_document("INFY", day, 201.0)],
+        [
+            make_document("TCS", day + datetime.timedelta(minutes=5), 102.0),
+            make_document("INFY", day, 201.0),
+        ],
+        [make_document("TCS", next_day, 103.0)],
+    ]
+
+
+class TestNseSnapshotStore:
+    def test_append_deduplicates(self, tmp_path, snapshots):
+        store = NseSnapshotStore(tmp_path)
+        assert [store.append(snapshot) for snapshot in snapshots] == [2, 1, 1]
+        assert store.append(snapshots[0]) == 0
+        assert NseSnapshotStore(tmp_path).append(snapshots[1]) == 0
+        assert store.partitions() == [
+            datetime.date(2024, 10, 17),
+            datetime.date(2024, 10, 18),
+        ]
+
+    def test_query(self, tmp_path, snapshots):
+        store = NseSnapshotStore(tmp_path)
+        for snapshot in snapshots:
+            store.append(snapshot)
+
+        history = store.query("TCS", fields=["last_price", "total_traded_volume"])
+        np.testing.assert_array_equal(history["last_price"], [101.0, 102.0, 103.0])
+        assert np.isnan(history["total_traded_volume"]).all()
+
+        history = store.query(
+            "TCS",
+            start=datetime.datetime(2024, 10, 17, 9, 16),
+            end=datetime.datetime(2024, 10, 17, 15, 30),
+        )
+        np.testing.assert_array_equal(history["last_price"], [102.0])
+        assert store.query("WIPRO")["last_price"].size == 0
+
+    def test_compact(self, tmp_path, snapshots):
+        store = NseSnapshotStore(tmp_path)
+        for snapshot in snapshots:
+            store.append(snapshot)
+
+        store.compact(datetime.date(2024, 10, 17))
+        assert len(store._parts(datetime.date(2024, 10, 17))) == 1
+        history = store.query("TCS", fields=["last_price"])
+        np.testing.assert_array_equal(history["last_price"], [101.0, 102.0, 103.0])
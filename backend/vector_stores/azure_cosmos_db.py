@@ -1,22 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import copy
 import os
 import time
 
 import logging
-from functools import cache
 from uuid import uuid4
-from typing import Any, Callable, Generator, Literal, Optional, Sequence
+from typing import Any, Callable, Generator, Iterable, Literal, Optional, Sequence
 
 import tqdm
 from openai.lib.azure import AzureOpenAI
 from openai.types import CreateEmbeddingResponse
 from azure.cosmos import CosmosClient, PartitionKey, ContainerProxy, DatabaseProxy
-
-from backend.models.documents import BaseDocument, BaseTextDocument, ResponseDocument
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+
+from backend.models.documents import (
+    BaseDocument,
+    BaseTextDocument,
+    LazyResponseDocument,
+)
+from backend.core.single_flight import SingleFlight, coalesce_methods
 from backend.vector_stores.utils import num_tokens_from_string, build_where_clause
 from backend.vector_stores.config import container_to_document_map
-
+from backend.vector_stores.query_embedding_cache import get_query_embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +59,13 @@ class AzureCosmosVectorStore:
         "vectorIndexes": [{"path": "/contextVector", "type": "quantizedFlat"}],
     }
 
+    # methods coalesced by coalesce_calls
+    coalesced_methods = (
+        "get_query_embedding",
+        "vector_search_by_embedding",
+        "filter_documents",
+    )
+
     def __init__(
         self,
         container_name: str,
@@ -63,6 +77,7 @@ class AzureCosmosVectorStore:
         self.container_name = container_name
         self.cosmos_client = CosmosClient(AZURE_COSMOS_DB_HOST, AZURE_COSMOS_DB_API_KEY)
         self.is_vector_enabled = is_vector_enabled
+        self.partition_key = partition_key
         self.cosmos_container_properties = {
             "partition_key": PartitionKey(path=partition_key)
         }
@@ -93,25 +108,85 @@ class AzureCosmosVectorStore:
                 self._container = self.db.create_container_if_not_exists(
                     id=self.container_name,
                     partition_key=self.cosmos_container_properties["partition_key"],
-                    indexing_policy=self.indexing_policy,
+                    indexing_policy=self.get_indexing_policy(),
                     vector_embedding_policy=self.vector_embedding_policy,
                 )
             else:
-                indexing_policy = self.indexing_policy
-                indexing_policy.pop("vectorIndexes")
                 self._container = self.db.create_container_if_not_exists(
                     id=self.container_name,
                     partition_key=self.cosmos_container_properties["partition_key"],
-                    indexing_policy=indexing_policy,
+                    indexing_policy=self.get_indexing_policy(),
                 )
         logger.debug("Successfully initialized Azure Cosmos DB")
 
+    def coalesce_calls(
+        self, single_flight: Optional[SingleFlight] = None
+    ) -> AzureCosmosVectorStore:
+        """Coalesce identical concurrent embedding, search and filter calls of
+        this store: while a call is in flight, the same call from other threads
+        waits for its result instead of querying again. Returns the store."""
+        return coalesce_methods(
+            self, *self.coalesced_methods, single_flight=single_flight
+        )
+
+    def get_indexing_policy(self) -> dict[str, Any]:
+        """Indexing policy of the container, with the composite indexes of its
+        container config"""
+        indexing_policy = copy.deepcopy(self.indexing_policy)
+        if not self.is_vector_enabled:
+            indexing_policy.pop("vectorIndexes")
+        config = container_to_document_map.get(self.container_name)
+        if config and config.composite_indexes:
+            indexing_policy["compositeIndexes"] = config.composite_indexes
+        return indexing_policy
+
+    def update_indexing_policy(self) -> None:
+        """Apply get_indexing_policy to an existing container. Containers are only
+        created with it, so existing containers need this once to build the
+        composite indexes."""
+        self._container = self.db.replace_container(
+            self._container,
+            partition_key=self.cosmos_container_properties["partition_key"],
+            indexing_policy=self.get_indexing_policy(),
+        )
+
+    def query_items(
+        self, query: str, parameters: Optional[list[dict[str, Any]]] = None
+    ) -> list[dict[str, Any]]:
+        """Run a parameterized query over all partitions of the container"""
+        return list(
+            self._container.query_items(
+                query=query,
+                parameters=parameters,
+                enable_cross_partition_query=True,
+            )
+        )
+
     def get_embeddings(
         self, text: str, model: Optional[str] = "text-embedding-ada-002"
     ):
         """Get embeddings for the given text"""
         return self.azure_openai_client.embeddings.create(input=text, model=model)
 
+    def get_query_embedding(
+        self, query: str, model: Optional[str] = "text-embedding-ada-002"
+    ) -> list[float]:
+        """Embedding of a search query. Precomputed queries are read from the query
+        embedding cache, other queries are embedded and remembered in memory."""
+        query_embedding_cache = get_query_embedding_cache()
+        embedding = query_embedding_cache.get(model, query)
+        if embedding is None:
+            embedding = self.get_embeddings(query, model=model).data[0].embedding
+            query_embedding_cache.remember(model, query, embedding)
+        return embedding
+
+    def embed_texts(
+        self, texts: list[str], model: Optional[str] = "text-embedding-ada-002"
+    ) -> CreateEmbeddingResponse:
+        """Get embeddings for a batch of texts in a single request. The embeddings
+        of the response are in the same order as the texts."""
+        return self.azure_openai_client.embeddings.create(input=texts, model=model)
+
     def upsert_documents(
         self,
         documents: list[BaseTextDocument],
@@ -151,6 +226,7 @@ class AzureCosmosVectorStore:
         max_token_limit: Optional[int] = float("inf"),
         log_interval: Optional[int] = 100,
         document_range: Optional[tuple[int, int]] = (0, float("inf")),
+        on_upsert: Optional[Callable[[BaseDocument, dict[str, Any]], None]] = None,
     ) -> int:
         """Embed and upload documents to the vector store
 
@@ -173,6 +249,8 @@ class AzureCosmosVectorStore:
                 Log interval, by default 100
             document_range: Optional[tuple[int, int]], optional
                 Document range to upload, by default (0, float("inf"))
+            on_upsert: Optional[Callable[[BaseDocument, dict[str, Any]], None]], optional
+                Called with the document and the upserted item after every upload, by default None
         """
         total_tokens = 0
         current_batch_tokens = 0
@@ -197,7 +275,11 @@ class AzureCosmosVectorStore:
                 total_tokens += response.usage.total_tokens
                 current_batch_tokens += response.usage.total_tokens
 
-                self.__upsert_document(embedding_response=response, document=document)
+                item = self.__upsert_document(
+                    embedding_response=response, document=document
+                )
+                if on_upsert:
+                    on_upsert(document, item)
 
                 if total_tokens > max_token_limit:
                     raise RuntimeError(
@@ -215,12 +297,15 @@ class AzureCosmosVectorStore:
         self,
         filters: dict[str, Any],
         columns: Sequence[str] = None,
+        validate: Optional[bool] = False,
     ) -> list[BaseDocument]:
         """Filter documents based on the given filters
 
         Args:
             filters (dict[str, Any]): Filters to apply
             columns (Sequence[str], optional): Columns to return. Defaults to None.
+            validate (bool, optional): Validate the items instead of trusting the
+                stored data. Defaults to False.
 
         Returns:
             list[BaseDocument]: Filtered documents
@@ -240,10 +325,56 @@ class AzureCosmosVectorStore:
         )
 
         document_class = container_config.document_class
-        documents = [document_class(**item) for item in items]
+        documents = [
+            self._load_document(document_class, item, validate) for item in items
+        ]
 
         return documents
 
+    async def afilter_documents(self, *args, **kwargs) -> list[BaseDocument]:
+        """filter_documents for async callers. The Cosmos client is synchronous,
+        so the query runs in a worker thread instead of blocking the event loop."""
+        return await asyncio.to_thread(self.filter_documents, *args, **kwargs)
+
+    @staticmethod
+    def _load_document(
+        document_class: type[BaseDocument],
+        item: dict[str, Any],
+        validate: Optional[bool] = False,
+    ) -> BaseDocument:
+        """Build a document from a stored item. Items are written by to_json, so
+        they are constructed without validation unless validate is set."""
+        if validate:
+            return document_class(**item)
+        return document_class.from_trusted(item)
+
+    def partition_key_value(self, item: dict[str, Any]) -> Any:
+        """Get the partition key value of the given item"""
+        value = item
+        for key in self.partition_key.strip("/").split("/"):
+            value = value[key]
+        return value
+
+    def delete_documents(self, items: Iterable[tuple[str, Any]]) -> int:
+        """Delete documents from the vector store
+
+        Args:
+            items: Iterable[tuple[str, Any]]
+                Pairs of document id and partition key value
+
+        Returns:
+            int: Number of deleted documents
+        """
+        deleted = 0
+        for item_id, partition_key in items:
+            try:
+                self._container.delete_item(item=item_id, partition_key=partition_key)
+                deleted += 1
+            except CosmosResourceNotFoundError:
+                logger.debug(f"Document {item_id} is already deleted")
+        logger.info(f"Successfully deleted {deleted} documents")
+        return deleted
+
     def get_all_unique_meta(self, column: str) -> list[str]:
         """Get all unique values for the given column in the document meta
 
@@ -273,7 +404,6 @@ class AzureCosmosVectorStore:
             unique.remove(None)
         return list(unique)
 
-    @cache
     def vector_search(
         self,
         query: str,
@@ -281,7 +411,8 @@ class AzureCosmosVectorStore:
         threshold: Optional[float] = 0.0,
         with_embeddings: Optional[bool] = False,
         columns: Sequence[str] = None,
-    ) -> list[ResponseDocument]:
+        validate: Optional[bool] = False,
+    ) -> list[LazyResponseDocument]:
         """Search for similar documents based on the query
 
         Args:
@@ -297,9 +428,12 @@ class AzureCosmosVectorStore:
                 Filters to apply, by default None
             columns: Sequence[str], optional
                 Columns to return, by default None
+            validate: Optional[bool], optional
+                Validate the items instead of trusting the stored data, by default False
 
         Returns:
-            list[ResponseDocument]: List of similar documents
+            list[LazyResponseDocument]: Similar documents with a similarity score
+                above the threshold, built from the rows on first access
 
         Examples:
             >>> store = AzureCosmosVectorStore(database_name="test_db", container_name="test_container")
@@ -317,40 +451,71 @@ class AzureCosmosVectorStore:
             ... }
             }
         """
-        config = container_to_document_map[self.container_name]
+        return self.vector_search_by_embedding(
+            self.get_query_embedding(query),
+            top_k=top_k,
+            threshold=threshold,
+            with_embeddings=with_embeddings,
+            columns=columns,
+            validate=validate,
+        )
 
-        embeddings = self.get_embeddings(query).data[0].embedding
+    async def avector_search(self, *args, **kwargs) -> list[LazyResponseDocument]:
+        """vector_search for async callers, run in a worker thread like
+        afilter_documents. Subclasses' vector_search arguments are accepted."""
+        return await asyncio.to_thread(self.vector_search, *args, **kwargs)
+
+    def vector_search_by_embedding(
+        self,
+        embeddings: Sequence[float],
+        top_k: int = 10,
+        threshold: Optional[float] = 0.0,
+        with_embeddings: Optional[bool] = False,
+        columns: Sequence[str] = None,
+        validate: Optional[bool] = False,
+    ) -> list[LazyResponseDocument]:
+        """Search for similar documents based on an embedding of the query, see
+        vector_search. Used to search several containers with a single embedding.
+
+        Args:
+            embeddings: Sequence[float]
+                Embedding of the query
+            top_k: int, optional
+                Top k documents to return, by default 10
+            threshold: Optional[float], optional
+                Threshold for similarity score, by default 0.0
+            with_embeddings: Optional[bool], optional
+                Return embeddings, by default False
+            columns: Sequence[str], optional
+                Columns to return, by default None
+            validate: Optional[bool], optional
+                Validate the items instead of trusting the stored data, by default False
+
+        Returns:
+            list[LazyResponseDocument]: Similar documents with a similarity score
+                above the threshold
+        """
+        embeddings = [float(value) for value in embeddings]
+        config = container_to_document_map[self.container_name]
 
         if columns is None:
             columns = config.columns
         columns = [f"c.{column}" for column in columns]
-
         if with_embeddings:
-            query = (
-                "SELECT TOP {} {}, VectorDistance(c.{}, {}) AS "
-                "{} FROM c ORDER BY VectorDistance(c.{}, {})".format(
-                    top_k,
-                    ", ".join(columns),
-                    self._embedding_key,
-                    embeddings,
-                    self._similarity_key,
-                    self._embedding_key,
-                    embeddings,
-                )
-            )
-        else:
-            query = (
-                "SELECT TOP {} {}, VectorDistance(c.{}, {}) AS "
-                "{} FROM c ORDER BY VectorDistance(c.{}, {})".format(
-                    top_k,
-                    ", ".join(columns),
-                    self._embedding_key,
-                    embeddings,
-                    self._similarity_key,
-                    self._embedding_key,
-                    embeddings,
-                )
+            columns.append(f"c.{self._embedding_key}")
+
+        query = (
+            "SELECT TOP {} {}, VectorDistance(c.{}, {}) AS "
+            "{} FROM c ORDER BY VectorDistance(c.{}, {})".format(
+                top_k,
+                ", ".join(columns),
+                self._embedding_key,
+                embeddings,
+                self._similarity_key,
+                self._embedding_key,
+                embeddings,
             )
+        )
         items = list(
             self._container.query_items(query=query, enable_cross_partition_query=True)
         )
@@ -358,26 +523,44 @@ class AzureCosmosVectorStore:
         document_class = config.document_class
         documents = []
         for item in items:
-            if self._similarity_key in item:
-                if item[self._similarity_key] > threshold:
-                    document = ResponseDocument(
-                        document=document_class(**item),
-                        similarity_score=item[self._similarity_key],
-                    )
-                    if with_embeddings:
-                        document.embedding = item[self._embedding_key]
-                else:
-                    document = ResponseDocument(
-                        document=document_class(**item),
-                        similarity_score=item[self._similarity_key],
-                    )
-                documents.append(document)
+            similarity_score = item.pop(self._similarity_key, None)
+            if similarity_score is None or similarity_score <= threshold:
+                continue
+            embedding = item.pop(self._embedding_key, None)
+            documents.append(
+                LazyResponseDocument(
+                    item,
+                    document_class,
+                    similarity_score=similarity_score,
+                    embedding=embedding if with_embeddings else None,
+                    validate=validate,
+                )
+            )
         return documents
 
+    def upsert_document(
+        self,
+        document: BaseDocument | BaseTextDocument,
+        embedding: Optional[list[float]] = None,
+    ) -> dict[str, Any]:
+        """Upsert a single document with its precomputed embedding
+
+        Args:
+            document: BaseDocument | BaseTextDocument
+                Document to upload
+            embedding: Optional[list[float]], optional
+                Embedding of the document, by default None
+
+        Returns:
+            dict[str, Any]: The upserted item
+        """
+        return self.__upsert_document(document=document, embedding=embedding)
+
     def __upsert_document(
         self,
         document: BaseTextDocument,
         embedding_response: Optional[CreateEmbeddingResponse] = None,
+        embedding: Optional[list[float]] = None,
     ):
         """Upsert document to the vector store
 
@@ -386,6 +569,8 @@ class AzureCosmosVectorStore:
                 Document to upload
             embedding_response: Optional[CreateEmbeddingResponse], optional
                 Embedding response, by default None
+            embedding: Optional[list[float]], optional
+                Embedding of the document, used if embedding_response is not provided
         """
         document_dict = document.to_json()
         upload_dict = {
@@ -394,5 +579,7 @@ class AzureCosmosVectorStore:
         }
         if embedding_response:
             upload_dict[self._embedding_key] = embedding_response.data[0].embedding
+        elif embedding is not None:
+            upload_dict[self._embedding_key] = embedding
 
         return self._container.upsert_item(upload_dict)
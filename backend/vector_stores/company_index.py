@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Optional, Sequence
+
+from backend.models.documents import BaseDocument, LazyResponseDocument
+from backend.vector_stores.azure_cosmos_db import AzureCosmosVectorStore
+from backend.vector_stores.config import container_to_document_map
+
+logger = logging.getLogger(__name__)
+
+
+class CompanyIndex:
+    """In-process index of the latest documents of every company in a container.
+
+    The ids of the latest documents of a company are read with one query per
+    company field, ordered by the field and date to be served by its composite
+    index (see the container config), merged by date and cached for
+    ttl_seconds. Lookups then fetch those documents by id, and searches rank
+    only them by vector distance instead of the whole container.
+
+    Examples:
+        >>> index = CompanyIndex(stock_news_store)
+        >>> index.latest_documents("TCS", top_k=5)
+        >>> index.search("TCS", "Quarterly results of TCS", top_k=3)
+    """
+
+    def __init__(
+        self,
+        vector_store: AzureCosmosVectorStore,
+        ttl_seconds: Optional[float] = 300,
+        max_ids: Optional[int] = 20,
+    ):
+        self.vector_store = vector_store
+        self.config = container_to_document_map[vector_store.container_name]
+        has_filter = self.config.company_fields or self.config.company_filter
+        assert (
+            has_filter and self.config.order_by
+        ), f"{vector_store.container_name} has no company index"
+        self.ttl_seconds = ttl_seconds
+        self.max_ids = max_ids
+        self._ids: dict[str, tuple[float, list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def latest_ids(self, company: str) -> list[str]:
+        """Ids of the latest max_ids documents of the company, latest first"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._ids.get(company)
+        if cached is not None and now - cached[0] < self.ttl_seconds:
+            return cached[1]
+
+        order_by = f"c.{self.config.order_by}"
+        queries = [
+            (f"c.{field} = @company", f"c.{field}, {order_by} DESC")
+            for field in self.config.company_fields
+        ]
+        if self.config.company_filter:
+            queries.append((self.config.company_filter, f"{order_by} DESC"))
+
+        latest: dict[str, Any] = {}
+        for condition, ordering in queries:
+            for item in self.vector_store.query_items(
+                f"SELECT TOP @k c.id, {order_by} AS ordered FROM c"
+                f" WHERE {condition} ORDER BY {ordering}",
+                parameters=[
+                    {"name": "@k", "value": self.max_ids},
+                    {"name": "@company", "value": company},
+                ],
+            ):
+                latest[item["id"]] = item.get("ordered")
+        ids = sorted(latest, key=lambda id_: latest[id_] or "", reverse=True)
+        ids = ids[: self.max_ids]
+        with self._lock:
+            self._ids[company] = (now, ids)
+        return ids
+
+    def _select(self, columns: Optional[Sequence[str]]) -> str:
+        if columns is None:
+            columns = self.config.columns
+        return ", ".join(f"c.{column}" for column in columns)
+
+    def latest_documents(
+        self,
+        company: str,
+        top_k: Optional[int] = 5,
+        columns: Optional[Sequence[str]] = None,
+    ) -> list[BaseDocument]:
+        """Latest documents of the company, without vector search
+
+        Args:
+        ------
+        company: str
+            Company name (or ticker where the container stores one)
+        top_k: Optional[int]
+            Number of documents to return, at most max_ids
+        columns: Optional[Sequence[str]]
+            Columns to return, by default the columns of the container config
+        """
+        ids = self.latest_ids(company)[:top_k]
+        if not ids:
+            return []
+        items = self.vector_store.query_items(
+            f"SELECT {self._select(columns)} FROM c WHERE ARRAY_CONTAINS(@ids, c.id)"
+            f" ORDER BY c.{self.config.order_by} DESC",
+            parameters=[{"name": "@ids", "value": ids}],
+        )
+        return [self.config.document_class.from_trusted(item) for item in items[:top_k]]
+
+    def search(
+        self,
+        company: str,
+        query: Optional[str] = None,
+        top_k: Optional[int] = 5,
+        threshold: Optional[float] = 0.0,
+        columns: Optional[Sequence[str]] = None,
+        embedding: Optional[Sequence[float]] = None,
+        with_embeddings: Optional[bool] = False,
+        validate: Optional[bool] = False,
+    ) -> list[LazyResponseDocument]:
+        """Rank the latest documents of the company by similarity to the query
+
+        Args:
+        ------
+        company: str
+            Company name (or ticker where the container stores one)
+        query: Optional[str]
+            The query, embedded through the query embedding cache
+        top_k: Optional[int]
+            Number of documents to return
+        threshold: Optional[float]
+            Minimum similarity score of the returned documents
+        columns: Optional[Sequence[str]]
+            Columns to return, by default the columns of the container config
+        embedding: Optional[Sequence[float]]
+            Embedding of the query, used instead of embedding the query
+        with_embeddings: Optional[bool]
+            Return the embeddings of the documents, by default False
+        validate: Optional[bool]
+            Validate the items instead of trusting the stored data, by default False
+
+        Returns:
+        --------
+        documents: list[LazyResponseDocument]
+            The most similar documents among the latest max_ids of the company
+        """
+        assert query is not None or embedding is not None, "query or embedding required"
+        ids = self.latest_ids(company)
+        if not ids:
+            return []
+        if embedding is None:
+            embedding = self.vector_store.get_query_embedding(query)
+
+        embedding_key = self.vector_store._embedding_key
+        similarity_key = self.vector_store._similarity_key
+        select = self._select(columns)
+        if with_embeddings:
+            select += f", c.{embedding_key}"
+        items = self.vector_store.query_items(
+            f"SELECT TOP @k {select},"
+            f" VectorDistance(c.{embedding_key}, @embedding) AS {similarity_key}"
+            " FROM c WHERE ARRAY_CONTAINS(@ids, c.id)"
+            f" ORDER BY VectorDistance(c.{embedding_key}, @embedding)",
+            parameters=[
+                {"name": "@k", "value": top_k},
+                {"name": "@ids", "value": ids},
+                {"name": "@embedding", "value": [float(value) for value in embedding]},
+            ],
+        )
+
+        documents = []
+        for item in items:
+            similarity_score = item.pop(similarity_key, None)
+            if similarity_score is None or similarity_score <= threshold:
+                continue
+            embedding = item.pop(embedding_key, None)
+            documents.append(
+                LazyResponseDocument(
+                    item,
+                    self.config.document_class,
+                    similarity_score=similarity_score,
+                    embedding=embedding if with_embeddings else None,
+                    validate=validate,
+                )
+            )
+        return documents
+
+    def invalidate(self, company: Optional[str] = None) -> None:
+        """Drop the cached ids of the company, or of all companies"""
+        with self._lock:
+            if company is None:
+                self._ids.clear()
+            else:
+                self._ids.pop(company, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
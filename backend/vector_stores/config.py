@@ -1,4 +1,4 @@
-from typing import Type
+from typing import Optional, Type
 
 from backend.models.documents import (
     BaseDocument,
@@ -11,14 +11,68 @@ from backend.models.documents import (
 
 
 class DocumentContainer:
-    def __init__(self, document_class: Type[BaseDocument], columns: list[str]):
+    """Document class and query settings of a container
+
+    Attributes:
+    -----------
+    document_class: Type[BaseDocument]
+        Class of the documents stored in the container
+    columns: list[str]
+        Columns selected by default
+    composite_indexes: Optional[list[list[dict[str, str]]]]
+        Composite indexes added to the indexing policy of the container
+    company_fields: Optional[list[str]]
+        Fields equal to the company name (or ticker) of the documents, used by the
+        company index. Every field is queried on its own, ordered by the field and
+        then order_by, to be served by its composite index.
+    company_filter: Optional[str]
+        Query condition matching the documents of the company given as @company,
+        for companies not stored in a single field (e.g. arrays). Used by the
+        company index, ordered by order_by only.
+    order_by: Optional[str]
+        Field the company index orders the documents by, latest first
+    """
+
+    def __init__(
+        self,
+        document_class: Type[BaseDocument],
+        columns: list[str],
+        composite_indexes: Optional[list[list[dict[str, str]]]] = None,
+        company_fields: Optional[list[str]] = None,
+        company_filter: Optional[str] = None,
+        order_by: Optional[str] = None,
+    ):
         self.document_class = document_class
         self.columns = columns
+        self.composite_indexes = composite_indexes or []
+        self.company_fields = company_fields or []
+        self.company_filter = company_filter
+        self.order_by = order_by
 
 
 container_to_document_map: dict[str, DocumentContainer] = {
-    "stock-news": DocumentContainer(NewsDocument, ["document_meta", "page_content"]),
-    "expert-news": DocumentContainer(ExpertDocument, ["document_meta", "page_content"]),
+    "stock-news": DocumentContainer(
+        NewsDocument,
+        ["document_meta", "page_content"],
+        composite_indexes=[
+            [
+                {"path": "/document_meta/company_name", "order": "ascending"},
+                {"path": "/document_meta/date_published", "order": "descending"},
+            ],
+            [
+                {"path": "/document_meta/ticker", "order": "ascending"},
+                {"path": "/document_meta/date_published", "order": "descending"},
+            ],
+        ],
+        company_fields=["document_meta.company_name", "document_meta.ticker"],
+        order_by="document_meta.date_published",
+    ),
+    "expert-news": DocumentContainer(
+        ExpertDocument,
+        ["document_meta", "page_content"],
+        company_filter="ARRAY_CONTAINS(c.document_meta.companies, @company)",
+        order_by="document_meta.date_published",
+    ),
     "bob-web": DocumentContainer(WebsiteDocument, ["document_meta", "page_content"]),
     "mutual-fund": DocumentContainer(MutualFundDocument, ["document_meta"]),
     "faq": DocumentContainer(FaqDocument, ["document_meta", "question", "answer"]),
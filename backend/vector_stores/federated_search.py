@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Sequence
+
+from backend.models.documents import LazyResponseDocument
+from backend.vector_stores.azure_cosmos_db import AzureCosmosVectorStore
+from backend.vector_stores.company_index import CompanyIndex
+
+logger = logging.getLogger(__name__)
+
+FEDERATED_SEARCH_WORKERS = int(os.environ.get("SMART_WEALTH_SEARCH_WORKERS", 8))
+
+
+@dataclass
+class ContainerSearch:
+    """Search options of a single container
+
+    Attributes:
+    -----------
+    vector_store: AzureCosmosVectorStore
+        The vector store of the container
+    top_k: int
+        Number of documents to return from the container
+    threshold: float
+        Minimum similarity score of the returned documents
+    columns: Optional[Sequence[str]]
+        Columns to return, by default the columns of the container config
+    with_embeddings: bool
+        Return the embeddings of the documents
+    validate: bool
+        Validate the rows instead of trusting the stored data
+    company_index: Optional[CompanyIndex]
+        Index of the latest documents of every company. Searches for a company
+        rank only its latest documents, companies without documents in the
+        index are searched in the whole container.
+    """
+
+    vector_store: AzureCosmosVectorStore
+    top_k: int = 10
+    threshold: float = 0.0
+    columns: Optional[Sequence[str]] = None
+    with_embeddings: bool = False
+    validate: bool = False
+    company_index: Optional[CompanyIndex] = None
+
+
+@dataclass
+class FederatedSearchResult:
+    """Results of a query over several containers
+
+    Attributes:
+    -----------
+    query: Optional[str]
+        The searched query, None for searches by embedding
+    results: dict[str, list[LazyResponseDocument]]
+        Results of every searched container, in the order of the search
+    """
+
+    query: Optional[str]
+    results: dict[str, list[LazyResponseDocument]] = field(default_factory=dict)
+
+    def merged(
+        self, top_k: Optional[int] = None
+    ) -> list[tuple[str, LazyResponseDocument]]:
+        """(container, document) pairs of all containers sorted by descending
+        similarity score. Ties keep the container order."""
+        merged = [
+            (container, document)
+            for container, documents in self.results.items()
+            for document in documents
+        ]
+        merged.sort(key=lambda pair: -pair[1].similarity_score)
+        return merged[:top_k] if top_k is not None else merged
+
+
+class FederatedSearch:
+    """Vector search over several containers with a single query embedding.
+
+    The query is embedded once (through the query embedding cache) and the
+    containers are searched concurrently on a shared thread pool.
+
+    Examples:
+        >>> search = FederatedSearch(
+        ...     {
+        ...         "stock-news": ContainerSearch(stock_news_store, top_k=3),
+        ...         "expert-news": ContainerSearch(expert_news_store, top_k=3),
+        ...     }
+        ... )
+        >>> result = search.search("Financial results of TCS")
+        >>> result.results["stock-news"]
+        >>> result.merged(top_k=5)
+    """
+
+    def __init__(
+        self,
+        containers: dict[str, ContainerSearch],
+        max_workers: Optional[int] = FEDERATED_SEARCH_WORKERS,
+    ):
+        assert containers, "containers must not be empty"
+        self.containers = containers
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="federated-search"
+                )
+            return self._executor
+
+    def embed(self, query: str) -> list[float]:
+        """Embedding of the query, shared by every container"""
+        vector_store = next(iter(self.containers.values())).vector_store
+        return vector_store.get_query_embedding(query)
+
+    @staticmethod
+    def _search_container(
+        options: ContainerSearch,
+        embedding: Sequence[float],
+        company: Optional[str] = None,
+    ) -> list[LazyResponseDocument]:
+        if (
+            company is not None
+            and options.company_index is not None
+            and options.company_index.latest_ids(company)
+        ):
+            return options.company_index.search(
+                company,
+                embedding=embedding,
+                top_k=options.top_k,
+                threshold=options.threshold,
+                columns=options.columns,
+                with_embeddings=options.with_embeddings,
+                validate=options.validate,
+            )
+        return options.vector_store.vector_search_by_embedding(
+            embedding,
+            top_k=options.top_k,
+            threshold=options.threshold,
+            with_embeddings=options.with_embeddings,
+            columns=options.columns,
+            validate=options.validate,
+        )
+
+    def _submit(
+        self,
+        embedding: Sequence[float],
+        containers: Iterable[str],
+        company: Optional[str] = None,
+    ) -> dict[str, Future]:
+        return {
+            container: self.executor.submit(
+                self._search_container, self.containers[container], embedding, company
+            )
+            for container in containers
+        }
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        embedding: Optional[Sequence[float]] = None,
+        containers: Optional[Sequence[str]] = None,
+    ) -> FederatedSearchResult:
+        """Search the containers with the query or its embedding
+
+        Args:
+        ------
+        query: Optional[str]
+            The query, embedded once for all containers
+        embedding: Optional[Sequence[float]]
+            Embedding of the query, used instead of embedding the query
+        containers: Optional[Sequence[str]]
+            Containers to search, by default all
+        """
+        return self.search_many([(query, containers)], embeddings=[embedding])[0]
+
+    def search_many(
+        self,
+        queries: Sequence[tuple[Optional[str], Optional[Sequence[str]]]],
+        embeddings: Optional[Sequence[Optional[Sequence[float]]]] = None,
+        companies: Optional[Sequence[Optional[str]]] = None,
+    ) -> list[FederatedSearchResult]:
+        """Run several searches concurrently. Every search is a (query, containers)
+        pair, containers None searching all containers. Searches with a company
+        use the company index of the containers that have one. Results are
+        returned in the order of the queries."""
+        if embeddings is None:
+            embeddings = [None] * len(queries)
+        if companies is None:
+            companies = [None] * len(queries)
+        for (query, _), embedding in zip(queries, embeddings):
+            assert (
+                query is not None or embedding is not None
+            ), "query or embedding must be provided"
+
+        embedding_futures = [
+            (self.executor.submit(self.embed, query) if embedding is None else None)
+            for (query, _), embedding in zip(queries, embeddings)
+        ]
+        searches = []
+        for (query, containers), embedding, embedding_future, company in zip(
+            queries, embeddings, embedding_futures, companies
+        ):
+            if embedding_future is not None:
+                embedding = embedding_future.result()
+            searches.append(
+                (query, self._submit(embedding, containers or self.containers, company))
+            )
+
+        return [
+            FederatedSearchResult(
+                query=query,
+                results={
+                    container: future.result() for container, future in futures.items()
+                },
+            )
+            for query, futures in searches
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,56 @@
+"""Apply the indexing policies of the container configs to existing containers.
+
+Containers are only created with their indexing policy, so the composite
+indexes of the company index (see CompanyIndex) are built on existing
+containers by running this once after deploying a new container config.
+
+Usage:
+    python -m backend.vector_stores.migrations --database smart-wealth-main-db
+    python -m backend.vector_stores.migrations stock-news expert-news
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+from typing import Optional, Sequence
+
+from backend.vector_stores.azure_cosmos_db import AzureCosmosVectorStore
+from backend.vector_stores.config import container_to_document_map
+
+logger = logging.getLogger(__name__)
+
+
+def indexed_containers() -> list[str]:
+    """Containers with composite indexes in their config"""
+    return [
+        container_name
+        for container_name, config in container_to_document_map.items()
+        if config.composite_indexes
+    ]
+
+
+def update_indexing_policies(
+    database_name: str, container_names: Optional[Sequence[str]] = None
+) -> list[str]:
+    """Apply the indexing policy of the containers, by default of every container
+    with composite indexes. Returns the updated containers."""
+    container_names = list(container_names or indexed_containers())
+    for container_name in container_names:
+        AzureCosmosVectorStore(
+            database_name=database_name, container_name=container_name
+        ).update_indexing_policy()
+        logger.info(f"Updated the indexing policy of {database_name}/{container_name}")
+    return container_names
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("containers", nargs="*")
+    parser.add_argument(
+        "--database", default=os.environ.get("BOB_AZURE_COSMOS_DATABASE_NAME")
+    )
+    args = parser.parse_args()
+    update_indexing_policies(args.database, args.containers)
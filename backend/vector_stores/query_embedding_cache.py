@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import cache
+from os import PathLike
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+QUERY_EMBEDDING_CACHE_PATH = os.environ.get(
+    "SMART_WEALTH_QUERY_EMBEDDING_CACHE_PATH", "query_embeddings.db"
+)
+# ad-hoc query embeddings kept in memory, least recently used first out
+QUERY_EMBEDDING_CACHE_SIZE = int(
+    os.environ.get("SMART_WEALTH_QUERY_EMBEDDING_CACHE_SIZE", 1024)
+)
+# version of the stored rows, rows of older versions are dropped
+_SCHEMA_VERSION = 1
+
+
+class QueryEmbeddingCache:
+    """Local SQLite cache of query embeddings, keyed by model and query text.
+
+    The agents' search queries are templated, so their embeddings are
+    precomputed once (see backend.core.finance_agents_network.query_precompute)
+    and stored here, and vector_search reads them instead of calling the
+    embedding API. Ad-hoc queries are only remembered in memory, in a least
+    recently used cache of max_size queries, so the file stays bounded.
+    Embeddings are stored as float32, the precision of the embedding models.
+
+    Examples:
+        >>> cache = QueryEmbeddingCache("query_embeddings.db")
+        >>> cache.put("text-embedding-ada-002", "query", [0.5, 0.25])
+        >>> cache.get("text-embedding-ada-002", "query")
+        [0.5, 0.25]
+    """
+
+    def __init__(
+        self,
+        db_path: PathLike | str = QUERY_EMBEDDING_CACHE_PATH,
+        max_size: Optional[int] = QUERY_EMBEDDING_CACHE_SIZE,
+    ):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._recent: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._initialize()
+
+    def _initialize(self):
+        with self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    model TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (model, query)
+                )
+                """)
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < _SCHEMA_VERSION:
+                # float64 rows of ad-hoc queries, the precompute job refills the rest
+                self._connection.execute("DELETE FROM query_embeddings")
+                self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def get(self, model: str, query: str) -> Optional[list[float]]:
+        """Cached embedding of the query, precomputed or remembered, None on a
+        miss"""
+        with self._lock:
+            embedding = self._recent.get((model, query))
+            if embedding is not None:
+                self._recent.move_to_end((model, query))
+                return embedding.tolist()
+            row = self._connection.execute(
+                "SELECT embedding FROM query_embeddings WHERE model = ? AND query = ?",
+                (model, query),
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def remember(self, model: str, query: str, embedding: Sequence[float]) -> None:
+        """Keep the embedding of an ad-hoc query in memory, evicting the least
+        recently used queries beyond max_size"""
+        with self._lock:
+            self._recent[(model, query)] = np.asarray(embedding, dtype=np.float32)
+            self._recent.move_to_end((model, query))
+            while len(self._recent) > self.max_size:
+                self._recent.popitem(last=False)
+
+    def missing(self, model: str, queries: Iterable[str]) -> list[str]:
+        """Queries without a cached embedding, in order and without duplicates"""
+        queries = list(dict.fromkeys(queries))
+        with self._lock:
+            cached = {
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT query FROM query_embeddings WHERE model = ?", (model,)
+                )
+            }
+        return [query for query in queries if query not in cached]
+
+    def put(self, model: str, query: str, embedding: Sequence[float]) -> None:
+        """Store the embedding of a precomputed query"""
+        self.put_many(model, [(query, embedding)])
+
+    def put_many(
+        self, model: str, embeddings: Iterable[tuple[str, Sequence[float]]]
+    ) -> None:
+        updated_at = datetime.now().isoformat()
+        rows = [
+            (
+                model,
+                query,
+                np.asarray(embedding, dtype=np.float32).tobytes(),
+                updated_at,
+            )
+            for query, embedding in embeddings
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO query_embeddings"
+                " (model, query, embedding, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def __len__(self) -> int:
+        """Number of stored (precomputed) query embeddings"""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM query_embeddings"
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+@cache
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Process wide query embedding cache at SMART_WEALTH_QUERY_EMBEDDING_CACHE_PATH"""
+    return QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_PATH)
@@ -0,0 +1,167 @@
+from datetime import datetime
+
+import pytest
+
+from backend.models.documents import (
+    LazyResponseDocument,
+    NewsDocument,
+    NewsDocumentMeta,
+)
+from backend.vector_stores import migrations
+from backend.vector_stores.company_index import CompanyIndex
+
+
+def news_item(idx):
+    return NewsDocument(
+        page_content=f"news {idx}",
+        document_meta=NewsDocumentMeta(
+            source=f"https://news.com/{idx}",
+            author_name="author",
+            company_name="TCS",
+            keywords=["results"],
+            headline=f"headline {idx}",
+            news_sentiment={"positive": 0.8, "neutral": 0.15, "negative": 0.05},
+            market_trend="bullish",
+            sector="IT",
+            summary=f"summary {idx}",
+            date_published=datetime(2024, 1, idx + 1),
+            ticker="TCS.NS",
+        ),
+    ).to_json()
+
+
+class FakeVectorStore:
+    container_name = "stock-news"
+    _embedding_key = "contextVector"
+    _similarity_key = "SimilarityScore"
+
+    def __init__(self):
+        self.queries = []
+
+    def get_query_embedding(self, query):
+        return [1.0, 0.0]
+
+    def query_items(self, query, parameters=None):
+        parameters = {p["name"]: p["value"] for p in parameters or []}
+        self.queries.append((query, parameters))
+        if "SELECT TOP @k c.id" in query:
+            # the ticker query finds the same documents, except the latest
+            offset = 1 if "c.document_meta.ticker =" in query else 0
+            return [
+                {"id": f"id-{idx}", "ordered": f"2024-01-{20 - idx:02d}"}
+                for idx in range(offset, parameters["@k"] + offset)
+            ]
+        if "VectorDistance" in query:
+            return [
+                {**news_item(idx), "SimilarityScore": score}
+                for idx, score in enumerate([0.9, 0.2][: parameters["@k"]])
+            ]
+        return [news_item(idx) for idx in range(len(parameters["@ids"]))]
+
+
+@pytest.fixture
+def store():
+    return FakeVectorStore()
+
+
+class TestCompanyIndex:
+    def test_latest_ids_are_cached(self, store):
+        index = CompanyIndex(store, max_ids=3)
+
+        assert index.latest_ids("TCS") == ["id-0", "id-1", "id-2"]
+        assert index.latest_ids("TCS") == ["id-0", "id-1", "id-2"]
+        assert len(store.queries) == 2
+        assert all(parameters["@company"] == "TCS" for _, parameters in store.queries)
+
+        index.invalidate("TCS")
+        index.latest_ids("TCS")
+        assert len(store.queries) == 4
+
+    def test_every_company_field_is_queried_with_its_composite_index(self, store):
+        index = CompanyIndex(store, max_ids=3)
+        index.latest_ids("TCS")
+
+        (company_query, _), (ticker_query, _) = store.queries
+        assert "WHERE c.document_meta.company_name = @company" in company_query
+        assert (
+            "ORDER BY c.document_meta.company_name, c.document_meta.date_published DESC"
+            in company_query
+        )
+        assert "WHERE c.document_meta.ticker = @company" in ticker_query
+        assert (
+            "ORDER BY c.document_meta.ticker, c.document_meta.date_published DESC"
+            in ticker_query
+        )
+        assert " OR " not in company_query + ticker_query
+
+    def test_company_filter(self, store):
+        store.container_name = "expert-news"
+        index = CompanyIndex(store, max_ids=3)
+        assert index.latest_ids("TCS") == ["id-0", "id-1", "id-2"]
+
+        ((query, _),) = store.queries
+        assert "WHERE ARRAY_CONTAINS(c.document_meta.companies, @company)" in query
+        assert query.endswith("ORDER BY c.document_meta.date_published DESC")
+
+    def test_expired_ids_are_reloaded(self, store):
+        index = CompanyIndex(store, ttl_seconds=0)
+        index.latest_ids("TCS")
+        index.latest_ids("TCS")
+        assert len(store.queries) == 4
+
+    def test_latest_documents(self, store):
+        index = CompanyIndex(store, max_ids=10)
+        documents = index.latest_documents("TCS", top_k=2)
+
+        assert [document.page_content for document in documents] == [
+            "news 0",
+            "news 1",
+        ]
+        assert isinstance(documents[0], NewsDocument)
+        assert store.queries[-1][1]["@ids"] == ["id-0", "id-1"]
+
+    def test_search_reranks_the_company_documents(self, store):
+        index = CompanyIndex(store, max_ids=10)
+        documents = index.search("TCS", "results", top_k=2, threshold=0.3)
+
+        assert len(documents) == 1
+        assert isinstance(documents[0], LazyResponseDocument)
+        assert documents[0].similarity_score == 0.9
+        query, parameters = store.queries[-1]
+        assert "ARRAY_CONTAINS(@ids, c.id)" in query
+        assert len(parameters["@ids"]) == 10
+        assert parameters["@embedding"] == [1.0, 0.0]
+        assert "contextVector" not in query.split("VectorDistance")[0]
+
+    def test_search_options(self, store):
+        index = CompanyIndex(store, max_ids=10)
+        documents = index.search(
+            "TCS", "results", top_k=1, with_embeddings=True, validate=True
+        )
+
+        query, _ = store.queries[-1]
+        assert "c.contextVector," in query
+        assert documents[0]._validate
+
+    def test_container_without_company_index(self, store):
+        store.container_name = "faq"
+        with pytest.raises(AssertionError):
+            CompanyIndex(store)
+
+
+class TestMigrations:
+    def test_update_indexing_policies(self, monkeypatch):
+        updated = []
+
+        class FakeStore:
+            def __init__(self, database_name, container_name):
+                self.container_name = container_name
+
+            def update_indexing_policy(self):
+                updated.append(self.container_name)
+
+        monkeypatch.setattr(migrations, "AzureCosmosVectorStore", FakeStore)
+        assert migrations.update_indexing_policies("db") == ["stock-news"]
+        assert updated == ["stock-news"]
+        migrations.update_indexing_policies("db", ["expert-news"])
+        assert updated == ["stock-news", "expert-news"]
@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from backend.models.documents import (
+    LazyResponseDocument,
+    WebsiteBaseDocumentMeta,
+    WebsiteDocument,
+)
+from backend.vector_stores.federated_search import ContainerSearch, FederatedSearch
+
+
+class FakeVectorStore:
+    def __init__(self, name, scores):
+        self.name = name
+        self.scores = scores
+        self.embedded = []
+        self.searches = []
+        self._lock = threading.Lock()
+
+    def get_query_embedding(self, query):
+        with self._lock:
+            self.embedded.append(query)
+        return [float(len(query))]
+
+    def vector_search_by_embedding(self, embeddings, top_k=10, threshold=0.0, **kwargs):
+        with self._lock:
+            self.searches.append((embeddings, top_k))
+        item = WebsiteDocument(
+            page_content=self.name,
+            document_meta=WebsiteBaseDocumentMeta(source=self.name, title=self.name),
+        ).to_json()
+        return [
+            LazyResponseDocument(item, WebsiteDocument, similarity_score=score)
+            for score in self.scores[:top_k]
+            if score > threshold
+        ]
+
+
+class FakeCompanyIndex:
+    def __init__(self, companies):
+        self.companies = companies
+        self.searches = []
+
+    def latest_ids(self, company):
+        return ["id"] if company in self.companies else []
+
+    def search(self, company, embedding=None, top_k=5, **kwargs):
+        self.searches.append((company, embedding, top_k, kwargs))
+        return []
+
+
+@pytest.fixture
+def stores():
+    return FakeVectorStore("news", [0.9, 0.5, 0.2]), FakeVectorStore(
+        "expert", [0.7, 0.6]
+    )
+
+
+class TestFederatedSearch:
+    def test_search(self, stores):
+        news, expert = stores
+        search = FederatedSearch(
+            {
+                "stock-news": ContainerSearch(news, top_k=3, threshold=0.3),
+                "expert-news": ContainerSearch(expert, top_k=1),
+            }
+        )
+        result = search.search("query")
+
+        assert news.embedded == ["query"] and expert.embedded == []
+        assert expert.searches == [([5.0], 1)]
+        assert [r.similarity_score for r in result.results["stock-news"]] == [0.9, 0.5]
+        assert [r.similarity_score for r in result.results["expert-news"]] == [0.7]
+        assert [
+            (container, r.similarity_score) for container, r in result.merged()
+        ] == [("stock-news", 0.9), ("expert-news", 0.7), ("stock-news", 0.5)]
+        assert len(result.merged(top_k=2)) == 2
+        search.close()
+
+    def test_search_many(self, stores):
+        news, expert = stores
+        search = FederatedSearch(
+            {
+                "stock-news": ContainerSearch(news),
+                "expert-news": ContainerSearch(expert),
+            }
+        )
+        results = search.search_many(
+            [("a", ["stock-news"]), ("bb", ["expert-news"]), ("ccc", None)]
+        )
+
+        assert [result.query for result in results] == ["a", "bb", "ccc"]
+        assert [list(result.results) for result in results] == [
+            ["stock-news"],
+            ["expert-news"],
+            ["stock-news", "expert-news"],
+        ]
+        assert sorted(news.embedded) == ["a", "bb", "ccc"]
+
+        result = search.search(embedding=[1.0], containers=["expert-news"])
+        assert expert.searches[-1] == ([1.0], 10)
+        with pytest.raises(AssertionError):
+            search.search()
+        search.close()
+
+    def test_company_index(self, stores):
+        news, expert = stores
+        company_index = FakeCompanyIndex(["TCS"])
+        search = FederatedSearch(
+            {
+                "stock-news": ContainerSearch(
+                    news, top_k=2, validate=True, company_index=company_index
+                ),
+                "expert-news": ContainerSearch(expert),
+            }
+        )
+        results = search.search_many(
+            [("TCS results", None), ("Wipro results", ["stock-news"]), ("IT", None)],
+            companies=["TCS", "Wipro", None],
+        )
+
+        # only the indexed company is searched in the index
+        assert [search[:3] for search in company_index.searches] == [("TCS", [11.0], 2)]
+        options = company_index.searches[0][3]
+        assert options["validate"] is True
+        assert options["with_embeddings"] is False
+        assert results[0].results["stock-news"] == []
+        assert len(results[0].results["expert-news"]) == 2
+        assert sorted(news.searches) == [([2.0], 2), ([13.0], 2)]
+        search.close()
@@ -0,0 +1,101 @@
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.core.finance_agents_network.query_precompute import (
+    precompute_query_embeddings,
+    templated_queries,
+)
+from backend.vector_stores.query_embedding_cache import QueryEmbeddingCache
+
+MODEL = "text-embedding-ada-002"
+
+
+@pytest.fixture
+def query_embedding_cache(tmp_path) -> QueryEmbeddingCache:
+    cache = QueryEmbeddingCache(tmp_path / "query_embeddings.db")
+    yield cache
+    cache.close()
+
+
+class TestQueryEmbeddingCache:
+    def test_get_put(self, query_embedding_cache):
+        assert query_embedding_cache.get(MODEL, "query") is None
+        query_embedding_cache.put(MODEL, "query", [0.5, 0.25, 0.125])
+        assert query_embedding_cache.get(MODEL, "query") == [0.5, 0.25, 0.125]
+        assert query_embedding_cache.get("other-model", "query") is None
+        assert query_embedding_cache.missing(MODEL, ["query", "new", "new"]) == ["new"]
+
+    def test_embeddings_are_stored_as_float32(self, query_embedding_cache):
+        query_embedding_cache.put(MODEL, "query", [0.1, 0.2])
+        assert query_embedding_cache.get(MODEL, "query") == pytest.approx([0.1, 0.2])
+        (size,) = query_embedding_cache._connection.execute(
+            "SELECT LENGTH(embedding) FROM query_embeddings"
+        ).fetchone()
+        assert size == 2 * 4
+
+    def test_ad_hoc_queries_are_remembered_in_memory(self, tmp_path):
+        cache = QueryEmbeddingCache(tmp_path / "query_embeddings.db", max_size=2)
+        cache.remember(MODEL, "a", [0.5])
+        cache.remember(MODEL, "b", [0.25])
+        assert cache.get(MODEL, "a") == [0.5]
+        # b is the least recently used
+        cache.remember(MODEL, "c", [0.125])
+        assert cache.get(MODEL, "b") is None
+        assert cache.get(MODEL, "a") == [0.5]
+        assert cache.get(MODEL, "c") == [0.125]
+        # only precomputed queries are stored
+        assert len(cache) == 0
+        assert cache.missing(MODEL, ["a"]) == ["a"]
+        cache.close()
+
+    def test_float64_rows_are_dropped(self, tmp_path):
+        db_path = tmp_path / "query_embeddings.db"
+        connection = sqlite3.connect(db_path)
+        with connection:
+            connection.execute(
+                "CREATE TABLE query_embeddings (model TEXT NOT NULL, query TEXT NOT"
+                " NULL, embedding BLOB NOT NULL, updated_at TEXT NOT NULL,"
+                " PRIMARY KEY (model, query))"
+            )
+            connection.execute(
+                "INSERT INTO query_embeddings VALUES (?, ?, ?, ?)",
+                (MODEL, "query", np.asarray([0.5]).tobytes(), "2024-01-01"),
+            )
+        connection.close()
+
+        cache = QueryEmbeddingCache(db_path)
+        assert cache.get(MODEL, "query") is None
+        cache.put(MODEL, "query", [0.5])
+        cache.close()
+        cache = QueryEmbeddingCache(db_path)
+        assert cache.get(MODEL, "query") == [0.5]
+        cache.close()
+
+    def test_precompute_query_embeddings(self, query_embedding_cache):
+        requests = []
+
+        def embed_texts(texts, model=None):
+            requests.append(texts)
+            data = [
+                SimpleNamespace(index=idx, embedding=[float(len(text))])
+                for idx, text in enumerate(texts)
+            ]
+            return SimpleNamespace(data=list(reversed(data)))
+
+        kwargs = dict(
+            companies=["TCS", "Infosys"],
+            search_attributes=[["Acquisition", "Financials"], ["Financials"]],
+            embed_texts=embed_texts,
+            query_embedding_cache=query_embedding_cache,
+            batch_size=3,
+        )
+        assert precompute_query_embeddings(**kwargs) == 4
+        assert [len(batch) for batch in requests] == [3, 1]
+        assert precompute_query_embeddings(**kwargs) == 0
+
+        query = templated_queries(["TCS"], [["Acquisition"]])[0]
+        assert query == "Documents having news related to Acquisition of TCS"
+        assert query_embedding_cache.get(MODEL, query) == [float(len(query))]
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.vector_stores import tokens
+
+
+class FakeEncoding:
+    """One token per whitespace separated word"""
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+    def encode_ordinary_batch(self, texts, num_threads=8):
+        return [self.encode_ordinary(text) for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def fake_encoding(monkeypatch):
+    monkeypatch.setattr(tokens, "get_encoding", lambda model: FakeEncoding())
+
+
+class TestTokens:
+    def test_count_tokens(self, fake_encoding):
+        assert tokens.count_tokens("one two three", "gpt-4o") == 3
+        assert tokens.count_tokens_batch(["one", "one two", ""], "gpt-4o") == [1, 2, 0]
+
+    def test_estimates_without_encoding(self, monkeypatch):
+        monkeypatch.setattr(tokens, "get_encoding", lambda model: None)
+        assert tokens.count_tokens("a" * 10, "gpt-4o") == 3
+        assert tokens.count_tokens_batch(["a" * 8, ""], "gpt-4o") == [2, 0]
+
+    def test_token_limit(self):
+        assert tokens.token_limit("text-embedding-ada-002") == 8191
+        assert tokens.token_limit("my-deployment") == tokens.DEFAULT_TOKEN_LIMIT
+
+    def test_truncate_to_limit(self, fake_encoding):
+        assert tokens.truncate_to_limit("one two", "gpt-4o", 5) == ("one two", 2)
+        text = " ".join(["word"] * 10)
+        assert tokens.truncate_to_limit(text, "gpt-4o", 3) == ("word word word", 3)
+
+    def test_trim_messages(self, fake_encoding):
+        messages = [SimpleNamespace(content=" ".join(["word"] * 10)) for _ in range(5)]
+        assert tokens.trim_messages(messages, "gpt-4o", 1000) == messages
+        assert tokens.trim_messages(messages, "gpt-4o", 30) == messages[-2:]
+        assert tokens.trim_messages(messages, "gpt-4o", 5) == messages[-1:]
+        assert tokens.trim_messages([], "gpt-4o", 5) == []
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+from functools import cache
+from typing import Any, Optional, Sequence
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+TOKENIZER_THREADS = int(os.environ.get("SMART_WEALTH_TOKENIZER_THREADS", 8))
+
+# input token limits of the models, by model name
+MODEL_TOKEN_LIMITS = {
+    "text-embedding-ada-002": 8191,
+    "text-embedding-3-small": 8191,
+    "text-embedding-3-large": 8191,
+    "gpt-35-turbo": 16385,
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_TOKEN_LIMIT = 8191
+
+# tokens added by the chat format for every message
+MESSAGE_TOKEN_OVERHEAD = 4
+
+
+def token_limit(model: str) -> int:
+    """Input token limit of the model, by default DEFAULT_TOKEN_LIMIT"""
+    return MODEL_TOKEN_LIMITS.get(model, DEFAULT_TOKEN_LIMIT)
+
+
+@cache
+def get_encoding(model: str) -> Optional[tiktoken.Encoding]:
+    """Encoding of the model, loaded once per model. Unknown models (e.g. azure
+    deployment names) use cl100k_base. Returns None if the encoding can't be
+    loaded, in which case token counts fall back to estimates."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        logger.warning(
+            f"Could not load the tokenizer of {model}, token counts are estimated",
+            exc_info=True,
+        )
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap length based estimate of the number of tokens"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Number of tokens of the text for the model"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode_ordinary(text))
+
+
+def count_tokens_batch(
+    texts: Sequence[str],
+    model: str,
+    num_threads: Optional[int] = None,
+) -> list[int]:
+    """Number of tokens of every text, encoded in parallel by tiktoken
+
+    Args:
+    ------
+    texts: Sequence[str]
+        The texts to count
+    model: str
+        The model whose tokenizer is used
+    num_threads: Optional[int]
+        Number of tokenizer threads, by default SMART_WEALTH_TOKENIZER_THREADS
+
+    Returns:
+    --------
+    counts: list[int]
+        Number of tokens of every text, in order
+    """
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [estimate_tokens(text) for text in texts]
+    encoded = encoding.encode_ordinary_batch(
+        list(texts), num_threads=num_threads or TOKENIZER_THREADS
+    )
+    return [len(tokens) for tokens in encoded]
+
+
+def truncate_to_limit(
+    text: str, model: str, max_tokens: Optional[int] = None
+) -> tuple[str, int]:
+    """Truncate the text to max_tokens (by default the model limit)
+
+    Returns:
+    --------
+    text, tokens: tuple[str, int]
+        The truncated text and its number of tokens
+    """
+    max_tokens = max_tokens or token_limit(model)
+    if len(text.encode("utf-8")) <= max_tokens:
+        # a token is at least one byte, so the text is within the limit
+        return text, count_tokens(text, model)
+    encoding = get_encoding(model)
+    if encoding is None:
+        text = text[: max_tokens * CHARS_PER_TOKEN]
+        return text, estimate_tokens(text)
+    tokens = encoding.encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+
+def trim_messages(
+    messages: Sequence[Any],
+    model: str,
+    max_tokens: Optional[int] = None,
+) -> list[Any]:
+    """Drop the oldest messages until the rest fit in max_tokens. The latest
+    message is always kept.
+
+    Args:
+    ------
+    messages: Sequence[Any]
+        Chat messages with a string content attribute, oldest first
+    model: str
+        The chat model whose tokenizer is used
+    max_tokens: Optional[int]
+        Token budget of the history, by default the model limit
+    """
+    if not messages:
+        return []
+    max_tokens = max_tokens or token_limit(model)
+    contents = [str(message.content) for message in messages]
+    upper_bound = sum(
+        len(content.encode("utf-8")) + MESSAGE_TOKEN_OVERHEAD for content in contents
+    )
+    if upper_bound <= max_tokens:
+        # a token is at least one byte, so the history fits without counting
+        return list(messages)
+
+    counts = count_tokens_batch(contents, model)
+    total = 0
+    start = len(messages)
+    for idx in range(len(messages) - 1, -1, -1):
+        total += counts[idx] + MESSAGE_TOKEN_OVERHEAD
+        if total > max_tokens and idx < len(messages) - 1:
+            break
+        start = idx
+    if start:
+        logger.info(f"Trimmed {start} of {len(messages)} messages from the history")
+    return list(messages[start:])
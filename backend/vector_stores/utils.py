@@ -1,11 +1,9 @@
-import tiktoken
+from backend.vector_stores.tokens import count_tokens
 
 
 def num_tokens_from_string(string: str, encoding_name: str) -> int:
     """Returns number of tokens given an openai model"""
-    encoding = tiktoken.encoding_for_model(encoding_name)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return count_tokens(string, encoding_name)
 
 
 def build_where_clause(filters):
@@ -1,7 +1,39 @@
 import axios from "axios";
 
 
-export const chatAgent = async (messages) => {
-    const response = await axios.post('http://localhost:8000/api/agent/chat/', {messages: messages});
+// messages: the new messages of the turn, or the whole history without a conversationId
+export const chatAgent = async (messages, conversationId = null) => {
+    const response = await axios.post('http://localhost:8000/api/agent/chat/', {
+        messages: messages,
+        conversation_id: conversationId,
+    });
     return response.data;
-}
\ No newline at end of file
+}
+
+export const chatAgentStream = async (messages, onEvent, conversationId = null) => {
+    const response = await fetch('http://localhost:8000/api/agent/chat/stream?format=ndjson', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({messages: messages, conversation_id: conversationId}),
+    });
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+    for (;;) {
+        const {done, value} = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, {stream: true});
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (!line) continue;
+            const event = JSON.parse(line);
+            if (event.event === 'done') {
+                result = {conversation_id: event.conversation_id, messages: event.messages};
+            }
+            onEvent(event);
+        }
+    }
+    return result;
+}
@@ -2,7 +2,7 @@ import {useEffect, useState} from 'react';
 import {ChatBubble} from "./chat_bubble";
 import {FaArrowUp} from "react-icons/fa";
 import mainLogo from "../../logo.png";
-import {chatAgent} from "../../api/agent";
+import {chatAgentStream} from "../../api/agent";
 
 
 const dummyMessages = [
@@ -34,13 +34,30 @@ const ChatArea = () => {
     const [messages, setMessages] = useState([]);
     const [message, setMessage] = useState("");
     const [loading, setLoading] = useState(false);
+    const [conversationId, setConversationId] = useState(null);
+
+    const onChatEvent = (event) => {
+        if (event.event === "start") {
+            // known from the first event, so a failed run is still continued
+            setConversationId(event.conversation_id);
+        } else if (event.event === "message") {
+            setMessages((current) => [...current, {sender: event.sender, text: event.text}]);
+        } else if (event.event === "error") {
+            setMessages((current) => [...current, {sender: "bot", text: event.message}]);
+        }
+    }
 
     const sendMessage = async (message) => {
         setLoading(true)
-        setMessages([...messages, {sender: "user", "text": message}])
-        const response = await chatAgent([...messages, {sender: "user", "text": message}]);
-        setMessages(response.messages);
-        setLoading(false);
+        const userMessage = {sender: "user", "text": message};
+        setMessages((current) => [...current, userMessage]);
+        // the server keeps the conversation, only the new message is sent, and
+        // the agents' messages are shown as they arrive
+        try {
+            await chatAgentStream([userMessage], onChatEvent, conversationId);
+        } finally {
+            setLoading(false);
+        }
     }
 
     return (